@@ -0,0 +1,49 @@
+"""
+Throughput and peak memory of BatchScorer on a synthetic export, for a
+range of worker counts.
+
+    python -m benchmarks.batch_scoring_benchmark --rows 1000000 --workers 1 --workers 4
+"""
+import os
+import pickle
+import tempfile
+
+import click
+
+from benchmarks.utils import measure, print_table
+from model.batch_scoring import BatchScorer
+from model.data_cleaning import DataPreprocessStrategy
+from model.data_ingestion import FEATURE_COLUMNS, TARGET_COLUMN
+from model.model_dev import LightGBMModel
+from model.synthetic import make_olist_frame, write_olist_csv
+
+
+def score(model_path: str, source: str, output: str, n_workers: int, chunksize: int) -> None:
+    BatchScorer(model_path, None, chunksize=chunksize, n_workers=n_workers).score_file(
+        source, output, id_columns=["order_id"]
+    )
+
+
+@click.command()
+@click.option("--rows", default=1_000_000, help="Number of synthetic orders to score")
+@click.option("--chunksize", default=100_000, help="Rows scored at a time")
+@click.option("--workers", multiple=True, type=int, default=(1, 2), help="Worker counts to compare")
+def main(rows: int, chunksize: int, workers):
+    train = DataPreprocessStrategy().handle_data(make_olist_frame(50_000))
+    model = LightGBMModel().train(train[FEATURE_COLUMNS], train[TARGET_COLUMN])
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "model.pkl")
+        with open(model_path, "wb") as fid:
+            pickle.dump(model, fid)
+        source = write_olist_csv(os.path.join(tmp, "orders.csv"), rows)
+        output = os.path.join(tmp, "predictions.parquet")
+        results = {}
+        for n_workers in workers:
+            result = measure(score, model_path, source, output, n_workers, chunksize)
+            result["rows_per_s"] = rows / result["wall_s"]
+            results[f"{n_workers} worker(s)"] = result
+        print_table(f"Batch scoring of {rows} rows in chunks of {chunksize}", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+The three separate Evaluation classes against one fused RegressionMetrics
+pass, on a holdout of synthetic review scores.
+
+    python -m benchmarks.evaluation_benchmark --rows 10000000
+"""
+import logging
+
+import click
+import numpy as np
+
+from benchmarks.utils import measure_inline, print_table
+from model.evaluation import MSE, RMSE, R2Score, RegressionMetrics
+
+
+def separate_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> tuple:
+    """The evaluation step before the metrics were fused."""
+    mse = MSE().calculate_score(y_true, y_pred)
+    r2 = R2Score().calculate_score(y_true, y_pred)
+    rmse = RMSE().calculate_score(y_true, y_pred)
+    return mse, r2, rmse
+
+
+def fused_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> dict:
+    return RegressionMetrics().calculate_scores(y_true, y_pred)
+
+
+def streamed_metrics(y_true: np.ndarray, y_pred: np.ndarray, chunk: int = 65_536) -> dict:
+    metrics = RegressionMetrics()
+    for start in range(0, len(y_true), chunk):
+        metrics.update(y_true[start : start + chunk], y_pred[start : start + chunk])
+    return metrics.result()
+
+
+@click.command()
+@click.option("--rows", default=10_000_000, help="Number of holdout rows")
+def main(rows: int):
+    logging.disable(logging.INFO)
+    rng = np.random.default_rng(42)
+    y_true = rng.choice([1, 2, 3, 4, 5], rows).astype(np.float32)
+    y_pred = y_true + rng.normal(scale=0.8, size=rows)
+    print_table(
+        f"Regression metrics over {rows} rows",
+        {
+            "MSE + R2 + RMSE classes": measure_inline(separate_metrics, y_true, y_pred),
+            "RegressionMetrics, 5 metrics": measure_inline(fused_metrics, y_true, y_pred),
+            "RegressionMetrics, streamed": measure_inline(streamed_metrics, y_true, y_pred),
+        },
+    )
+
+
+if __name__ == "__main__":
+    main()
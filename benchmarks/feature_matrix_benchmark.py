@@ -0,0 +1,51 @@
+"""
+Splitting and training on DataFrames against float32 FeatureMatrix objects,
+each variant in a fresh process so the peak RSS covers only its own data.
+
+    python -m benchmarks.feature_matrix_benchmark --rows 500000
+"""
+import time
+
+import click
+
+from benchmarks.utils import measure, print_table
+from model.data_cleaning import DataDivideStrategy, DataPreprocessStrategy
+from model.model_dev import MODELS
+from model.synthetic import make_olist_frame
+
+TRAIN_PARAMS = {
+    "lightgbm": {"n_estimators": 100},
+    "xgboost": {"n_estimators": 100},
+    "randomforest": {"n_estimators": 20, "max_depth": 10},
+}
+
+
+def split_and_train(name: str, rows: int, feature_matrix: bool) -> None:
+    data = DataPreprocessStrategy().handle_data(make_olist_frame(rows))
+    start = time.perf_counter()
+    x_train, _, y_train, _ = DataDivideStrategy(feature_matrix).handle_data(data)
+    del data
+    MODELS[name]().train(x_train, y_train, **TRAIN_PARAMS[name])
+    seconds = time.perf_counter() - start
+    if feature_matrix:
+        size = x_train.nbytes
+    else:
+        size = x_train.memory_usage(index=True).sum()
+    kind = "FeatureMatrix" if feature_matrix else "DataFrame"
+    print(f"  {name}, {kind}: x_train {size / 2**20:.1f} MiB, split and fit {seconds:.2f}s")
+
+
+@click.command()
+@click.option("--rows", default=500_000, help="Number of synthetic orders")
+@click.option("--model", "models", multiple=True, default=list(TRAIN_PARAMS), help="Model to train, repeatable")
+def main(rows: int, models):
+    results = {}
+    for name in models:
+        for feature_matrix in (False, True):
+            label = f"{name}, {'FeatureMatrix' if feature_matrix else 'DataFrame'}"
+            results[label] = measure(split_and_train, name, rows, feature_matrix)
+    print_table(f"Split and fit on {rows} rows (wall_s includes generating the data)", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Cold import time of the entry points and model modules, measured with
+`python -X importtime` in a fresh interpreter per module.
+
+    python -m benchmarks.import_benchmark
+    python -m benchmarks.import_benchmark --module run_pipeline --top 15
+
+Modules whose dependencies are not installed are reported with the
+missing package instead of a time.
+"""
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+import click
+
+MODULES = [
+    "run_pipeline",
+    "run_deployment",
+    "streamlit_app",
+    "run_server",
+    "model.model_dev",
+    "model.model_selection",
+    "model.incremental",
+    "model.evaluation",
+    "model.data_cleaning",
+    "model.model_loader",
+    "materializer.custom_materializer",
+    "steps.model_train",
+    "steps.evaluation",
+]
+
+
+def import_time(module: str) -> Tuple[Dict[str, float], str]:
+    """
+    Imports `module` in a fresh interpreter.
+
+    Returns:
+        cumulative: cumulative import time in seconds of every imported module
+        error: last line of the error output when the import failed, else ""
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    cumulative = {}
+    errors: List[str] = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            errors.append(line)
+            continue
+        _, cumulative_us, name = line[len("import time:") :].split("|")
+        if cumulative_us.strip().isdigit():
+            cumulative[name.strip()] = int(cumulative_us) / 1e6
+    return cumulative, (errors[-1] if process.returncode and errors else "")
+
+
+@click.command()
+@click.option("--module", "modules", multiple=True, help="Module to import, repeatable")
+@click.option("--top", default=0, help="Also list the N slowest top-level packages")
+def main(modules: Tuple[str], top: int):
+    for module in modules or MODULES:
+        cumulative, error = import_time(module)
+        if error:
+            print(f"  {module:<34} failed: {error}")
+            continue
+        print(f"  {module:<34} {cumulative.get(module, 0.0):.3f}s")
+        if top:
+            packages = {
+                name: seconds for name, seconds in cumulative.items() if "." not in name and name != module
+            }
+            for name, seconds in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+                print(f"      {name:<30} {seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Daily retraining cost of the continuous deployment pipeline: a full
+retraining on the whole order history against a warm start that adds trees
+on the last day's orders only, plus the RMSE of both on the next day.
+
+    python -m benchmarks.incremental_benchmark --history-rows 1000000 --daily-rows 5000
+"""
+import logging
+
+import click
+import numpy as np
+
+from benchmarks.utils import measure_inline, print_table
+from model.data_cleaning import DataPreprocessStrategy
+from model.data_ingestion import FEATURE_COLUMNS, TARGET_COLUMN
+from model.model_dev import LightGBMModel, XGBoostModel
+from model.synthetic import make_olist_frame
+
+MODELS = {"lightgbm": LightGBMModel, "xgboost": XGBoostModel}
+
+
+@click.command()
+@click.option("--history-rows", default=1_000_000, help="Orders in the full history")
+@click.option("--daily-rows", default=5_000, help="Orders placed since the last run")
+@click.option("--model-name", type=click.Choice(sorted(MODELS)), default="lightgbm")
+@click.option("--n-estimators", default=200, help="Trees of a full retraining")
+@click.option("--incremental-rounds", default=100, help="Trees added by a warm start")
+def main(history_rows: int, daily_rows: int, model_name: str, n_estimators: int, incremental_rounds: int):
+    logging.disable(logging.INFO)
+    data = DataPreprocessStrategy().handle_data(make_olist_frame(history_rows + 2 * daily_rows))
+    x, y = data[FEATURE_COLUMNS], data[TARGET_COLUMN].to_numpy()
+    old, new, holdout = history_rows - daily_rows, history_rows, history_rows + daily_rows
+    model = MODELS[model_name]()
+    base = model.train(x[:old], y[:old], n_estimators=n_estimators)
+
+    trained = {}
+
+    def full():
+        trained["full"] = model.train(x[:new], y[:new], n_estimators=n_estimators)
+
+    def warm_start():
+        trained["warm start"] = model.train(
+            x[old:new], y[old:new], init_model=base, n_estimators=incremental_rounds
+        )
+
+    rows = {
+        f"full, {new} rows": measure_inline(full),
+        f"warm start, {daily_rows} rows": measure_inline(warm_start),
+    }
+    for (name, values), reg in zip(rows.items(), trained.values()):
+        error = reg.predict(x[new:holdout]) - y[new:holdout]
+        values["next_day_rmse"] = float(np.sqrt(np.mean(error**2)))
+    print_table(f"Daily retraining of {model_name}", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Compares the legacy `pd.read_csv` ingestion with the typed, projected
+`IngestData` engine, in one shot and in streaming mode.
+
+    python -m benchmarks.ingest_benchmark --rows 1000000
+"""
+import os
+import tempfile
+
+import click
+import pandas as pd
+
+from benchmarks.utils import measure, print_table
+from model.data_cache import DatasetCache
+from model.data_ingestion import IngestData
+from model.synthetic import write_olist_csv
+
+
+def legacy_read(path: str) -> None:
+    pd.read_csv(path)
+
+
+def typed_read(path: str) -> None:
+    IngestData(path).get_data()
+
+
+def cached_read(path: str, cache_dir: str) -> None:
+    IngestData(path, cache=DatasetCache(cache_dir)).get_data()
+
+
+def chunked_read(path: str, chunksize: int) -> None:
+    for _ in IngestData(path).iter_chunks(chunksize):
+        pass
+
+
+@click.command()
+@click.option("--rows", default=1_000_000, help="Number of synthetic orders")
+@click.option("--chunksize", default=100_000, help="Rows per chunk in streaming mode")
+def main(rows: int, chunksize: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_olist_csv(os.path.join(tmp, "olist.csv"), rows)
+        cache_dir = os.path.join(tmp, "cache")
+        cached_read(path, cache_dir)
+        print_table(
+            f"ingest_data, {rows} rows ({os.path.getsize(path) / 2**20:.0f} MiB CSV)",
+            {
+                "pd.read_csv (legacy)": measure(legacy_read, path),
+                "IngestData.get_data": measure(typed_read, path),
+                "IngestData.iter_chunks": measure(chunked_read, path, chunksize),
+                "IngestData.get_data (cached)": measure(cached_read, path, cache_dir),
+            },
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Save/load time and on-disk size of the type-specific artifact formats
+against a plain pickle, for the train/test splits and the trained models.
+
+    python -m benchmarks.materializer_benchmark --rows 1000000
+"""
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+import click
+
+from benchmarks.utils import print_table
+from materializer.serialization import LazyFrame, load_artifact, save_artifact
+from model.data_cleaning import DataDivideStrategy, DataPreprocessStrategy
+from model.model_dev import LightGBMModel, RandomForestModel, XGBoostModel
+from model.synthetic import make_olist_frame
+
+
+def _size_mib(directory: str) -> float:
+    return sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)) / 2**20
+
+
+def _pickle_round_trip(obj, directory: str):
+    path = os.path.join(directory, "artifact.pkl")
+    start = time.perf_counter()
+    with open(path, "wb") as fid:
+        pickle.dump(obj, fid, protocol=pickle.HIGHEST_PROTOCOL)
+    saved = time.perf_counter()
+    with open(path, "rb") as fid:
+        pickle.load(fid)
+    return saved - start, time.perf_counter() - saved
+
+
+def _artifact_round_trip(obj, directory: str, mmap: bool):
+    start = time.perf_counter()
+    save_artifact(obj, directory)
+    saved = time.perf_counter()
+    loaded = load_artifact(directory, mmap=mmap)
+    del loaded
+    return saved - start, time.perf_counter() - saved
+
+
+@click.command()
+@click.option("--rows", default=1_000_000, help="Number of synthetic orders")
+def main(rows: int):
+    data = DataPreprocessStrategy().handle_data(make_olist_frame(rows))
+    x_train, x_test, y_train, y_test = DataDivideStrategy().handle_data(data)
+    artifacts = {
+        "x_train": x_train,
+        "y_train": y_train,
+        "x_train.values": x_train.to_numpy(),
+        "lightgbm": LightGBMModel().train(x_train, y_train),
+        "xgboost": XGBoostModel().train(x_train, y_train),
+        "randomforest": RandomForestModel().train(
+            x_train[:100_000], y_train[:100_000], n_estimators=50, max_depth=12
+        ),
+    }
+    results = {}
+    for name, obj in artifacts.items():
+        for label, round_trip in (
+            ("pickle", lambda o, d: _pickle_round_trip(o, d)),
+            ("native", lambda o, d: _artifact_round_trip(o, d, mmap=False)),
+            ("native+mmap", lambda o, d: _artifact_round_trip(o, d, mmap=True)),
+        ):
+            directory = tempfile.mkdtemp()
+            try:
+                save_s, load_s = round_trip(obj, directory)
+                results[f"{name} {label}"] = {
+                    "save_s": save_s,
+                    "load_s": load_s,
+                    "size_mib": _size_mib(directory),
+                }
+            finally:
+                shutil.rmtree(directory)
+    directory = tempfile.mkdtemp()
+    try:
+        save_artifact(x_train, directory)
+        start = time.perf_counter()
+        LazyFrame(directory).select(["price"]).to_pandas()
+        results["x_train lazy, 1 column"] = {"load_s": time.perf_counter() - start}
+    finally:
+        shutil.rmtree(directory)
+    print_table(f"Artifact formats, {rows} rows", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Throughput and latency of concurrent single-row requests scored one
+`predict` call per request against the MicroBatcher.
+
+    python -m benchmarks.micro_batching_benchmark --requests 5000 --concurrency 256
+"""
+import asyncio
+import time
+
+import click
+import numpy as np
+import pandas as pd
+
+from benchmarks.utils import print_table
+from model.data_cleaning import DataPreprocessStrategy
+from model.data_ingestion import FEATURE_COLUMNS, TARGET_COLUMN
+from model.micro_batching import MicroBatcher
+from model.model_dev import LightGBMModel
+from model.synthetic import make_olist_frame
+
+
+async def _drive(score, rows: np.ndarray, concurrency: int) -> dict:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(row):
+        async with semaphore:
+            start = time.perf_counter()
+            await score(row)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(row) for row in rows))
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1e3
+    return {
+        "rows_per_s": len(rows) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+@click.command()
+@click.option("--requests", "n_requests", default=5_000, help="Number of single-row requests")
+@click.option("--concurrency", default=256, help="Requests in flight at once")
+@click.option("--max-latency-ms", default=5.0, help="Batching latency budget")
+def main(n_requests: int, concurrency: int, max_latency_ms: float):
+    train = DataPreprocessStrategy().handle_data(make_olist_frame(100_000))
+    model = LightGBMModel().train(train[FEATURE_COLUMNS], train[TARGET_COLUMN])
+    rows = train[FEATURE_COLUMNS].to_numpy(dtype=np.float64)[:n_requests]
+
+    def predict(matrix):
+        return model.predict(pd.DataFrame(matrix, columns=FEATURE_COLUMNS))
+
+    async def per_request():
+        loop = asyncio.get_running_loop()
+        return await _drive(
+            lambda row: loop.run_in_executor(None, predict, row.reshape(1, -1)), rows, concurrency
+        )
+
+    async def batched():
+        async with MicroBatcher(predict, max_latency_ms=max_latency_ms) as batcher:
+            result = await _drive(batcher.predict, rows, concurrency)
+            result["mean_batch_rows"] = batcher.metrics.snapshot()["mean_batch_rows"]
+            return result
+
+    print_table(
+        f"{n_requests} single-row requests, {concurrency} in flight",
+        {
+            "predict per request": asyncio.run(per_request()),
+            "MicroBatcher": asyncio.run(batched()),
+        },
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Click-to-prediction latency of the Streamlit app: unpickling the model on
+every request against serving it from the ModelCache.
+
+    python -m benchmarks.model_cache_benchmark --model-path saved_model/model.pkl
+
+Without --model-path a LightGBM model is trained on synthetic orders first.
+"""
+import os
+import pickle
+import tempfile
+import time
+
+import click
+import pandas as pd
+
+from benchmarks.utils import print_table
+from model.data_cleaning import DataPreprocessStrategy
+from model.data_ingestion import FEATURE_COLUMNS, TARGET_COLUMN
+from model.model_dev import LightGBMModel
+from model.model_loader import ModelCache, load_model
+from model.synthetic import make_olist_frame
+
+
+def _ms_per_request(handle_request, n_requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        handle_request()
+    return 1e3 * (time.perf_counter() - start) / n_requests
+
+
+@click.command()
+@click.option("--model-path", default=None, help="Pickled model to serve")
+@click.option("--requests", "n_requests", default=200, help="Number of single-row requests")
+def main(model_path: str, n_requests: int):
+    if model_path is None:
+        train = DataPreprocessStrategy().handle_data(make_olist_frame(100_000))
+        model = LightGBMModel().train(train[FEATURE_COLUMNS], train[TARGET_COLUMN])
+        model_path = os.path.join(tempfile.mkdtemp(), "model.pkl")
+        with open(model_path, "wb") as fid:
+            pickle.dump(model, fid)
+    row = pd.DataFrame(make_olist_frame(1)[FEATURE_COLUMNS].astype("float64"))
+    cache = ModelCache()
+    model = load_model(model_path)
+    results = {
+        "unpickle per request": {
+            "ms_per_request": _ms_per_request(lambda: load_model(model_path).predict(row), n_requests)
+        },
+        "ModelCache": {
+            "ms_per_request": _ms_per_request(lambda: cache.get(model_path).predict(row), n_requests)
+        },
+        "predict only": {
+            "ms_per_request": _ms_per_request(lambda: model.predict(row), n_requests)
+        },
+    }
+    print_table(f"Single-row prediction latency, {model_path}", results)
+
+
+if __name__ == "__main__":
+    main()
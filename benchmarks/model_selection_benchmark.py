@@ -0,0 +1,41 @@
+"""
+Comparing every registered model in one train_model call: candidates
+trained one after the other against a process pool with the cores split
+between the workers.
+
+    python -m benchmarks.model_selection_benchmark --rows 200000 --workers 4
+"""
+import logging
+
+import click
+
+from benchmarks.utils import measure_inline, print_table
+from model.data_cleaning import DataDivideStrategy, DataPreprocessStrategy
+from model.model_selection import ModelSelection
+from model.synthetic import make_olist_frame
+
+
+@click.command()
+@click.option("--rows", default=200_000, help="Number of synthetic orders")
+@click.option("--workers", default=4, help="Candidates trained in parallel")
+def main(rows: int, workers: int):
+    logging.disable(logging.INFO)
+    data = DataPreprocessStrategy().handle_data(make_olist_frame(rows)).dropna()
+    split = DataDivideStrategy().handle_data(data)
+    leaderboards = {}
+
+    def select(n_workers: int):
+        leaderboards[n_workers] = ModelSelection(n_workers=n_workers).run(*split)[2]
+
+    print_table(
+        f"Training all candidates on {rows} rows",
+        {
+            "sequential": measure_inline(select, 1),
+            f"{workers} worker processes": measure_inline(select, workers),
+        },
+    )
+    print(leaderboards[workers].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Scoring a batch in which a share of the rows repeat earlier requests,
+with and without the PredictionCache in front of the model.
+
+    python -m benchmarks.prediction_cache_benchmark --rows 100000 --repeat-share 0.8
+"""
+import time
+
+import click
+import numpy as np
+import pandas as pd
+
+from benchmarks.utils import print_table
+from model.data_cleaning import DataPreprocessStrategy
+from model.data_ingestion import FEATURE_COLUMNS, TARGET_COLUMN
+from model.model_dev import RandomForestModel
+from model.prediction_cache import PredictionCache
+from model.synthetic import make_olist_frame
+
+
+@click.command()
+@click.option("--rows", default=100_000, help="Rows per scoring request")
+@click.option("--repeat-share", default=0.8, help="Share of rows already scored before")
+def main(rows: int, repeat_share: float):
+    data = DataPreprocessStrategy().handle_data(make_olist_frame(2 * rows))
+    model = RandomForestModel().train(
+        data[FEATURE_COLUMNS][:50_000], data[TARGET_COLUMN][:50_000], n_estimators=100, max_depth=12
+    )
+
+    def predict(matrix):
+        return model.predict(pd.DataFrame(matrix, columns=FEATURE_COLUMNS))
+
+    features = data[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    seen = features[:rows]
+    n_repeat = int(rows * repeat_share)
+    request = np.concatenate([seen[:n_repeat], features[rows : 2 * rows - n_repeat]])
+
+    cache = PredictionCache(max_entries=2 * rows)
+    cache.predict(seen, "v1", predict)
+
+    results = {}
+    start = time.perf_counter()
+    predict(request)
+    results["uncached"] = {"wall_s": time.perf_counter() - start}
+    start = time.perf_counter()
+    cache.predict(request, "v1", predict)
+    results["PredictionCache"] = {"wall_s": time.perf_counter() - start, "hit_rate": n_repeat / rows}
+    print_table(f"{rows} rows, {repeat_share:.0%} seen before", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Compares the predictor's previous JSON round-trip with `to_feature_matrix`
+when turning a scoring batch into the array sent to the prediction service.
+
+    python -m benchmarks.predictor_benchmark --rows 100000
+"""
+import json
+
+import click
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from benchmarks.utils import measure_inline, print_table
+from model.data_cleaning import DataPreprocessStrategy
+from model.data_ingestion import FEATURE_COLUMNS, TARGET_COLUMN
+from model.feature_matrix import to_feature_matrix
+from model.synthetic import make_olist_frame
+
+
+def legacy_conversion(data: str) -> np.ndarray:
+    """The predictor step's conversion as it was before the rewrite."""
+    data = json.loads(data)
+    data.pop("columns")
+    data.pop("index")
+    df = pd.DataFrame(data["data"], columns=FEATURE_COLUMNS)
+    json_list = json.loads(json.dumps(list(df.T.to_dict().values())))
+    return np.array(json_list)
+
+
+@click.command()
+@click.option("--rows", default=100_000, help="Number of orders in the scoring batch")
+def main(rows: int):
+    batch = DataPreprocessStrategy().handle_data(make_olist_frame(rows))
+    batch = batch.drop(columns=[TARGET_COLUMN])
+    payload = batch.to_json(orient="split")
+    table = pa.Table.from_pandas(batch, preserve_index=False)
+    reordered = batch[FEATURE_COLUMNS[::-1]]
+    print_table(
+        f"Predictor input conversion, {rows} rows",
+        {
+            "legacy, JSON payload": measure_inline(legacy_conversion, payload),
+            "DataFrame, float64": measure_inline(to_feature_matrix, batch),
+            "DataFrame, float32": measure_inline(to_feature_matrix, batch, np.float32),
+            "DataFrame, reordered": measure_inline(to_feature_matrix, reordered),
+            "Arrow table, float64": measure_inline(to_feature_matrix, table),
+            "ndarray, float64": measure_inline(to_feature_matrix, batch.to_numpy()),
+        },
+    )
+
+
+if __name__ == "__main__":
+    main()
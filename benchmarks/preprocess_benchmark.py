@@ -0,0 +1,64 @@
+"""
+Compares the previous column-by-column DataPreprocessStrategy with the
+fitted, vectorized one on a synthetic dataset (10x the Olist sample by default).
+
+    python -m benchmarks.preprocess_benchmark --rows 1150000
+"""
+import warnings
+
+import click
+import numpy as np
+import pandas as pd
+
+from benchmarks.utils import measure_inline, print_table
+from model.data_cleaning import DataPreprocessStrategy
+from model.data_ingestion import FEATURE_COLUMNS, TARGET_COLUMN
+from model.synthetic import make_olist_frame
+
+
+def legacy_preprocess(data: pd.DataFrame) -> pd.DataFrame:
+    """The preprocessing as it was before the fit/transform rewrite."""
+    data = data.drop(
+        [
+            "order_approved_at",
+            "order_delivered_carrier_date",
+            "order_delivered_customer_date",
+            "order_estimated_delivery_date",
+            "order_purchase_timestamp",
+        ],
+        axis=1,
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        data["product_weight_g"].fillna(data["product_weight_g"].median(), inplace=True)
+        data["product_length_cm"].fillna(data["product_length_cm"].median(), inplace=True)
+        data["product_height_cm"].fillna(data["product_height_cm"].median(), inplace=True)
+        data["product_width_cm"].fillna(data["product_width_cm"].median(), inplace=True)
+        data["review_comment_message"].fillna("No review", inplace=True)
+    data = data.select_dtypes(include=[np.number])
+    return data.drop(["customer_zip_code_prefix", "order_item_id"], axis=1)
+
+
+def fitted_preprocess(data: pd.DataFrame) -> pd.DataFrame:
+    return DataPreprocessStrategy().handle_data(data)
+
+
+@click.command()
+@click.option("--rows", default=1_150_000, help="Number of synthetic orders")
+def main(rows: int):
+    full = make_olist_frame(rows)
+    projected = full[FEATURE_COLUMNS + [TARGET_COLUMN]].astype("float32")
+    fitted = DataPreprocessStrategy().fit(projected)
+    print_table(
+        f"DataPreprocessStrategy, {rows} rows",
+        {
+            "legacy, full export": measure_inline(legacy_preprocess, full),
+            "fit+transform, full export": measure_inline(fitted_preprocess, full),
+            "fit+transform, projected": measure_inline(fitted_preprocess, projected),
+            "transform only, projected": measure_inline(fitted.transform, projected),
+        },
+    )
+
+
+if __name__ == "__main__":
+    main()
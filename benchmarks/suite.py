@@ -0,0 +1,210 @@
+"""
+End-to-end benchmark suite: every stage of the pipelines on a synthetic
+Olist export, with the results written to JSON so runs on different commits
+can be compared offline.
+
+    python -m benchmarks.suite --size 100k --output results/100k.json
+    python -m benchmarks.suite --size 100k --output new.json --compare results/100k.json
+
+Every scenario runs inside a `model.profiling.profile` block and reports
+its wall and CPU time, peak RSS and rows processed. Scenarios run in order
+in one process and later ones reuse what earlier ones produced (the
+ingested frame, the split, the trained models), so `--scenarios` must keep
+their prerequisites.
+"""
+import datetime
+import json
+import logging
+import os
+import pickle
+import platform
+import subprocess
+import tempfile
+from typing import Callable, Dict, List, Optional
+
+import click
+
+from materializer.serialization import load_artifact, save_artifact
+from model.batch_scoring import BatchScorer
+from model.data_cleaning import DataDivideStrategy, DataPreprocessStrategy
+from model.data_ingestion import IngestData
+from model.evaluation import RegressionMetrics
+from model.model_dev import MODELS, HyperparameterTuner, LightGBMModel
+from model.profiling import profile
+from model.synthetic import SIZES, write_olist_csv
+
+# Parameters keeping the random forest affordable at the larger sizes.
+TRAIN_PARAMS = {"randomforest": {"n_estimators": 50, "max_depth": 12, "n_jobs": -1}}
+
+
+class Suite:
+    """The benchmark scenarios, sharing one working directory and their outputs."""
+
+    def __init__(self, csv_path: str, workdir: str, trials: int) -> None:
+        self.csv_path = csv_path
+        self.workdir = workdir
+        self.trials = trials
+        self.state = {}
+
+    def scenarios(self) -> Dict[str, Callable[[], Optional[int]]]:
+        """Scenario name to a callable returning the rows it processed."""
+        scenarios = {
+            "ingest": self.ingest,
+            "preprocess": self.preprocess,
+            "split": self.split,
+        }
+        for name in MODELS:
+            scenarios[f"train_{name}"] = lambda name=name: self.train(name)
+        scenarios.update(
+            {
+                "tune_lightgbm": self.tune,
+                "evaluation": self.evaluation,
+                "materializer_frame": lambda: self.round_trip("x_train"),
+                "materializer_model": lambda: self.round_trip("model_lightgbm"),
+                "batch_predict": self.batch_predict,
+            }
+        )
+        return scenarios
+
+    def ingest(self) -> int:
+        self.state["raw"] = IngestData(self.csv_path).get_data()
+        return len(self.state["raw"])
+
+    def preprocess(self) -> int:
+        self.state["clean"] = DataPreprocessStrategy().handle_data(self.state["raw"])
+        return len(self.state["clean"])
+
+    def split(self) -> int:
+        x_train, x_test, y_train, y_test = DataDivideStrategy().handle_data(self.state["clean"])
+        self.state.update(x_train=x_train, x_test=x_test, y_train=y_train, y_test=y_test)
+        return len(self.state["clean"])
+
+    def train(self, name: str) -> int:
+        x_train, y_train = self.state["x_train"], self.state["y_train"]
+        if name == "linear_regression":
+            # the only model without native missing-value handling
+            complete = x_train.notna().all(axis=1)
+            x_train, y_train = x_train[complete], y_train[complete]
+        self.state[f"model_{name}"] = MODELS[name]().train(
+            x_train, y_train, **TRAIN_PARAMS.get(name, {})
+        )
+        return len(x_train)
+
+    def tune(self) -> int:
+        tuner = HyperparameterTuner(
+            LightGBMModel(),
+            self.state["x_train"],
+            self.state["y_train"],
+            self.state["x_test"],
+            self.state["y_test"],
+        )
+        tuner.optimize(n_trials=self.trials)
+        return len(self.state["x_train"]) * self.trials
+
+    def evaluation(self) -> int:
+        prediction = self.state["model_lightgbm"].predict(self.state["x_test"])
+        RegressionMetrics().calculate_scores(self.state["y_test"], prediction)
+        return len(prediction)
+
+    def round_trip(self, key: str) -> Optional[int]:
+        directory = os.path.join(self.workdir, key)
+        save_artifact(self.state[key], directory)
+        loaded = load_artifact(directory, mmap=False)
+        return len(loaded) if key.startswith("x_") else None
+
+    def batch_predict(self) -> int:
+        model_path = os.path.join(self.workdir, "model.pkl")
+        with open(model_path, "wb") as fid:
+            pickle.dump(self.state["model_lightgbm"], fid)
+        scorer = BatchScorer(model_path, preprocessor_path=None)
+        return scorer.score_file(self.csv_path, os.path.join(self.workdir, "predictions.parquet"))
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(results: List[dict], baseline_path: str) -> None:
+    with open(baseline_path) as fid:
+        baseline = {r["scenario"]: r for r in json.load(fid)["results"]}
+    print(f"Against {baseline_path} (ratio > 1 is slower or larger)")
+    for result in results:
+        before = baseline.get(result["scenario"])
+        if before is None:
+            continue
+        cells = "  ".join(
+            f"{key}={result[key] / before[key]:.2f}x"
+            for key in ("wall_seconds", "cpu_seconds", "peak_rss_mib")
+            if before.get(key) and key in result
+        )
+        print(f"  {result['scenario']:<22} {cells}")
+
+
+@click.command()
+@click.option("--size", type=click.Choice(list(SIZES)), default="100k", help="Synthetic export size")
+@click.option("--output", default="benchmark_results.json", help="JSON file the results are written to")
+@click.option("--scenarios", default=None, help="Comma-separated subset of scenarios to run")
+@click.option("--trials", default=10, help="Tuning trials of the tune_lightgbm scenario")
+@click.option("--data-dir", default=None, help="Keep the generated export here and reuse it")
+@click.option("--compare", "baseline", default=None, help="Earlier results file to compare against")
+@click.option("--seed", default=42, help="Seed of the synthetic data")
+def main(
+    size: str,
+    output: str,
+    scenarios: Optional[str],
+    trials: int,
+    data_dir: Optional[str],
+    baseline: Optional[str],
+    seed: int,
+):
+    logging.disable(logging.INFO)
+    n_rows = SIZES[size]
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_dir = data_dir or workdir
+        os.makedirs(csv_dir, exist_ok=True)
+        csv_path = os.path.join(csv_dir, f"olist-{size}-{seed}.csv")
+        if not os.path.exists(csv_path):
+            write_olist_csv(csv_path, n_rows, seed=seed)
+
+        suite = Suite(csv_path, workdir, trials)
+        selected = suite.scenarios()
+        if scenarios:
+            names = [name.strip() for name in scenarios.split(",")]
+            unknown = [name for name in names if name not in selected]
+            if unknown:
+                raise click.BadParameter(f"Unknown scenarios {unknown}, choose from {list(selected)}")
+            selected = {name: selected[name] for name in names}
+
+        results = []
+        for name, scenario in selected.items():
+            with profile(f"benchmark.{name}", reset_peak=True) as block:
+                block.rows = scenario()
+            results.append({"scenario": name, **block.metrics})
+            print(f"  {name:<22} " + "  ".join(f"{k}={v:.3f}" for k, v in block.metrics.items()))
+
+    report = {
+        "commit": _git_commit(),
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "size": size,
+        "rows": n_rows,
+        "seed": seed,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as fid:
+        json.dump(report, fid, indent=2)
+    print(f"Results written to {output}")
+    if baseline:
+        _compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
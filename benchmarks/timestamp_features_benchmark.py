@@ -0,0 +1,51 @@
+"""
+Compares `timestamp_features` with the same features computed row by row
+with `DataFrame.apply`, on parsed and on text timestamps.
+
+    python -m benchmarks.timestamp_features_benchmark --rows 10000
+"""
+import click
+import numpy as np
+import pandas as pd
+
+from benchmarks.utils import measure_inline, print_table
+from model.data_cleaning import TIMESTAMP_INPUT_COLUMNS, TIMESTAMP_INTERVALS, timestamp_features
+from model.synthetic import make_olist_frame
+
+
+def row_wise_features(data: pd.DataFrame) -> pd.DataFrame:
+    """The per-row equivalent of `timestamp_features`."""
+
+    def row_features(row: pd.Series) -> pd.Series:
+        features = {
+            name: (row[end] - row[start]) / pd.Timedelta(1, unit)
+            for name, (start, end, unit) in TIMESTAMP_INTERVALS.items()
+        }
+        purchase = row["order_purchase_timestamp"]
+        features["purchase_weekday"] = purchase.dayofweek if pd.notna(purchase) else np.nan
+        features["purchase_hour"] = purchase.hour if pd.notna(purchase) else np.nan
+        return pd.Series(features, dtype=np.float32)
+
+    return data.apply(row_features, axis=1)
+
+
+@click.command()
+@click.option("--rows", default=10_000, help="Number of orders, the row-wise variant is slow")
+def main(rows: int):
+    text = make_olist_frame(rows)[TIMESTAMP_INPUT_COLUMNS]
+    parsed = text.apply(pd.to_datetime)
+    pd.testing.assert_frame_equal(
+        timestamp_features(parsed.head(1000)), row_wise_features(parsed.head(1000))
+    )
+    print_table(
+        f"Timestamp features, {rows} rows",
+        {
+            "row-wise apply, parsed": measure_inline(row_wise_features, parsed),
+            "vectorized, parsed": measure_inline(timestamp_features, parsed),
+            "vectorized, text": measure_inline(timestamp_features, text),
+        },
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Native `predict` of each trained regressor against its CompiledEnsemble at
+batch sizes 1, 100 and 100k.
+
+    python -m benchmarks.tree_inference_benchmark --rows 100000
+"""
+import time
+
+import click
+import numpy as np
+
+from benchmarks.utils import print_table
+from model.data_cleaning import DataDivideStrategy, DataPreprocessStrategy
+from model.model_dev import LightGBMModel, RandomForestModel, XGBoostModel
+from model.synthetic import make_olist_frame
+from model.tree_inference import compile_model
+
+BATCH_SIZES = (1, 100, 100_000)
+
+
+def _seconds_per_call(predict, batch, min_time: float = 0.5) -> float:
+    calls, start = 0, time.perf_counter()
+    while True:
+        predict(batch)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / calls
+
+
+@click.command()
+@click.option("--rows", default=100_000, help="Number of synthetic training orders")
+def main(rows: int):
+    data = DataPreprocessStrategy().handle_data(make_olist_frame(rows))
+    x_train, x_test, y_train, _ = DataDivideStrategy().handle_data(data)
+    scoring = x_test.sample(max(BATCH_SIZES), replace=True, random_state=0)
+    models = {
+        "lightgbm": LightGBMModel().train(x_train, y_train),
+        "xgboost": XGBoostModel().train(x_train, y_train),
+        "randomforest": RandomForestModel().train(x_train, y_train, n_estimators=100, max_depth=12),
+    }
+    results = {}
+    for name, model in models.items():
+        compiled = compile_model(model)
+        error = np.abs(model.predict(scoring) - compiled.predict(scoring)).max()
+        for size in BATCH_SIZES:
+            batch = scoring[:size]
+            results[f"{name} batch={size}"] = {
+                "native_ms": 1e3 * _seconds_per_call(model.predict, batch),
+                "compiled_ms": 1e3 * _seconds_per_call(compiled.predict, batch),
+                "max_abs_diff": error,
+            }
+    print_table(f"Tree ensemble inference, trained on {rows} rows", results)
+
+
+if __name__ == "__main__":
+    main()
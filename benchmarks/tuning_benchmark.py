@@ -0,0 +1,80 @@
+"""
+Per-trial cost of hyperparameter tuning: the previous sklearn-wrapper trials,
+which re-bin the training frame on every fit, against trials sharing one
+native LightGBM Dataset / XGBoost DMatrix per study.
+
+    python -m benchmarks.tuning_benchmark --rows 100000 --trials 20
+"""
+import time
+
+import click
+import numpy as np
+import optuna
+
+from benchmarks.utils import print_table
+from model.data_cleaning import DataDivideStrategy, DataPreprocessStrategy
+from model.model_dev import (
+    EARLY_STOPPING_ROUNDS,
+    MAX_BOOST_ROUNDS,
+    LightGBMModel,
+    XGBoostModel,
+)
+from model.synthetic import make_olist_frame
+
+
+def _sample_params(model, n_trials: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    max_depth = 20 if isinstance(model, LightGBMModel) else 8
+    return [
+        {
+            "max_depth": int(rng.integers(1, max_depth + 1)),
+            "learning_rate": float(rng.uniform(0.01, 0.3)),
+        }
+        for _ in range(n_trials)
+    ]
+
+
+def wrapper_trials(model, params, x_train, y_train, x_test, y_test) -> float:
+    start = time.perf_counter()
+    for trial_params in params:
+        reg = model.train(
+            x_train,
+            y_train,
+            n_estimators=MAX_BOOST_ROUNDS,
+            eval_set=[(x_test, y_test)],
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+            **trial_params,
+        )
+        reg.score(x_test, y_test)
+    return (time.perf_counter() - start) / len(params)
+
+
+def cached_trials(model, params, x_train, y_train, x_test, y_test) -> float:
+    start = time.perf_counter()
+    for trial_params in params:
+        model.optimize(optuna.trial.FixedTrial(trial_params), x_train, y_train, x_test, y_test)
+    return (time.perf_counter() - start) / len(params)
+
+
+@click.command()
+@click.option("--rows", default=100_000, help="Number of synthetic orders")
+@click.option("--trials", default=20, help="Trials per scenario")
+def main(rows: int, trials: int):
+    data = DataPreprocessStrategy().handle_data(make_olist_frame(rows))
+    x_train, x_test, y_train, y_test = DataDivideStrategy().handle_data(data)
+    splits = (x_train, y_train, x_test, y_test)
+    results = {}
+    for model in (LightGBMModel(), XGBoostModel()):
+        params = _sample_params(model, trials)
+        name = type(model).__name__
+        results[f"{name} sklearn wrapper"] = {
+            "s_per_trial": wrapper_trials(model, params, *splits)
+        }
+        results[f"{name} cached dataset"] = {
+            "s_per_trial": cached_trials(model, params, *splits)
+        }
+    print_table(f"Tuning trials, {rows} rows, {trials} trials", results)
+
+
+if __name__ == "__main__":
+    main()
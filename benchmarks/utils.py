@@ -0,0 +1,54 @@
+import multiprocessing
+import time
+from typing import Any, Callable, Dict
+
+from model.profiling import peak_rss_mib
+
+
+def _run_measured(fn: Callable, args: tuple, queue) -> None:
+    start = time.perf_counter()
+    fn(*args)
+    wall = time.perf_counter() - start
+    queue.put({"wall_s": wall, "peak_rss_mib": peak_rss_mib()})
+
+
+def measure(fn: Callable, *args: Any) -> Dict[str, float]:
+    """
+    Runs `fn(*args)` in a freshly spawned interpreter and returns its wall time
+    and the peak resident set size of that process, so every scenario starts
+    from the same baseline instead of inheriting the caller's heap.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run_measured, args=(fn, args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def print_table(title: str, rows: Dict[str, Dict[str, float]]) -> None:
+    """Prints one line per scenario with all of its measurements."""
+    print(title)
+    for name, values in rows.items():
+        cells = "  ".join(f"{key}={value:.3f}" for key, value in values.items())
+        print(f"  {name:<28} {cells}")
+
+
+def measure_inline(fn: Callable, *args: Any) -> Dict[str, float]:
+    """
+    Runs `fn(*args)` in the current process and returns its wall time and the
+    peak memory allocated while it ran, as traced by tracemalloc (NumPy and
+    pandas buffers included).
+    """
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        fn(*args)
+        wall = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"wall_s": wall, "peak_alloc_mib": peak / 2**20}
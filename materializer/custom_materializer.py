@@ -1,80 +1,88 @@
 import os
-import pickle
-from typing import Any, Type, Union
+import shutil
+import tempfile
+from typing import Any, Type
 
 import numpy as np
 import pandas as pd
-from catboost import CatBoostRegressor
-from lightgbm import LGBMRegressor
-from sklearn.ensemble import RandomForestRegressor
-from xgboost import XGBRegressor
+from sklearn.base import RegressorMixin
+from zenml.enums import ArtifactType
 from zenml.io import fileio
 from zenml.materializers.base_materializer import BaseMaterializer
 
-DEFAULT_FILENAME = "CustomerSatisfactionEnvironment"
+from materializer.serialization import LazyFrame, is_frame_artifact, load_artifact, save_artifact
+
+# Every model the steps return is annotated as a RegressorMixin, so the
+# base class covers them without importing lightgbm, xgboost, catboost and
+# the sklearn ensembles here; `serialization` imports the library of a model
+# only when one is saved or loaded.
+MODEL_TYPES = (RegressorMixin,)
 
 
 class cs_materializer(BaseMaterializer):
     """
     Custom materializer for the Customer Satisfaction Project
+
+    Each artifact is stored in the format that suits its type (see
+    `materializer.serialization`): Arrow IPC for DataFrames and Series,
+    `.npy` for arrays and FeatureMatrix objects and the libraries' own
+    formats for models. Artifacts
+    in a local artifact store are read in place, so arrays and Arrow columns
+    are memory-mapped rather than copied. Steps that annotate an input as
+    `LazyFrame` get a handle that reads DataFrame/Series columns on demand,
+    and any other artifact as it was saved.
     """
 
-    ASSOCIATED_TYPES = (
-        str,
-        np.ndarray,
-        pd.Series,
-        pd.DataFrame,
-        CatBoostRegressor,
-        RandomForestRegressor,
-        LGBMRegressor,
-        XGBRegressor,
-    )
+    ASSOCIATED_TYPES = (str, np.ndarray, pd.Series, pd.DataFrame, LazyFrame) + MODEL_TYPES
+    ASSOCIATED_ARTIFACT_TYPE = ArtifactType.DATA
+
+    @property
+    def _is_local(self) -> bool:
+        return "://" not in self.uri
 
-    def handle_input(
-        self, data_type: Type[Any]
-    ) -> Union[
-        str,
-        np.ndarray,
-        pd.Series,
-        pd.DataFrame,
-        CatBoostRegressor,
-        RandomForestRegressor,
-        LGBMRegressor,
-        XGBRegressor,
-    ]:
+    def load(self, data_type: Type[Any]) -> Any:
         """
-        It loads the model from the artifact and returns it.
+        It loads the artifact and returns it.
 
         Args:
-            data_type: The type of the model to be loaded
+            data_type: The type of the object to be loaded
         """
-        super().handle_input(data_type)
-        filepath = os.path.join(self.artifact.uri, DEFAULT_FILENAME)
-        with fileio.open(filepath, "rb") as fid:
-            obj = pickle.load(fid)
-        return obj
+        lazy = isinstance(data_type, type) and issubclass(data_type, LazyFrame)
+        if self._is_local:
+            lazy = lazy and is_frame_artifact(self.uri)
+            return LazyFrame(self.uri) if lazy else load_artifact(self.uri)
+        if lazy:
+            # the handle reads the local copy after this call returns and
+            # deletes it once it is no longer referenced
+            local_dir = tempfile.mkdtemp()
+            self._download(local_dir)
+            if is_frame_artifact(local_dir):
+                return LazyFrame(local_dir, owns_directory=True)
+            try:
+                return load_artifact(local_dir, mmap=False)
+            finally:
+                shutil.rmtree(local_dir)
+        # remote artifact stores are copied to a local directory first
+        with tempfile.TemporaryDirectory() as local_dir:
+            self._download(local_dir)
+            return load_artifact(local_dir, mmap=False)
 
-    def handle_return(
-        self,
-        obj: Union[
-            str,
-            np.ndarray,
-            pd.Series,
-            pd.DataFrame,
-            CatBoostRegressor,
-            RandomForestRegressor,
-            LGBMRegressor,
-            XGBRegressor,
-        ],
-    ) -> None:
+    def _download(self, local_dir: str) -> None:
+        for name in fileio.listdir(self.uri):
+            fileio.copy(os.path.join(self.uri, str(name)), os.path.join(local_dir, str(name)))
+
+    def save(self, data: Any) -> None:
         """
-        It saves the model to the artifact store.
+        It saves the artifact to the artifact store.
 
         Args:
-            model: The model to be saved
+            data: The object to be saved
         """
-
-        super().handle_return(obj)
-        filepath = os.path.join(self.artifact.uri, DEFAULT_FILENAME)
-        with fileio.open(filepath, "wb") as fid:
-            pickle.dump(obj, fid)
+        if self._is_local:
+            save_artifact(data, self.uri)
+            return
+        with tempfile.TemporaryDirectory() as local_dir:
+            save_artifact(data, local_dir)
+            fileio.makedirs(self.uri)
+            for name in os.listdir(local_dir):
+                fileio.copy(os.path.join(local_dir, name), os.path.join(self.uri, name), overwrite=True)
@@ -0,0 +1,370 @@
+"""
+Type-specific on-disk formats for pipeline artifacts.
+
+Every artifact is a directory holding the payload and a `metadata.json`
+recording which format was used, so it can be read back without knowing
+its type. Only the pickle fallback executes code on load; it is used for
+scikit-learn models, and for LightGBM models with a custom objective, which
+the text format cannot hold.
+"""
+import json
+import os
+import pickle
+import shutil
+import weakref
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+METADATA_FILENAME = "metadata.json"
+PICKLE_FILENAME = "CustomerSatisfactionEnvironment"
+ARROW_FILENAME = "data.arrow"
+# Rows per Arrow record batch, the unit in which LazyFrame streams an artifact.
+ARROW_BATCH_ROWS = 65_536
+
+
+def _class_path(obj: Any) -> str:
+    return f"{type(obj).__module__}.{type(obj).__name__}"
+
+
+def _format_of(obj: Any) -> str:
+    if isinstance(obj, pd.DataFrame):
+        return "arrow"
+    if isinstance(obj, pd.Series):
+        return "arrow_series"
+    if _class_path(obj) == "model.feature_matrix.FeatureMatrix":
+        return "feature_matrix"
+    if isinstance(obj, np.ndarray) and not obj.dtype.hasobject:
+        return "npy"
+    if isinstance(obj, str):
+        return "text"
+    module = type(obj).__module__.split(".")[0]
+    name = type(obj).__name__
+    if module == "lightgbm" and name == "LGBMRegressor":
+        # a callable objective is code, and only a pickle can hold it
+        return "pickle" if callable(obj.get_params()["objective"]) else "lightgbm_lgbmregressor"
+    if module == "lightgbm" and name == "Booster":
+        return "lightgbm_booster"
+    if module == "xgboost" and name in ("XGBRegressor", "Booster"):
+        return f"xgboost_{name.lower()}"
+    if module == "catboost" and name == "CatBoostRegressor":
+        return "catboost"
+    return "pickle"
+
+
+def save_artifact(obj: Any, directory: str) -> str:
+    """
+    Writes `obj` to `directory` in the format matching its type.
+
+    Args:
+        obj: DataFrame, Series, ndarray, FeatureMatrix, str or trained regressor
+        directory: local directory, created if needed
+    Returns:
+        format: name of the format that was used
+    """
+    os.makedirs(directory, exist_ok=True)
+    if isinstance(obj, LazyFrame):
+        obj = obj.to_pandas()
+    fmt = _format_of(obj)
+    metadata = {"format": fmt, "type": _class_path(obj)}
+
+    if fmt in ("arrow", "arrow_series"):
+        import pyarrow as pa
+
+        frame = obj.to_frame(name="values") if fmt == "arrow_series" else obj
+        if fmt == "arrow_series":
+            metadata["name"] = obj.name
+        metadata["num_rows"] = len(obj)
+        table = pa.Table.from_pandas(frame, preserve_index=True)
+        # uncompressed IPC so the columns can be memory-mapped on load
+        with pa.OSFile(os.path.join(directory, ARROW_FILENAME), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=ARROW_BATCH_ROWS)
+    elif fmt == "npy":
+        np.save(os.path.join(directory, "data.npy"), obj, allow_pickle=False)
+    elif fmt == "feature_matrix":
+        # the matrix keeps its memory order, the names go to the metadata
+        np.save(os.path.join(directory, "data.npy"), np.asarray(obj), allow_pickle=False)
+        metadata["columns"] = obj.columns
+    elif fmt == "text":
+        with open(os.path.join(directory, "data.txt"), "w", encoding="utf-8") as fid:
+            fid.write(obj)
+    elif fmt == "lightgbm_lgbmregressor":
+        # the trees `predict` uses, so the rebuilt model needs no best iteration
+        with open(os.path.join(directory, "model.txt"), "w") as fid:
+            fid.write(obj.booster_.model_to_string(num_iteration=obj.best_iteration_ or None))
+        metadata["params"] = obj.get_params()
+        metadata["named_features"] = hasattr(obj, "feature_names_in_")
+    elif fmt == "lightgbm_booster":
+        obj.save_model(os.path.join(directory, "model.txt"))
+    elif fmt in ("xgboost_xgbregressor", "xgboost_booster"):
+        obj.save_model(os.path.join(directory, "model.ubj"))
+    elif fmt == "catboost":
+        obj.save_model(os.path.join(directory, "model.cbm"))
+    else:
+        # scikit-learn models and anything else without a format of its own
+        with open(os.path.join(directory, PICKLE_FILENAME), "wb") as fid:
+            pickle.dump(obj, fid, protocol=pickle.HIGHEST_PROTOCOL)
+
+    with open(os.path.join(directory, METADATA_FILENAME), "w") as fid:
+        json.dump(metadata, fid, default=str)
+    return fmt
+
+
+def _read_metadata(directory: str) -> Optional[dict]:
+    metadata_path = os.path.join(directory, METADATA_FILENAME)
+    if not os.path.exists(metadata_path):
+        return None
+    with open(metadata_path) as fid:
+        return json.load(fid)
+
+
+def is_frame_artifact(directory: str) -> bool:
+    """Whether the artifact in `directory` is a DataFrame or Series a LazyFrame can read."""
+    metadata = _read_metadata(directory)
+    return metadata is not None and metadata["format"] in ("arrow", "arrow_series")
+
+
+def load_artifact(directory: str, mmap: bool = True) -> Any:
+    """
+    Reads an artifact written by `save_artifact`.
+
+    Args:
+        directory: local directory of the artifact
+        mmap: memory-map arrays and Arrow columns instead of reading them
+    Returns:
+        obj: the stored object
+    """
+    metadata = _read_metadata(directory)
+    if metadata is None:
+        # artifacts stored before the formats were split are a single pickle
+        with open(os.path.join(directory, PICKLE_FILENAME), "rb") as fid:
+            return pickle.load(fid)
+    fmt = metadata["format"]
+
+    if fmt in ("arrow", "arrow_series"):
+        return LazyFrame(directory, mmap=mmap).to_pandas()
+    if fmt == "npy":
+        return np.load(os.path.join(directory, "data.npy"), mmap_mode="r" if mmap else None)
+    if fmt == "feature_matrix":
+        from model.feature_matrix import FeatureMatrix
+
+        data = np.load(os.path.join(directory, "data.npy"), mmap_mode="r" if mmap else None)
+        return FeatureMatrix(data, metadata["columns"])
+    if fmt == "text":
+        with open(os.path.join(directory, "data.txt"), encoding="utf-8") as fid:
+            return fid.read()
+    if fmt == "lightgbm_lgbmregressor":
+        import lightgbm as lgb
+
+        booster = lgb.Booster(model_file=os.path.join(directory, "model.txt"))
+        return _lgbm_regressor_from_booster(
+            booster, metadata["params"], metadata.get("named_features", True)
+        )
+    if fmt == "lightgbm_booster":
+        import lightgbm as lgb
+
+        return lgb.Booster(model_file=os.path.join(directory, "model.txt"))
+    if fmt == "xgboost_xgbregressor":
+        import xgboost as xgb
+
+        model = xgb.XGBRegressor()
+        model.load_model(os.path.join(directory, "model.ubj"))
+        return model
+    if fmt == "xgboost_booster":
+        import xgboost as xgb
+
+        return xgb.Booster(model_file=os.path.join(directory, "model.ubj"))
+    if fmt == "catboost":
+        from catboost import CatBoostRegressor
+
+        return CatBoostRegressor().load_model(os.path.join(directory, "model.cbm"))
+    with open(os.path.join(directory, PICKLE_FILENAME), "rb") as fid:
+        return pickle.load(fid)
+
+
+def _lgbm_regressor_from_booster(booster, params: dict, named_features: bool):
+    """
+    Rebuilds a fitted LGBMRegressor around `booster` through the public API
+    alone: a fit continued from the booster on two constant rows whose labels
+    are its own predictions has nothing to learn, so it adds no tree and
+    leaves the wrapper's fitted state set as by the original fit.
+    """
+    import lightgbm as lgb
+
+    names = booster.feature_name()
+    rows = np.zeros((2, len(names)))
+    if named_features:
+        rows = pd.DataFrame(rows, columns=names)
+    model = lgb.LGBMRegressor(**{**params, "n_estimators": 1, "verbose": -1})
+    model.fit(rows, booster.predict(np.zeros((2, len(names)))), init_model=booster)
+    if model.booster_.num_trees() != booster.num_trees():
+        raise RuntimeError("Rebuilding the LGBMRegressor changed its trees")
+    return model.set_params(**params)
+
+
+class LazyFrame:
+    """
+    Handle on a DataFrame or Series artifact stored as Arrow IPC.
+
+    Opening the handle only reads the file footer. `select` narrows it to
+    some columns, the first call to `to_pandas` reads just those columns
+    (memory-mapped by default) and keeps the result, and `iter_batches`
+    streams the rows without ever holding the whole artifact in memory.
+
+    A handle that `owns_directory` deletes it once neither it nor any handle
+    `select`ed from it is referenced any more, or on `close`.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        columns: Optional[List[str]] = None,
+        mmap: bool = True,
+        owns_directory: bool = False,
+    ) -> None:
+        """
+        Args:
+            directory: artifact directory written by `save_artifact`
+            columns: columns to read, defaults to all of them
+            mmap: memory-map the file instead of reading it
+            owns_directory: delete `directory` with the handle, for local
+                copies of remote artifacts
+        """
+        metadata = _read_metadata(directory)
+        if metadata is None or metadata["format"] not in ("arrow", "arrow_series"):
+            raise TypeError(f"{directory} does not hold a DataFrame or Series artifact")
+        self.directory = directory
+        self.is_series = metadata["format"] == "arrow_series"
+        self.name = metadata.get("name")
+        self._num_rows = metadata.get("num_rows")
+        self.mmap = mmap
+        self._path = os.path.join(directory, ARROW_FILENAME)
+        schema = self._open().schema
+        self._index_columns = [
+            c for c in (schema.pandas_metadata or {}).get("index_columns", []) if isinstance(c, str)
+        ]
+        all_columns = [c for c in schema.names if c not in self._index_columns]
+        if columns is not None:
+            unknown = [c for c in columns if c not in all_columns]
+            if unknown:
+                raise KeyError(f"Columns {unknown} are not in the artifact")
+        self._columns = list(columns) if columns is not None else all_columns
+        self._data = None
+        # shared with the handles selected from this one
+        self._cleanup = (
+            weakref.finalize(self, shutil.rmtree, directory, True) if owns_directory else None
+        )
+
+    def _open(self):
+        import pyarrow as pa
+
+        source = pa.memory_map(self._path, "r") if self.mmap else pa.OSFile(self._path, "rb")
+        return pa.ipc.open_file(source)
+
+    def _to_pandas(self, data) -> Union[pd.DataFrame, pd.Series]:
+        frame = data.select(self._columns + self._index_columns).to_pandas()
+        return frame["values"].rename(self.name) if self.is_series else frame
+
+    @property
+    def columns(self) -> List[str]:
+        return [self.name] if self.is_series else list(self._columns)
+
+    def __len__(self) -> int:
+        if self._num_rows is None:
+            reader = self._open()
+            self._num_rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        return self._num_rows
+
+    @property
+    def shape(self) -> tuple:
+        return (len(self),) if self.is_series else (len(self), len(self._columns))
+
+    def select(self, columns: List[str]) -> "LazyFrame":
+        """Returns a handle that only reads `columns`."""
+        selected = LazyFrame(self.directory, columns=columns, mmap=self.mmap)
+        if self._cleanup is not None:
+            # keeps this handle, and so the directory, alive with the selection
+            selected._parent = self
+        return selected
+
+    def close(self) -> None:
+        """Deletes the directory now if the handle owns it."""
+        if self._cleanup is not None:
+            self._cleanup()
+
+    def to_pandas(self) -> Union[pd.DataFrame, pd.Series]:
+        """Reads the selected columns, once."""
+        if self._data is None:
+            self._data = self._to_pandas(self._open().read_all())
+        return self._data
+
+    def iter_batches(self) -> Iterator[Union[pd.DataFrame, pd.Series]]:
+        """Streams the selected columns in chunks of at most ARROW_BATCH_ROWS rows."""
+        reader = self._open()
+        for i in range(reader.num_record_batches):
+            yield self._to_pandas(reader.get_batch(i))
+
+    def to_numpy(self, dtype=None) -> np.ndarray:
+        return self.to_pandas().to_numpy(dtype=dtype)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return self.to_numpy(dtype=dtype)
+
+    def __getitem__(self, key):
+        return self.to_pandas()[key]
+
+    def __repr__(self) -> str:
+        return f"LazyFrame({self.directory!r}, columns={self.columns!r})"
+
+
+def materialize(data: Any) -> Any:
+    """Returns the pandas object behind a LazyFrame, and any other input unchanged."""
+    return data.to_pandas() if isinstance(data, LazyFrame) else data
+
+
+def iter_frames(data: Any) -> Iterator[Any]:
+    """
+    Streams a LazyFrame batch by batch and an array, e.g. a FeatureMatrix,
+    in views of as many rows. Any other input is yielded whole.
+    """
+    if isinstance(data, LazyFrame):
+        yield from data.iter_batches()
+    elif isinstance(data, np.ndarray) and data.ndim > 0:
+        for start in range(0, max(len(data), 1), ARROW_BATCH_ROWS):
+            yield data[start : start + ARROW_BATCH_ROWS]
+    else:
+        yield data
+
+
+def iter_frame_pairs(features: Any, target: Any) -> Iterator[Tuple[Any, Any]]:
+    """
+    Streams features and target side by side with `iter_frames` and raises
+    a ValueError as soon as their rows stop lining up, rather than dropping
+    the rows left over in the longer one.
+
+    An array of features, e.g. a FeatureMatrix, is sliced by the lengths of
+    the target batches, whatever batches the target artifact was read in.
+    """
+    if isinstance(features, np.ndarray) and features.ndim > 0:
+        pairs = _slice_like(features, iter_frames(target))
+    else:
+        pairs = zip(iter_frames(features), iter_frames(target), strict=True)
+    for batch, (feature_batch, target_batch) in enumerate(pairs):
+        if len(feature_batch) != len(target_batch):
+            raise ValueError(
+                f"Batch {batch} has {len(feature_batch)} feature rows but "
+                f"{len(target_batch)} target rows"
+            )
+        yield feature_batch, target_batch
+
+
+def _slice_like(array: np.ndarray, batches: Iterator[Any]) -> Iterator[Tuple[np.ndarray, Any]]:
+    """Pairs every batch with a view of as many of the next rows of `array`."""
+    start = 0
+    for batch in batches:
+        yield array[start : start + len(batch)], batch
+        start += len(batch)
+    if start != len(array):
+        raise ValueError(f"The features have {len(array)} rows but the target has {start}")
@@ -0,0 +1,170 @@
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from model.data_cleaning import PREPROCESSOR_PATH, DataPreprocessStrategy
+from model.data_ingestion import FEATURE_COLUMNS, IngestData
+from model.model_loader import MODEL_PATH, load_model
+
+PREDICTIONS_PATH = "./data/predictions.parquet"
+PREDICTION_COLUMN = "prediction"
+
+# model and preprocessor of a scoring worker, loaded once by `_init_worker`
+_worker_state = {}
+
+
+def _init_worker(model_uri: str, preprocessor_path: Optional[str]) -> None:
+    _worker_state["model"] = load_model(model_uri)
+    _worker_state["preprocessor"] = (
+        DataPreprocessStrategy.load(preprocessor_path) if preprocessor_path else None
+    )
+
+
+def score_chunk(
+    chunk: pd.DataFrame,
+    model,
+    preprocessor: Optional[DataPreprocessStrategy] = None,
+    id_columns: Iterable[str] = (),
+) -> pd.DataFrame:
+    """
+    Scores one chunk with a single vectorized `predict` call.
+
+    Args:
+        chunk: rows with at least the preprocessor's `input_columns`, or the
+            model feature columns without a preprocessor
+        model: regressor exposing `predict`
+        preprocessor: fitted DataPreprocessStrategy deriving and imputing
+            the features
+        id_columns: columns of `chunk` copied next to the prediction
+    Returns:
+        result: `id_columns` plus the prediction, one row per input row
+    """
+    if preprocessor is not None:
+        features = preprocessor.transform(chunk[preprocessor.input_columns])
+    else:
+        features = chunk[FEATURE_COLUMNS]
+    prediction = np.asarray(model.predict(features), dtype=np.float64)
+    result = chunk[list(id_columns)].reset_index(drop=True)
+    result[PREDICTION_COLUMN] = prediction.ravel()
+    return result
+
+
+def _score_chunk(chunk: pd.DataFrame, id_columns: List[str]) -> pd.DataFrame:
+    return score_chunk(chunk, _worker_state["model"], _worker_state["preprocessor"], id_columns)
+
+
+class BatchScorer:
+    """
+    Offline scoring of large files with the model artifact itself, without
+    going through the prediction server.
+
+    The input is streamed in chunks, every chunk is imputed with the medians
+    fitted at training time and scored in a pool of worker processes that
+    each load the model once, and the predictions are appended to a Parquet
+    file in input order.
+    """
+
+    def __init__(
+        self,
+        model_uri: str = MODEL_PATH,
+        preprocessor_path: Optional[str] = PREPROCESSOR_PATH,
+        chunksize: int = 100_000,
+        n_workers: int = 1,
+    ) -> None:
+        """
+        Args:
+            model_uri: model to score with, see `load_model`
+            preprocessor_path: saved DataPreprocessStrategy; None, or a path
+                that does not exist, scores the features as they are read
+            chunksize: rows read and scored at a time
+            n_workers: scoring processes, 1 scores in the calling process
+        """
+        self.model_uri = model_uri
+        if preprocessor_path is not None and not os.path.exists(preprocessor_path):
+            logging.warning(f"No preprocessor at {preprocessor_path}, scoring raw features")
+            preprocessor_path = None
+        self.preprocessor_path = preprocessor_path
+        self.chunksize = chunksize
+        self.n_workers = n_workers
+
+    def score_chunks(
+        self, chunks: Iterable[pd.DataFrame], id_columns: List[str]
+    ) -> Iterator[pd.DataFrame]:
+        """Scores `chunks`, yielding `id_columns` plus the prediction in input order."""
+        initargs = (self.model_uri, self.preprocessor_path)
+        if self.n_workers <= 1:
+            _init_worker(*initargs)
+            for chunk in chunks:
+                yield _score_chunk(chunk, id_columns)
+            return
+
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=self.n_workers, mp_context=ctx, initializer=_init_worker, initargs=initargs
+        ) as executor:
+            # bound the chunks in flight so memory does not grow with the input
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_score_chunk, chunk, id_columns))
+                if len(pending) >= 2 * self.n_workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def score_file(
+        self,
+        input_path: str,
+        output_path: str = PREDICTIONS_PATH,
+        id_columns: Optional[List[str]] = None,
+    ) -> int:
+        """
+        Scores every row of the CSV export at `input_path`.
+
+        Args:
+            input_path: CSV file with at least the columns the preprocessor
+                reads, see `DataPreprocessStrategy.input_columns`
+            output_path: Parquet file the predictions are written to
+            id_columns: input columns copied next to each prediction
+        Returns:
+            n_rows: number of rows scored
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        id_columns = list(id_columns or [])
+        input_columns = FEATURE_COLUMNS
+        if self.preprocessor_path is not None:
+            input_columns = DataPreprocessStrategy.load(self.preprocessor_path).input_columns
+        columns = id_columns + [c for c in input_columns if c not in id_columns]
+        chunks = IngestData(input_path, columns=columns).iter_chunks(self.chunksize)
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        n_rows, writer = 0, None
+        try:
+            for result in self.score_chunks(chunks, id_columns):
+                table = pa.Table.from_pandas(result, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                writer.write_table(table)
+                n_rows += len(result)
+            if writer is None:
+                raise ValueError(f"No rows to score in {input_path}")
+            writer.close()
+            os.replace(tmp_path, output_path)
+        except Exception as e:
+            logging.error(f"Error while scoring {input_path}: {str(e)}")
+            if writer is not None:
+                writer.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise e
+        logging.info(f"Scored {n_rows} rows of {input_path} into {output_path}")
+        return n_rows
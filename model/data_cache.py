@@ -0,0 +1,153 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import pandas as pd
+
+CACHE_DIR = "./.cache/ingest"
+
+# Bump when the on-disk layout changes so older entries are never read back.
+CACHE_FORMAT_VERSION = 1
+
+
+def _digest(payload: str, length: int = 16) -> str:
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:length]
+
+
+class DatasetCache:
+    """
+    Parquet cache of parsed source files.
+
+    Entries are named `<stem>-<path hash>-<source fingerprint>-<schema hash>.parquet`.
+    The source fingerprint is built from the file size and modification time
+    (plus a content hash when `verify_content` is set), so touching or
+    replacing the source invalidates every entry derived from it. Entries of
+    older versions of a source are evicted as soon as a new one is written.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, verify_content: bool = False) -> None:
+        """
+        Args:
+            cache_dir: directory holding the cached Parquet files
+            verify_content: hash the full source content into the fingerprint
+                instead of trusting size and modification time alone
+        """
+        self.cache_dir = cache_dir
+        self.verify_content = verify_content
+
+    def fingerprint(self, source: str) -> str:
+        """Returns the fingerprint of the current version of `source`."""
+        stat = os.stat(source)
+        parts = [str(CACHE_FORMAT_VERSION), str(stat.st_size), str(stat.st_mtime_ns)]
+        if self.verify_content:
+            sha = hashlib.sha256()
+            with open(source, "rb") as fid:
+                for block in iter(lambda: fid.read(1 << 20), b""):
+                    sha.update(block)
+            parts.append(sha.hexdigest())
+        return _digest("|".join(parts))
+
+    def _prefix(self, source: str) -> str:
+        stem = os.path.splitext(os.path.basename(source))[0]
+        return os.path.join(self.cache_dir, f"{stem}-{_digest(os.path.abspath(source), 8)}")
+
+    def path_for(self, source: str, schema: Dict[str, Any], fingerprint: Optional[str] = None) -> str:
+        """
+        Returns the cache file path for `source` read with `schema`.
+
+        Args:
+            source: path of the source file
+            schema: description of how the source is parsed
+            fingerprint: `fingerprint(source)` when the caller already has it
+        """
+        if fingerprint is None:
+            fingerprint = self.fingerprint(source)
+        schema_key = _digest(json.dumps(schema, sort_keys=True, default=str))
+        return f"{self._prefix(source)}-{fingerprint}-{schema_key}.parquet"
+
+    def lookup(self, source: str, schema: Dict[str, Any], fingerprint: Optional[str] = None) -> Optional[str]:
+        """Returns the path of a valid cache entry, or None on a miss."""
+        path = self.path_for(source, schema, fingerprint)
+        return path if os.path.exists(path) else None
+
+    def get_or_create(
+        self,
+        source: str,
+        schema: Dict[str, Any],
+        loader: Callable[[], pd.DataFrame],
+    ) -> pd.DataFrame:
+        """
+        Reads `source` from the cache, or parses it with `loader` and stores
+        the result for the next call.
+
+        Args:
+            source: path of the source file
+            schema: description of how the source is parsed, part of the key
+            loader: parses the source when there is no valid entry
+        """
+        # computed once, it hashes the whole source with `verify_content`
+        fingerprint = self.fingerprint(source)
+        path = self.lookup(source, schema, fingerprint)
+        if path is not None:
+            logging.info(f"Reading {source} from cache entry {path}")
+            return pd.read_parquet(path)
+
+        df = loader()
+        self.store(source, schema, df, fingerprint)
+        return df
+
+    def iter_batches(self, path: str, batch_size: int) -> Iterator[pd.DataFrame]:
+        """Streams a cache entry back in DataFrames of at most `batch_size` rows."""
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=batch_size):
+            yield batch.to_pandas()
+
+    def store(
+        self,
+        source: str,
+        schema: Dict[str, Any],
+        df: pd.DataFrame,
+        fingerprint: Optional[str] = None,
+    ) -> str:
+        """
+        Writes `df` as the cache entry of `source` and evicts stale versions.
+
+        Args:
+            source: path of the source file
+            schema: description of how the source is parsed
+            df: parsed source
+            fingerprint: version of `source` that `df` was parsed from,
+                defaults to the current one
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if fingerprint is None:
+            fingerprint = self.fingerprint(source)
+        path = self.path_for(source, schema, fingerprint)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        self.evict_stale(source, fingerprint)
+        logging.info(f"Cached {source} at {path}")
+        return path
+
+    def evict_stale(self, source: str, fingerprint: Optional[str] = None) -> None:
+        """
+        Removes entries built from any version of `source` but `fingerprint`,
+        by default the current one.
+        """
+        if fingerprint is None:
+            fingerprint = self.fingerprint(source)
+        current = f"{self._prefix(source)}-{fingerprint}-"
+        for path in glob.glob(f"{glob.escape(self._prefix(source))}-*.parquet"):
+            if not path.startswith(current):
+                os.remove(path)
+
+    def invalidate(self, source: str) -> None:
+        """Removes every cache entry of `source`."""
+        for path in glob.glob(f"{glob.escape(self._prefix(source))}-*.parquet"):
+            os.remove(path)
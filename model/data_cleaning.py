@@ -1,10 +1,37 @@
+import json
 import logging
+import os
 from abc import ABC, abstractmethod
-from typing import Union
+from typing import Callable, Dict, Iterable, List, Optional, Union
 
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+
+from model.data_ingestion import FEATURE_COLUMNS, TARGET_COLUMN
+from model.feature_matrix import FeatureMatrix
+from model.profiling import profiled
+
+# Imputation statistics fitted by the training pipeline, reused at inference.
+PREPROCESSOR_PATH = "./saved_model/preprocessor.json"
+
+# Elapsed time between two order timestamps: feature -> (start, end, unit).
+TIMESTAMP_INTERVALS = {
+    "delivery_days": ("order_purchase_timestamp", "order_delivered_customer_date", "D"),
+    "approval_hours": ("order_purchase_timestamp", "order_approved_at", "h"),
+    "delivery_vs_estimate_days": (
+        "order_estimated_delivery_date",
+        "order_delivered_customer_date",
+        "D",
+    ),
+}
+TIMESTAMP_FEATURE_COLUMNS = list(TIMESTAMP_INTERVALS) + ["purchase_weekday", "purchase_hour"]
+# Timestamps the features are derived from.
+TIMESTAMP_INPUT_COLUMNS = [
+    "order_purchase_timestamp",
+    "order_approved_at",
+    "order_delivered_customer_date",
+    "order_estimated_delivery_date",
+]
 
 
 class DataStrategy(ABC):
@@ -16,56 +43,330 @@ class DataStrategy(ABC):
     def handle_data(self, data: pd.DataFrame) -> Union[pd.DataFrame, pd.Series]:
         pass
 
+    def handle_stream(
+        self, chunk_source: Callable[[], Iterable[pd.DataFrame]], output_dir: str
+    ) -> List[str]:
+        raise NotImplementedError(f"{type(self).__name__} does not support streaming")
+
+
+class StreamingMedian:
+    """
+    Median of a stream of values, computed from merged value counts.
+
+    At most `max_bins` counts are kept, so memory is bounded by the chunk
+    size whatever the number of rows. The result is exact as long as there
+    are no more distinct values than that; beyond it, values are binned to
+    multiples of a power-of-two `resolution`, doubled until the counts fit
+    again, and the error stays below `resolution`. When `decimals` is set,
+    values are also rounded before counting, which adds an error below half
+    a unit of the last kept decimal.
+    """
+
+    def __init__(self, decimals: Optional[int] = None, max_bins: Optional[int] = 4096) -> None:
+        """
+        Args:
+            decimals: round values to this many decimals before counting
+            max_bins: most distinct values counted, None for an exact median
+                whose memory grows with the number of distinct values
+        """
+        self.decimals = decimals
+        self.max_bins = max_bins
+        self.resolution = 0.0
+        self.counts = pd.Series(dtype=np.int64)
+
+    def _bin(self, values: pd.Series) -> pd.Series:
+        return (values / self.resolution).round() * self.resolution
+
+    def update(self, values: pd.Series) -> None:
+        """Adds the non-missing values of one chunk."""
+        if self.decimals is not None:
+            values = values.round(self.decimals)
+        if self.resolution:
+            values = self._bin(values)
+        chunk_counts = values.value_counts(dropna=True)
+        self.counts = self.counts.add(chunk_counts, fill_value=0).astype(np.int64)
+        if self.max_bins is not None and len(self.counts) > self.max_bins:
+            self._coarsen()
+
+    def _coarsen(self) -> None:
+        values = self.counts.index.to_series(index=self.counts.index)
+        span = float(values.max() - values.min())
+        # the smallest power of two that could fit the span into max_bins
+        resolution = 2.0 ** np.ceil(np.log2(max(span, np.finfo(float).tiny) / self.max_bins))
+        self.resolution = max(resolution, 2 * self.resolution)
+        while True:
+            counts = self.counts.groupby(self._bin(values)).sum()
+            if len(counts) <= self.max_bins:
+                break
+            self.resolution *= 2
+        self.counts = counts.astype(np.int64)
+
+    def result(self) -> float:
+        """Returns the median, averaging the two middle values for even counts."""
+        total = int(self.counts.sum())
+        if total == 0:
+            return float("nan")
+        counts = self.counts.sort_index()
+        cumulative = counts.to_numpy().cumsum()
+        lower, upper = np.searchsorted(cumulative, [(total - 1) // 2 + 1, total // 2 + 1])
+        values = counts.index.to_numpy(dtype=np.float64)
+        return float((values[lower] + values[upper]) / 2)
+
+
+def _to_datetime64(values: pd.Series) -> np.ndarray:
+    """Timestamps as datetime64[s], parsing them first when they were read as text."""
+    if not pd.api.types.is_datetime64_any_dtype(values):
+        values = pd.to_datetime(values, errors="coerce")
+    return values.to_numpy(dtype="datetime64[s]")
+
+
+def timestamp_features(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Derives the TIMESTAMP_FEATURE_COLUMNS from the order timestamps with
+    whole-column datetime64 arithmetic.
+
+    This is the single definition used when training and when scoring, so
+    both compute the same features. Text timestamps, as in JSON requests or
+    CSVs read without `parse_timestamps`, are parsed first. A missing
+    timestamp, e.g. the delivery date of an order still in transit, gives a
+    missing feature.
+
+    Args:
+        data: DataFrame with the TIMESTAMP_INPUT_COLUMNS
+    Returns:
+        features: float32 DataFrame with the same index as `data`
+    """
+    stamps = {column: _to_datetime64(data[column]) for column in TIMESTAMP_INPUT_COLUMNS}
+    features = {
+        name: ((stamps[end] - stamps[start]) / np.timedelta64(1, unit)).astype(np.float32)
+        for name, (start, end, unit) in TIMESTAMP_INTERVALS.items()
+    }
+
+    purchase = stamps["order_purchase_timestamp"]
+    missing = np.isnat(purchase)
+    purchase = np.where(missing, np.datetime64(0, "s"), purchase)
+    days = purchase.astype("datetime64[D]")
+    # 1970-01-01 was a Thursday, so Monday is 0 as in pandas' dayofweek
+    weekday = ((days.astype(np.int64) + 3) % 7).astype(np.float32)
+    hour = ((purchase - days) // np.timedelta64(1, "h")).astype(np.float32)
+    weekday[missing] = np.nan
+    hour[missing] = np.nan
+    features["purchase_weekday"] = weekday
+    features["purchase_hour"] = hour
+    return pd.DataFrame(features, index=data.index)
+
+
+class TimestampFeatureStrategy(DataStrategy):
+    """
+    Feature engineering strategy which appends the TIMESTAMP_FEATURE_COLUMNS
+    derived by `timestamp_features` to the data.
+    """
+
+    def handle_data(self, data: pd.DataFrame) -> pd.DataFrame:
+        try:
+            return data.assign(**timestamp_features(data))
+        except Exception as e:
+            logging.error(e)
+            raise e
+
 
 class DataPreprocessStrategy(DataStrategy):
     """
     Data preprocessing strategy which preprocesses the data.
+
+    The imputation medians are learned once by `fit` and reused by every
+    `transform`, so batches scored at inference time are filled with the
+    training statistics instead of their own.
+
+    With `timestamp_features`, the features of `TimestampFeatureStrategy`
+    are added to the model features, and imputed like the dimensions. The
+    flag is saved with the medians, so scoring with a loaded strategy
+    derives the same features from the raw timestamps.
     """
 
+    IMPUTED_COLUMNS = [
+        "product_weight_g",
+        "product_length_cm",
+        "product_height_cm",
+        "product_width_cm",
+    ]
+
+    def __init__(
+        self, medians: Optional[Dict[str, float]] = None, timestamp_features: bool = False
+    ) -> None:
+        """
+        Args:
+            medians: previously fitted imputation values, keyed by column
+            timestamp_features: also derive the TIMESTAMP_FEATURE_COLUMNS
+        """
+        self.medians = medians
+        self.timestamp_features = timestamp_features
+
+    @property
+    def feature_columns(self) -> List[str]:
+        """Model input columns, in order."""
+        if self.timestamp_features:
+            return FEATURE_COLUMNS + TIMESTAMP_FEATURE_COLUMNS
+        return list(FEATURE_COLUMNS)
+
+    @property
+    def input_columns(self) -> List[str]:
+        """Columns `transform` reads from the raw data, besides the target."""
+        if self.timestamp_features:
+            return FEATURE_COLUMNS + TIMESTAMP_INPUT_COLUMNS
+        return list(FEATURE_COLUMNS)
+
+    @property
+    def imputed_columns(self) -> List[str]:
+        if self.timestamp_features:
+            return self.IMPUTED_COLUMNS + TIMESTAMP_FEATURE_COLUMNS
+        return list(self.IMPUTED_COLUMNS)
+
+    def _with_features(self, data: pd.DataFrame) -> pd.DataFrame:
+        if self.timestamp_features:
+            return TimestampFeatureStrategy().handle_data(data)
+        return data
+
+    def fit(self, data: pd.DataFrame) -> "DataPreprocessStrategy":
+        """Computes the medians of all imputed columns in one vectorized pass."""
+        return self._fit_featured(self._with_features(data))
+
+    def _fit_featured(self, featured: pd.DataFrame) -> "DataPreprocessStrategy":
+        medians = featured[self.imputed_columns].median()
+        self.medians = {column: float(value) for column, value in medians.items()}
+        return self
+
+    def transform(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Keeps the model features (and the target when present) and fills
+        missing values with the fitted medians.
+        """
+        return self._transform_featured(self._with_features(data))
+
+    def _transform_featured(self, featured: pd.DataFrame) -> pd.DataFrame:
+        if self.medians is None:
+            raise RuntimeError("DataPreprocessStrategy must be fitted before transform")
+        columns = self.feature_columns
+        if TARGET_COLUMN in featured:
+            columns.append(TARGET_COLUMN)
+        return featured[columns].fillna(self.medians)
+
     def handle_data(self, data: pd.DataFrame) -> pd.DataFrame:
         """
-        Removes columns which are not required, fills missing values with median average values, and converts the data type to float.
+        Removes columns which are not required and fills missing values with median average values.
+        Fits the medians on `data` first unless they were already fitted.
         """
         try:
-            data = data.drop(
-                [
-                    "order_approved_at",
-                    "order_delivered_carrier_date",
-                    "order_delivered_customer_date",
-                    "order_estimated_delivery_date",
-                    "order_purchase_timestamp",
-                ],
-                axis=1,
-            )
-            data["product_weight_g"].fillna(data["product_weight_g"].median(), inplace=True)
-            data["product_length_cm"].fillna(data["product_length_cm"].median(), inplace=True)
-            data["product_height_cm"].fillna(data["product_height_cm"].median(), inplace=True)
-            data["product_width_cm"].fillna(data["product_width_cm"].median(), inplace=True)
-            # write "No review" in review_comment_message column
-            data["review_comment_message"].fillna("No review", inplace=True)
-
-            data = data.select_dtypes(include=[np.number])
-            cols_to_drop = ["customer_zip_code_prefix", "order_item_id"]
-            data = data.drop(cols_to_drop, axis=1)
-
-            return data
+            # the timestamp features are derived once for both passes
+            featured = self._with_features(data)
+            if self.medians is None:
+                self._fit_featured(featured)
+            return self._transform_featured(featured)
         except Exception as e:
             logging.error(e)
             raise e
 
+    def fit_chunks(
+        self, chunks: Iterable[pd.DataFrame], decimals: Optional[int] = None
+    ) -> "DataPreprocessStrategy":
+        """
+        Computes the medians over a stream of chunks with bounded memory.
+
+        Args:
+            chunks: iterable of DataFrames holding the `input_columns`
+            decimals: round values to this many decimals before counting, see
+                `StreamingMedian` for the resulting error bound
+        """
+        sketches = {column: StreamingMedian(decimals) for column in self.imputed_columns}
+        for chunk in chunks:
+            chunk = self._with_features(chunk)
+            for column, sketch in sketches.items():
+                sketch.update(chunk[column])
+        self.medians = {column: sketch.result() for column, sketch in sketches.items()}
+        return self
+
+    def transform_chunks(self, chunks: Iterable[pd.DataFrame], output_dir: str) -> List[str]:
+        """
+        Transforms every chunk and writes it to `output_dir` as a numbered
+        Parquet part, so only one chunk is held in memory at a time.
+
+        Returns:
+            paths: the written parts, in input order
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        for stale in os.listdir(output_dir):
+            if stale.startswith("part-") and stale.endswith(".parquet"):
+                os.remove(os.path.join(output_dir, stale))
+        paths = []
+        for index, chunk in enumerate(chunks):
+            path = os.path.join(output_dir, f"part-{index:05d}.parquet")
+            self.transform(chunk).to_parquet(path, index=False)
+            paths.append(path)
+        return paths
+
+    def handle_stream(
+        self, chunk_source: Callable[[], Iterable[pd.DataFrame]], output_dir: str
+    ) -> List[str]:
+        """
+        Out-of-core counterpart of `handle_data`. The source is read twice,
+        once to fit the medians (unless already fitted) and once to write the
+        cleaned chunks, so it must return a fresh iterator on every call,
+        e.g. `lambda: IngestData().iter_chunks(100_000)`.
+        """
+        try:
+            if self.medians is None:
+                self.fit_chunks(chunk_source())
+            return self.transform_chunks(chunk_source(), output_dir)
+        except Exception as e:
+            logging.error(e)
+            raise e
+
+    def save(self, path: str) -> None:
+        """Stores the fitted medians and the feature options as JSON."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as fid:
+            json.dump(
+                {"medians": self.medians, "timestamp_features": self.timestamp_features},
+                fid,
+                indent=2,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "DataPreprocessStrategy":
+        """Restores a strategy fitted at training time."""
+        with open(path) as fid:
+            saved = json.load(fid)
+        # preprocessors saved before the timestamp features have no flag
+        return cls(saved["medians"], saved.get("timestamp_features", False))
+
 
 class DataDivideStrategy(DataStrategy):
     """
     Data dividing strategy which divides the data into train and test data.
+
+    With `feature_matrix`, the features are returned as float32
+    FeatureMatrix objects instead of DataFrames; the targets stay Series.
     """
 
+    def __init__(self, feature_matrix: bool = False) -> None:
+        """
+        Args:
+            feature_matrix: return the features as FeatureMatrix objects
+        """
+        self.feature_matrix = feature_matrix
+
     def handle_data(self, data: pd.DataFrame) -> Union[pd.DataFrame, pd.Series]:
         """
         Divides the data into train and test data.
         """
+        from sklearn.model_selection import train_test_split
+
         try:
             X = data.drop("review_score", axis=1)
             y = data["review_score"]
+            if self.feature_matrix:
+                # converted once, the split then only selects rows
+                X = FeatureMatrix.from_frame(X)
             X_train, X_test, y_train, y_test = train_test_split(
                 X, y, test_size=0.2, random_state=42
             )
@@ -80,11 +381,67 @@ class DataCleaning:
     Data cleaning class which preprocesses the data and divides it into train and test data.
     """
 
-    def __init__(self, data: pd.DataFrame, strategy: DataStrategy) -> None:
-        """Initializes the DataCleaning class with a specific strategy."""
+    def __init__(self, data: Optional[pd.DataFrame], strategy: DataStrategy) -> None:
+        """
+        Initializes the DataCleaning class with a specific strategy. `data`
+        may be None when the data is only streamed with `handle_stream`.
+        """
         self.df = data
         self.strategy = strategy
 
+    @profiled(rows_from="self.df")
     def handle_data(self) -> Union[pd.DataFrame, pd.Series]:
         """Handle data based on the provided strategy"""
         return self.strategy.handle_data(self.df)
+
+    def handle_stream(
+        self, chunk_source: Callable[[], Iterable[pd.DataFrame]], output_dir: str
+    ) -> List[str]:
+        """
+        Streams the chunks of `chunk_source`, a callable returning a fresh
+        iterator of chunks on every call, through the strategy and writes the
+        result to `output_dir`.
+        """
+        return self.strategy.handle_stream(chunk_source, output_dir)
+
+
+def preprocess(
+    data: pd.DataFrame,
+    reuse_preprocessor: bool = False,
+    timestamp_features: Optional[bool] = None,
+    save_preprocessor: bool = False,
+    preprocessor_path: str = PREPROCESSOR_PATH,
+) -> pd.DataFrame:
+    """
+    Preprocesses `data` with a freshly fitted or the saved preprocessor.
+
+    Only training runs pass `save_preprocessor`: the saved preprocessor is
+    what serving, batch scoring and warm starts read, so inference runs must
+    never replace it with one fitted on their own batch.
+
+    Args:
+        data: raw rows holding the preprocessor's `input_columns`
+        reuse_preprocessor: apply the preprocessor at `preprocessor_path`
+            instead of fitting one on `data`
+        timestamp_features: also derive the TIMESTAMP_FEATURE_COLUMNS; when
+            the saved preprocessor is reused, None follows it and a flag
+            that differs from it is an error
+        save_preprocessor: store the fitted preprocessor at `preprocessor_path`
+        preprocessor_path: JSON file written by `DataPreprocessStrategy.save`
+    Returns:
+        preprocessed: the model features and the target
+    """
+    if reuse_preprocessor:
+        strategy = DataPreprocessStrategy.load(preprocessor_path)
+        if timestamp_features is not None and strategy.timestamp_features != timestamp_features:
+            # the warm-started trees were grown on the saved features
+            raise ValueError(
+                f"timestamp_features={timestamp_features} was requested, but the saved "
+                f"preprocessor has timestamp_features={strategy.timestamp_features}"
+            )
+    else:
+        strategy = DataPreprocessStrategy(timestamp_features=bool(timestamp_features))
+    preprocessed = DataCleaning(data, strategy).handle_data()
+    if save_preprocessor and not reuse_preprocessor:
+        strategy.save(preprocessor_path)
+    return preprocessed
@@ -0,0 +1,158 @@
+import logging
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from model.data_cache import DatasetCache
+
+DATA_PATH = "./data/olist_customers_dataset.csv"
+
+# The twelve numeric features the models are trained on, in model input order.
+FEATURE_COLUMNS = [
+    "payment_sequential",
+    "payment_installments",
+    "payment_value",
+    "price",
+    "freight_value",
+    "product_name_lenght",
+    "product_description_lenght",
+    "product_photos_qty",
+    "product_weight_g",
+    "product_length_cm",
+    "product_height_cm",
+    "product_width_cm",
+]
+TARGET_COLUMN = "review_score"
+
+TIMESTAMP_COLUMNS = [
+    "order_purchase_timestamp",
+    "order_approved_at",
+    "order_delivered_carrier_date",
+    "order_delivered_customer_date",
+    "order_estimated_delivery_date",
+]
+# Fixed category sets keep the categorical codes stable across chunks and files.
+CATEGORICAL_DTYPES = {
+    "order_status": pd.CategoricalDtype(
+        [
+            "approved",
+            "canceled",
+            "created",
+            "delivered",
+            "invoiced",
+            "processing",
+            "shipped",
+            "unavailable",
+        ]
+    ),
+    "payment_type": pd.CategoricalDtype(
+        ["boleto", "credit_card", "debit_card", "not_defined", "voucher"]
+    ),
+    "customer_state": pd.CategoricalDtype(
+        [
+            "AC", "AL", "AM", "AP", "BA", "CE", "DF", "ES", "GO", "MA", "MG",
+            "MS", "MT", "PA", "PB", "PE", "PI", "PR", "RJ", "RN", "RO", "RR",
+            "RS", "SC", "SE", "SP", "TO",
+        ]
+    ),
+}
+
+# Every feature can be missing in the Olist export (orders without payment or
+# product rows), so integer-valued columns are read as float32 as well.
+COLUMN_DTYPES: Dict[str, Any] = {
+    **{column: "float32" for column in FEATURE_COLUMNS},
+    TARGET_COLUMN: "float32",
+    **CATEGORICAL_DTYPES,
+}
+
+
+class IngestData:
+    """
+    Reads the Olist order export with an explicit schema.
+
+    Only the requested columns are parsed, numeric columns are downcast to
+    float32 and low-cardinality strings are stored as categorical codes.
+    """
+
+    def __init__(
+        self,
+        data_path: str = DATA_PATH,
+        columns: Optional[List[str]] = None,
+        parse_timestamps: bool = False,
+        cache: Optional[DatasetCache] = None,
+    ) -> None:
+        """
+        Args:
+            data_path: path of the CSV export, or an open file-like object
+            columns: columns to read, defaults to the model features and target;
+                the CATEGORICAL_DTYPES columns are read with their fixed categories
+            parse_timestamps: also read the order timestamp columns as datetimes
+            cache: serve repeated reads of an unchanged export from this cache,
+                ignored for file-like objects, which have no version to key on
+        """
+        self.data_path = data_path
+        self.cache = cache if isinstance(data_path, (str, os.PathLike)) else None
+        if columns is None:
+            columns = FEATURE_COLUMNS + [TARGET_COLUMN]
+        self.columns = list(columns)
+        if parse_timestamps:
+            self.columns += [c for c in TIMESTAMP_COLUMNS if c not in self.columns]
+        self.parse_dates = [c for c in TIMESTAMP_COLUMNS if c in self.columns]
+
+    @property
+    def dtypes(self) -> Dict[str, Any]:
+        """dtype of every projected column that has an explicit schema entry"""
+        return {c: COLUMN_DTYPES[c] for c in self.columns if c in COLUMN_DTYPES}
+
+    @property
+    def schema(self) -> Dict[str, Any]:
+        """Everything that determines the parsed result, used as cache key"""
+        return {
+            "columns": self.columns,
+            "dtypes": {c: str(dtype) for c, dtype in self.dtypes.items()},
+            "parse_dates": self.parse_dates,
+        }
+
+    def _read_csv(self, **kwargs):
+        if isinstance(self.data_path, str) and not os.path.exists(self.data_path):
+            raise FileNotFoundError(f"Data file not found at {self.data_path}")
+        return pd.read_csv(
+            self.data_path,
+            usecols=self.columns,
+            dtype=self.dtypes,
+            parse_dates=self.parse_dates,
+            **kwargs,
+        )
+
+    def get_data(self) -> pd.DataFrame:
+        """Reads the whole projected dataset into a single DataFrame."""
+        try:
+            if self.cache is not None:
+                return self.cache.get_or_create(
+                    self.data_path, self.schema, lambda: self._read_csv()[self.columns]
+                )
+            df = self._read_csv()
+            return df[self.columns]
+        except Exception as e:
+            logging.error(f"Error while ingesting {self.data_path}: {str(e)}")
+            raise e
+
+    def iter_chunks(self, chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+        """
+        Streams the projected dataset in chunks of at most `chunksize` rows so
+        peak memory is bounded by the chunk size rather than the file size.
+        """
+        try:
+            cached = None
+            if self.cache is not None:
+                cached = self.cache.lookup(self.data_path, self.schema)
+            if cached is not None:
+                yield from self.cache.iter_batches(cached, chunksize)
+                return
+            with self._read_csv(chunksize=chunksize) as reader:
+                for chunk in reader:
+                    yield chunk[self.columns]
+        except Exception as e:
+            logging.error(f"Error while streaming {self.data_path}: {str(e)}")
+            raise e
@@ -1,8 +1,10 @@
 import logging
 from abc import ABC, abstractmethod
+from typing import Dict
 
 import numpy as np
-from sklearn.metrics import mean_squared_error, r2_score
+
+from model.profiling import profiled
 
 
 class Evaluation(ABC):
@@ -18,6 +20,7 @@ class MSE(Evaluation):
     """
     Evaluation strategy that uses Mean Squared Error (MSE)
     """
+    @profiled(rows_from="y_true")
     def calculate_score(self, y_true: np.ndarray, y_pred: np.ndarray) -> float:
         """
         Args:
@@ -26,6 +29,8 @@ class MSE(Evaluation):
         Returns:
             mse: float
         """
+        from sklearn.metrics import mean_squared_error
+
         try:
             logging.info("Entered the calculate_score method of the MSE class")
             mse = mean_squared_error(y_true, y_pred)
@@ -43,6 +48,7 @@ class R2Score(Evaluation):
     """
     Evaluation strategy that uses R2 Score
     """
+    @profiled(rows_from="y_true")
     def calculate_score(self, y_true: np.ndarray, y_pred: np.ndarray) -> float:
         """
         Args:
@@ -51,6 +57,8 @@ class R2Score(Evaluation):
         Returns:
             r2_score: float
         """
+        from sklearn.metrics import r2_score
+
         try:
             logging.info("Entered the calculate_score method of the R2Score class")
             r2 = r2_score(y_true, y_pred)
@@ -68,6 +76,7 @@ class RMSE(Evaluation):
     """
     Evaluation strategy that uses Root Mean Squared Error (RMSE)
     """
+    @profiled(rows_from="y_true")
     def calculate_score(self, y_true: np.ndarray, y_pred: np.ndarray) -> float:
         """
         Args:
@@ -76,6 +85,8 @@ class RMSE(Evaluation):
         Returns:
             rmse: float
         """
+        from sklearn.metrics import mean_squared_error
+
         try:
             logging.info("Entered the calculate_score method of the RMSE class")
             rmse = np.sqrt(mean_squared_error(y_true, y_pred))
@@ -87,3 +98,101 @@ class RMSE(Evaluation):
                 + str(e)
             )
             raise e
+
+
+class RegressionMetrics:
+    """
+    Fused computation of several regression metrics.
+
+    `update` folds a chunk of targets and predictions into running sums
+    (count, squared and absolute error, exact class hits, and the mean and
+    sum of squared deviations of the target merged with Chan's parallel
+    update), so any number of chunks can be evaluated in bounded memory and
+    every metric comes out of the same pass. `result` turns the sums into
+    the requested metrics.
+    """
+
+    METRICS = ("mse", "rmse", "mae", "r2", "accuracy")
+    BLOCK_ROWS = 65_536
+
+    def __init__(self, metrics=METRICS, min_score: int = 1, max_score: int = 5) -> None:
+        """
+        Args:
+            metrics: names of the metrics to report, a subset of METRICS
+            min_score: lowest review score, for the rounded-class accuracy
+            max_score: highest review score, for the rounded-class accuracy
+        """
+        unknown = [m for m in metrics if m not in self.METRICS]
+        if unknown:
+            raise ValueError(f"Unknown metrics {unknown}, expected a subset of {self.METRICS}")
+        self.metrics = tuple(metrics)
+        self.min_score = min_score
+        self.max_score = max_score
+        self.count = 0
+        self.sum_squared_error = 0.0
+        self.sum_absolute_error = 0.0
+        self.correct = 0
+        self.target_mean = 0.0
+        self.target_m2 = 0.0
+
+    def update(self, y_true, y_pred) -> "RegressionMetrics":
+        """Adds a chunk of targets and predictions."""
+        y_true = np.asarray(y_true).ravel()
+        y_pred = np.asarray(y_pred).ravel()
+        if y_true.shape != y_pred.shape:
+            raise ValueError(f"{len(y_true)} targets but {len(y_pred)} predictions")
+        # cache-sized blocks keep the temporaries small even for one huge chunk
+        for start in range(0, len(y_true), self.BLOCK_ROWS):
+            self._update_block(
+                y_true[start : start + self.BLOCK_ROWS].astype(np.float64),
+                y_pred[start : start + self.BLOCK_ROWS].astype(np.float64),
+            )
+        return self
+
+    def _update_block(self, y_true: np.ndarray, y_pred: np.ndarray) -> None:
+        n = len(y_true)
+        residual = y_pred - y_true
+        self.sum_squared_error += float(residual @ residual)
+        self.sum_absolute_error += float(np.abs(residual).sum())
+        if "accuracy" in self.metrics:
+            rounded = np.clip(np.rint(y_pred), self.min_score, self.max_score)
+            self.correct += int(np.count_nonzero(rounded == np.rint(y_true)))
+
+        block_mean = float(y_true.mean())
+        deviation = y_true - block_mean
+        block_m2 = float(deviation @ deviation)
+        total = self.count + n
+        delta = block_mean - self.target_mean
+        self.target_m2 += block_m2 + delta * delta * self.count * n / total
+        self.target_mean += delta * n / total
+        self.count = total
+
+    def result(self) -> Dict[str, float]:
+        """Returns the requested metrics over everything added so far."""
+        if self.count == 0:
+            raise ValueError("No samples were added")
+        mse = self.sum_squared_error / self.count
+        values = {
+            "mse": mse,
+            "rmse": float(np.sqrt(mse)),
+            "mae": self.sum_absolute_error / self.count,
+            # as sklearn, a constant target gives 1.0 for a perfect fit and 0.0 otherwise
+            "r2": 1.0 - self.sum_squared_error / self.target_m2
+            if self.target_m2 > 0
+            else float(self.sum_squared_error == 0),
+            "accuracy": self.correct / self.count,
+        }
+        scores = {name: float(values[name]) for name in self.metrics}
+        logging.info(f"Regression metrics over {self.count} samples: {scores}")
+        return scores
+
+    @profiled(rows_from="y_true")
+    def calculate_scores(self, y_true, y_pred) -> Dict[str, float]:
+        """
+        Args:
+            y_true: np.ndarray
+            y_pred: np.ndarray
+        Returns:
+            scores: dict mapping each requested metric to its value
+        """
+        return self.update(y_true, y_pred).result()
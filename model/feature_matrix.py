@@ -0,0 +1,129 @@
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from model.data_ingestion import FEATURE_COLUMNS
+
+FEATURE_MATRIX_DTYPE = np.float32
+
+
+class FeatureMatrix(np.ndarray):
+    """
+    Contiguous float32 feature matrix with the column names as a sidecar.
+
+    It is a plain ndarray to LightGBM, XGBoost and scikit-learn, which train
+    on it without converting it: float32 is the dtype they bin or split on,
+    and a C-ordered (row-major) matrix is what LightGBM and XGBoost read
+    rows from, while scikit-learn's trees accept either order. This halves
+    the memory of float64 frames and avoids converting the same frame again
+    in every fit and tuning trial.
+
+    `columns` names the last axis. Row selections, as made by
+    `train_test_split`, keep it; any other slice drops it.
+    """
+
+    def __new__(cls, data, columns: Iterable[str]) -> "FeatureMatrix":
+        """
+        Args:
+            data: 2-D array, viewed rather than copied when it is already a
+                float32 contiguous array
+            columns: name of every column
+        """
+        matrix = np.asarray(data).view(cls)
+        matrix.columns = list(columns)
+        if matrix.ndim != 2 or matrix.shape[1] != len(matrix.columns):
+            raise ValueError(
+                f"Expected a matrix with {len(matrix.columns)} columns, got shape {matrix.shape}"
+            )
+        return matrix
+
+    def __array_finalize__(self, obj) -> None:
+        columns = getattr(obj, "columns", None)
+        keeps_columns = columns is not None and self.ndim == 2 and self.shape[1] == len(columns)
+        self.columns = columns if keeps_columns else None
+
+    def __reduce__(self):
+        # ndarray pickling drops attributes, e.g. when sent to tuning workers
+        reconstruct, args, state = super().__reduce__()
+        return reconstruct, args, (state, self.columns)
+
+    def __setstate__(self, state) -> None:
+        array_state, self.columns = state
+        super().__setstate__(array_state)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, order: str = "C") -> "FeatureMatrix":
+        """
+        Copies `frame` once into a float32 matrix.
+
+        Args:
+            frame: numeric features, missing values become NaN
+            order: "C" (row-major) for the boosted models, "F" (column-major)
+                for consumers that scan whole columns
+        """
+        matrix = np.empty(frame.shape, dtype=FEATURE_MATRIX_DTYPE, order=order)
+        for i, column in enumerate(frame.columns):
+            matrix[:, i] = frame[column].to_numpy(dtype=FEATURE_MATRIX_DTYPE, na_value=np.nan)
+        return cls(matrix, frame.columns)
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame over the same memory, for consumers that need the names."""
+        return pd.DataFrame(np.asarray(self), columns=self.columns, copy=False)
+
+
+def feature_names(data) -> Optional[List[str]]:
+    """Column names of a FeatureMatrix or DataFrame, None for unnamed arrays."""
+    columns = getattr(data, "columns", None)
+    return None if columns is None else list(columns)
+
+
+def as_frame(data):
+    """Views a FeatureMatrix as a DataFrame and returns any other input unchanged."""
+    return data.to_frame() if isinstance(data, FeatureMatrix) else data
+
+
+def to_feature_matrix(data, dtype=np.float64, columns: Optional[List[str]] = None) -> np.ndarray:
+    """
+    Converts a scoring batch into the contiguous 2-D array the model expects.
+
+    Named inputs (pd.DataFrame, pyarrow.Table / RecordBatch) are checked for
+    the feature columns and projected onto them in training order; unnamed
+    arrays must already have those columns in that order. No intermediate
+    Python objects are created.
+
+    Args:
+        data: pd.DataFrame, np.ndarray, pyarrow.Table or pyarrow.RecordBatch
+        dtype: np.float32 or np.float64
+        columns: feature columns of the model, the twelve FEATURE_COLUMNS
+            by default, see `serving_feature_columns`
+    Returns:
+        matrix: C-contiguous np.ndarray of shape (rows, len(columns))
+    """
+    columns = FEATURE_COLUMNS if columns is None else list(columns)
+    if hasattr(data, "column_names"):  # pyarrow.Table / RecordBatch
+        _check_columns(data.column_names, columns)
+        matrix = np.empty((data.num_rows, len(columns)), dtype=dtype)
+        for i, column in enumerate(columns):
+            # nulls come back as NaN for numeric columns
+            matrix[:, i] = data.column(column).to_numpy(zero_copy_only=False)
+        return matrix
+    if isinstance(data, pd.DataFrame):
+        _check_columns(data.columns, columns)
+        if list(data.columns) != columns:
+            data = data[columns]
+        data = data.to_numpy(dtype=dtype)
+    matrix = np.ascontiguousarray(data, dtype=dtype)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    if matrix.ndim != 2 or matrix.shape[1] != len(columns):
+        raise ValueError(
+            f"Expected a batch with {len(columns)} feature columns, got shape {matrix.shape}"
+        )
+    return matrix
+
+
+def _check_columns(columns, expected: List[str]) -> None:
+    missing = [c for c in expected if c not in set(columns)]
+    if missing:
+        raise ValueError(f"Batch is missing the feature columns {missing}")
@@ -0,0 +1,203 @@
+import json
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from model.data_ingestion import FEATURE_COLUMNS
+
+# Watermark and drift reference of the model trained by the last deployed run.
+RETRAINING_STATE_PATH = "./saved_model/retraining_state.json"
+# Model kept by the last deployed incremental run, apart from the committed
+# saved_model/model.pkl that the Streamlit app serves.
+RETRAINED_MODEL_PATH = "./saved_model/retrained_model.pkl"
+WATERMARK_COLUMN = "order_purchase_timestamp"
+
+# Regressor class (module, name) a `train_model` model name can continue
+# boosting from, compared by name so neither library is imported here.
+WARM_START_CLASSES = {"lightgbm": ("lightgbm", "LGBMRegressor"), "xgboost": ("xgboost", "XGBRegressor")}
+
+
+def can_warm_start(model_name: str, base_model) -> bool:
+    """Whether `base_model` can be the starting point of a `model_name` model."""
+    expected = WARM_START_CLASSES.get(model_name)
+    return expected is not None and any(
+        (cls.__module__.split(".")[0], cls.__name__) == expected for cls in type(base_model).__mro__
+    )
+
+
+def feature_profile(data: pd.DataFrame, n_bins: int = 10) -> Dict[str, Dict[str, list]]:
+    """
+    Summarizes the distribution of every model feature as the inner decile
+    edges and the share of rows falling in each bin, the last bin holding
+    the missing values.
+
+    Args:
+        data: DataFrame with the FEATURE_COLUMNS
+        n_bins: number of quantile bins per feature
+    Returns:
+        profile: {"column": {"edges": [...], "shares": [...]}}
+    """
+    quantiles = np.linspace(0, 1, n_bins + 1)[1:-1]
+    profile = {}
+    for column in FEATURE_COLUMNS:
+        values = data[column].to_numpy(dtype=np.float64)
+        present = values[~np.isnan(values)]
+        edges = np.unique(np.quantile(present, quantiles)) if len(present) else np.array([])
+        profile[column] = {
+            "edges": edges.tolist(),
+            "shares": _bin_shares(values, edges).tolist(),
+        }
+    return profile
+
+
+def _bin_shares(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    missing = np.isnan(values)
+    counts = np.bincount(
+        np.searchsorted(edges, values[~missing], side="right"), minlength=len(edges) + 1
+    )
+    counts = np.append(counts, missing.sum())
+    return counts / max(len(values), 1)
+
+
+def population_stability(
+    profile: Dict[str, Dict[str, list]], data: pd.DataFrame, epsilon: float = 1e-4
+) -> Dict[str, float]:
+    """
+    Population stability index of every feature of `data` against the bins
+    of a `feature_profile`. Values above 0.2 are commonly read as a shift
+    large enough to retrain on.
+    """
+    psi = {}
+    for column, reference in profile.items():
+        expected = np.maximum(np.asarray(reference["shares"]), epsilon)
+        actual = _bin_shares(data[column].to_numpy(dtype=np.float64), np.asarray(reference["edges"]))
+        actual = np.maximum(actual, epsilon)
+        psi[column] = float(np.sum((actual - expected) * np.log(actual / expected)))
+    return psi
+
+
+class RetrainingState:
+    """
+    What the next incremental run needs to know about the deployed model:
+    the latest order timestamp it was trained on, when it was last trained
+    from scratch and the feature profile of that full training set.
+    """
+
+    def __init__(
+        self,
+        watermark: Optional[pd.Timestamp] = None,
+        last_full_training: Optional[pd.Timestamp] = None,
+        profile: Optional[Dict[str, Dict[str, list]]] = None,
+    ) -> None:
+        self.watermark = watermark
+        self.last_full_training = last_full_training
+        self.profile = profile
+
+    def advance(self, data: pd.DataFrame, warm_start: bool, now: Optional[pd.Timestamp] = None) -> None:
+        """
+        Records that a model trained on `data` was deployed: the watermark
+        moves to its latest order and, after a full retraining, the schedule
+        and the drift reference restart from it.
+        """
+        latest = data[WATERMARK_COLUMN].max()
+        if pd.notna(latest) and (self.watermark is None or latest > self.watermark):
+            self.watermark = latest
+        if not warm_start:
+            self.last_full_training = now or pd.Timestamp.now()
+            self.profile = feature_profile(data)
+
+    def save(self, path: str = RETRAINING_STATE_PATH) -> None:
+        """Stores the state as JSON, replacing the previous file atomically."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        state = {
+            "watermark": None if self.watermark is None else self.watermark.isoformat(),
+            "last_full_training": (
+                None if self.last_full_training is None else self.last_full_training.isoformat()
+            ),
+            "profile": self.profile,
+        }
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as fid:
+            json.dump(state, fid, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = RETRAINING_STATE_PATH) -> "RetrainingState":
+        """Restores the saved state, or an empty one when nothing was saved yet."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as fid:
+            state = json.load(fid)
+        return cls(
+            _timestamp(state["watermark"]), _timestamp(state["last_full_training"]), state["profile"]
+        )
+
+
+def _timestamp(value: Optional[str]) -> Optional[pd.Timestamp]:
+    return None if value is None else pd.Timestamp(value)
+
+
+class RetrainingPolicy:
+    """
+    Decides whether a run continues boosting the deployed model on the
+    orders newer than the watermark or retrains from scratch.
+
+    A full retraining happens when there is no state or compatible model to
+    start from, when `full_retrain_days` have passed since the last one, or
+    when the population stability index of any feature of the new orders
+    against the last full training set exceeds `drift_threshold`. Otherwise
+    only the new orders are trained on, widened to the `min_new_rows` most
+    recent orders when fewer arrived, so that a quiet day still has enough
+    rows for early stopping and evaluation.
+    """
+
+    def __init__(
+        self, full_retrain_days: float = 7, drift_threshold: float = 0.2, min_new_rows: int = 1000
+    ) -> None:
+        self.full_retrain_days = full_retrain_days
+        self.drift_threshold = drift_threshold
+        self.min_new_rows = min_new_rows
+
+    def plan(
+        self,
+        data: pd.DataFrame,
+        state: RetrainingState,
+        has_base_model: bool,
+        now: Optional[pd.Timestamp] = None,
+    ) -> Tuple[pd.DataFrame, bool, str]:
+        """
+        Args:
+            data: full order history, with the WATERMARK_COLUMN
+            state: state saved by the last deployed run
+            has_base_model: whether a model to continue boosting from exists
+            now: current time, defaults to the wall clock
+        Returns:
+            training_data: rows to train on
+            warm_start: whether to continue boosting the deployed model
+            reason: why, for the logs
+        """
+        now = now or pd.Timestamp.now()
+        if not has_base_model:
+            return data, False, "no deployed model to continue from"
+        if state.watermark is None or state.last_full_training is None or state.profile is None:
+            return data, False, "no watermark from a previous run"
+        if now - state.last_full_training >= pd.Timedelta(days=self.full_retrain_days):
+            return data, False, f"last full retraining is older than {self.full_retrain_days} days"
+
+        timestamps = data[WATERMARK_COLUMN]
+        new_rows = data[timestamps > state.watermark]
+        if len(new_rows) < self.min_new_rows:
+            recent = timestamps.dropna().sort_values().index[-self.min_new_rows :]
+            new_rows = data.loc[recent]
+        if new_rows.empty:
+            return data, False, "no timestamped orders to train on"
+
+        drift = population_stability(state.profile, new_rows)
+        column, worst = max(drift.items(), key=lambda item: item[1])
+        if worst > self.drift_threshold:
+            return data, False, f"{column} drifted (PSI {worst:.3f} > {self.drift_threshold})"
+        logging.info(f"Largest feature drift since the last full retraining: {column} PSI {worst:.3f}")
+        return new_rows, True, f"{len(new_rows)} orders since {state.watermark}"
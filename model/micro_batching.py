@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class BatchingMetrics:
+    """
+    Counters of a MicroBatcher: requests and rows served, `predict` calls,
+    and the latency from submission to result over the most recent requests.
+    """
+
+    def __init__(self, window: int = 10_000) -> None:
+        """
+        Args:
+            window: number of recent request latencies kept for percentiles
+        """
+        self.started_at = time.monotonic()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+        self.predict_seconds = 0.0
+        self.latencies = deque(maxlen=window)
+
+    def record_batch(self, n_rows: int, seconds: float) -> None:
+        self.batches += 1
+        self.rows += n_rows
+        self.predict_seconds += seconds
+
+    def record_request(self, latency: float) -> None:
+        self.requests += 1
+        self.latencies.append(latency)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Returns the current metrics as a flat dict of numbers."""
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        latencies = np.array(self.latencies) * 1e3 if self.latencies else np.zeros(1)
+        return {
+            "requests": self.requests,
+            "rows": self.rows,
+            "batches": self.batches,
+            "errors": self.errors,
+            "mean_batch_rows": self.rows / self.batches if self.batches else 0.0,
+            "rows_per_second": self.rows / elapsed,
+            "predict_seconds": self.predict_seconds,
+            "latency_p50_ms": float(np.percentile(latencies, 50)),
+            "latency_p95_ms": float(np.percentile(latencies, 95)),
+            "latency_p99_ms": float(np.percentile(latencies, 99)),
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent prediction requests into micro-batches.
+
+    Requests are queued as (rows, future) pairs. A single consumer task
+    takes the first waiting request, keeps collecting until the batch holds
+    `max_batch_size` rows or `max_latency_ms` has passed since that request
+    was taken, then scores the stacked rows with one `predict_fn` call in a
+    worker thread and hands each request its slice of the output. Requests
+    arriving while a batch is scored simply wait for the next one, so the
+    batch size grows with the load.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], np.ndarray],
+        max_batch_size: int = 256,
+        max_latency_ms: float = 5.0,
+    ) -> None:
+        """
+        Args:
+            predict_fn: vectorized predict taking a 2-D array of rows
+            max_batch_size: most rows scored by one `predict_fn` call
+            max_latency_ms: longest a request waits for its batch to fill
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1e3
+        self.metrics = BatchingMetrics()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def start(self) -> None:
+        """Starts the consumer task on the running event loop, also after a `stop`."""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            # created per start, as `stop` shuts the previous one down
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="micro-batcher")
+            self._task = asyncio.get_running_loop().create_task(self._consume())
+
+    async def stop(self) -> None:
+        """Stops the consumer task; requests still queued are cancelled."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            while not self._queue.empty():
+                self._queue.get_nowait()[1].cancel()
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def __aenter__(self) -> "MicroBatcher":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def predict(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Scores `rows` (one row or a 2-D array of rows) as part of a micro-batch.
+        """
+        if self._task is None:
+            raise RuntimeError("MicroBatcher.start() must be awaited first")
+        rows = np.asarray(rows, dtype=np.float64)
+        if rows.ndim == 1:
+            rows = rows.reshape(1, -1)
+        future = asyncio.get_running_loop().create_future()
+        submitted = time.monotonic()
+        await self._queue.put((rows, future))
+        try:
+            return await future
+        finally:
+            self.metrics.record_request(time.monotonic() - submitted)
+
+    async def _collect(self) -> List[Tuple[np.ndarray, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        n_rows = len(batch[0][0])
+        deadline = time.monotonic() + self.max_latency
+        while n_rows < self.max_batch_size:
+            if self._queue.empty():
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self._queue.get_nowait()
+            batch.append(item)
+            n_rows += len(item[0])
+        return batch
+
+    async def _consume(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            batch = [(rows, future) for rows, future in batch if not future.cancelled()]
+            if not batch:
+                continue
+            matrix = np.concatenate([rows for rows, _ in batch])
+            start = time.monotonic()
+            try:
+                prediction = await loop.run_in_executor(self._executor, self.predict_fn, matrix)
+                prediction = np.asarray(prediction).reshape(len(matrix), -1).squeeze(axis=1)
+            except Exception as e:
+                logging.error(f"Micro-batch of {len(matrix)} rows failed: {str(e)}")
+                self.metrics.errors += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.metrics.record_batch(len(matrix), time.monotonic() - start)
+            offset = 0
+            for rows, future in batch:
+                if not future.done():
+                    future.set_result(prediction[offset : offset + len(rows)])
+                offset += len(rows)
@@ -1,12 +1,25 @@
+import copy
 import logging
+import multiprocessing
+import os
+import tempfile
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 
-import optuna
+import numpy as np
 import pandas as pd
-import xgboost as xgb
-from lightgbm import LGBMRegressor
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.linear_model import LinearRegression
+
+from model.feature_matrix import FeatureMatrix, as_frame
+from model.profiling import profiled
+
+# lightgbm, xgboost, optuna and scikit-learn are imported by the methods that
+# use them, so importing this module (e.g. for linear regression only) stays
+# cheap.
+
+# Upper bound on boosting rounds while tuning; early stopping picks the count.
+MAX_BOOST_ROUNDS = 200
+EARLY_STOPPING_ROUNDS = 20
 
 
 class Model(ABC):
@@ -14,6 +27,34 @@ class Model(ABC):
     Abstract base class for all models.
     """
 
+    # Threads used by each fit during tuning, set when trials run in parallel.
+    n_jobs: Optional[int] = None
+    # Whether `train` accepts an `eval_set` and `early_stopping_rounds`.
+    supports_early_stopping = False
+    # Whether `train` accepts an `init_model` to continue boosting from.
+    supports_warm_start = False
+
+    def _thread_params(self) -> dict:
+        return {} if self.n_jobs is None else {"n_jobs": self.n_jobs}
+
+    def _trial_data(self, build, *frames):
+        """
+        Returns `build(*frames)`, reusing the result for as long as the tuner
+        passes the very same frames, so trials share one binned dataset.
+        """
+        key = tuple(id(frame) for frame in frames)
+        cached = self.__dict__.get("_trial_cache")
+        if cached is None or cached[0] != key:
+            cached = (key, build(*frames))
+            self._trial_cache = cached
+        return cached[1]
+
+    def __getstate__(self):
+        # native datasets are rebuilt in each tuning worker instead of pickled
+        state = self.__dict__.copy()
+        state.pop("_trial_cache", None)
+        return state
+
     @abstractmethod
     def train(self, x_train, y_train):
         """
@@ -40,39 +81,235 @@ class Model(ABC):
         pass
 
 
+def _report_r2(trial, mse: float, variance: float, step: int) -> None:
+    """
+    Reports the validation R2 implied by `mse` as an intermediate value, so
+    the pruner compares trials on the same scale as the final objective.
+    """
+    import optuna
+
+    trial.report(1.0 - mse / variance, step)
+    if trial.should_prune():
+        raise optuna.TrialPruned(f"Trial was pruned at iteration {step}.")
+
+
+def lightgbm_pruning_callback(trial, y_valid):
+    """LightGBM callback pruning a trial on its first validation set's l2."""
+    variance = float(np.var(y_valid))
+
+    def _callback(env):
+        for _, metric_name, score, _ in env.evaluation_result_list:
+            if metric_name == "l2":
+                _report_r2(trial, score, variance, env.iteration)
+                return
+
+    return _callback
+
+
+def xgboost_pruning_callback(trial, y_valid):
+    """XGBoost callback pruning a trial on its first validation set's rmse."""
+    import xgboost as xgb
+
+    variance = float(np.var(y_valid))
+
+    class _PruningCallback(xgb.callback.TrainingCallback):
+        def after_iteration(self, model, epoch, evals_log):
+            rmse = next(iter(evals_log.values()))["rmse"][-1]
+            if isinstance(rmse, tuple):  # (mean, std) pairs when evaluating in cv
+                rmse = rmse[0]
+            _report_r2(trial, rmse**2, variance, epoch)
+            return False
+
+    return _PruningCallback()
+
+
+def _keep_feature_names(reg, x_train) -> None:
+    """
+    Gives a model trained on a FeatureMatrix, which the libraries see as an
+    unnamed array, the column names it would have had from a DataFrame, so
+    scoring DataFrames later checks and orders the features the same way.
+    """
+    if not isinstance(x_train, FeatureMatrix):
+        return
+    if type(reg).__module__.split(".")[0] == "xgboost":
+        reg.get_booster().feature_names = list(x_train.columns)
+    else:
+        reg.feature_names_in_ = np.asarray(x_train.columns, dtype=object)
+
+
+def best_iteration(reg) -> Optional[int]:
+    """
+    Returns the number of boosting rounds kept by early stopping, or None when
+    the model was trained without it.
+    """
+    # checked by module so that neither library has to be imported here
+    module = type(reg).__module__.split(".")[0]
+    if module == "lightgbm":
+        return reg.best_iteration_ or None
+    if module == "xgboost":
+        try:
+            return reg.best_iteration + 1
+        except AttributeError:
+            return None
+    return None
+
+
+def early_stopping_split(
+    model: "Model",
+    x_train,
+    y_train,
+    validation_fraction: float = 0.1,
+    early_stopping_rounds: int = EARLY_STOPPING_ROUNDS,
+    hold_out_always: bool = False,
+):
+    """
+    Holds out `validation_fraction` of the training rows, the same ones on
+    every call, for the early stopping of a boosted `model`.
+
+    Args:
+        model: Model whose `train` the fit parameters are for
+        validation_fraction: share of x_train held out, 0 holds out nothing
+        early_stopping_rounds: rounds without validation improvement
+            before boosting stops
+        hold_out_always: also hold the rows out for models without early
+            stopping, e.g. to score every candidate on the same rows
+    Returns:
+        x_fit, y_fit: rows to train on
+        x_valid, y_valid: held-out rows, None when nothing was held out
+        fit_params: `train` arguments stopping the boosting on them
+    """
+    from sklearn.model_selection import train_test_split
+
+    if validation_fraction <= 0 or not (model.supports_early_stopping or hold_out_always):
+        return x_train, y_train, None, None, {}
+    x_fit, x_valid, y_fit, y_valid = train_test_split(
+        x_train, y_train, test_size=validation_fraction, random_state=42
+    )
+    fit_params = {}
+    if model.supports_early_stopping:
+        fit_params = {
+            "eval_set": [(x_valid, y_valid)],
+            "early_stopping_rounds": early_stopping_rounds,
+        }
+    return x_fit, y_fit, x_valid, y_valid, fit_params
+
+
 class RandomForestModel(Model):
     """
     RandomForestModel that implements the Model interface.
     """
 
+    @profiled(rows_from="x_train")
     def train(self, x_train, y_train, **kwargs):
+        from sklearn.ensemble import RandomForestRegressor
+
         reg = RandomForestRegressor(**kwargs)
         reg.fit(x_train, y_train)
+        _keep_feature_names(reg, x_train)
         return reg
 
     def optimize(self, trial, x_train, y_train, x_test, y_test):
         n_estimators = trial.suggest_int("n_estimators", 1, 200)
         max_depth = trial.suggest_int("max_depth", 1, 20)
         min_samples_split = trial.suggest_int("min_samples_split", 2, 20)
-        reg = self.train(x_train, y_train, n_estimators=n_estimators, max_depth=max_depth, min_samples_split=min_samples_split)
-        return reg.score(x_test, y_test)
+        reg = self.train(x_train, y_train, n_estimators=n_estimators, max_depth=max_depth, min_samples_split=min_samples_split, **self._thread_params())
+        return reg.score(as_frame(x_test), y_test)
 
 class LightGBMModel(Model):
     """
     LightGBMModel that implements the Model interface.
     """
 
-    def train(self, x_train, y_train, **kwargs):
-        reg = LGBMRegressor(**kwargs)
-        reg.fit(x_train, y_train)
+    supports_early_stopping = True
+    supports_warm_start = True
+
+    @profiled(rows_from="x_train")
+    def train(
+        self,
+        x_train,
+        y_train,
+        eval_set=None,
+        early_stopping_rounds=None,
+        callbacks=None,
+        init_model=None,
+        **kwargs,
+    ):
+        """
+        Stops adding trees once the score on the last `eval_set` entry has
+        not improved for `early_stopping_rounds` rounds; the kept tree count
+        is available as `best_iteration_`.
+
+        With `init_model`, a trained LGBMRegressor, its kept trees are the
+        starting point and `n_estimators` new trees are added on top of them,
+        using its hyperparameters unless overridden in `kwargs`.
+        """
+        import lightgbm as lgb
+
+        init_booster = None
+        if init_model is not None:
+            kwargs = {**init_model.get_params(), **kwargs}
+            init_booster = lgb.Booster(
+                model_str=init_model.booster_.model_to_string(
+                    num_iteration=best_iteration(init_model)
+                )
+            )
+        reg = lgb.LGBMRegressor(**kwargs)
+        callbacks = list(callbacks or [])
+        if eval_set is not None and early_stopping_rounds:
+            callbacks.append(lgb.early_stopping(early_stopping_rounds, verbose=False))
+        # the names of a FeatureMatrix are passed on, its values are used as they are
+        feature_name = x_train.columns if isinstance(x_train, FeatureMatrix) else "auto"
+        reg.fit(
+            x_train,
+            y_train,
+            eval_set=eval_set,
+            callbacks=callbacks,
+            init_model=init_booster,
+            feature_name=feature_name,
+        )
         return reg
 
+    @staticmethod
+    def _build_datasets(x_train, y_train, x_test, y_test):
+        import lightgbm as lgb
+
+        train_set = lgb.Dataset(
+            x_train, y_train, params={"verbosity": -1}, free_raw_data=False
+        ).construct()
+        valid_set = lgb.Dataset(x_test, y_test, reference=train_set).construct()
+        return train_set, valid_set
+
     def optimize(self, trial, x_train, y_train, x_test, y_test):
-        n_estimators = trial.suggest_int("n_estimators", 1, 200)
+        """
+        Trains on a LightGBM Dataset binned once per study, and scores the
+        booster at its best iteration.
+        """
+        import lightgbm as lgb
+        from sklearn.metrics import r2_score
+
         max_depth = trial.suggest_int("max_depth", 1, 20)
-        learning_rate = trial.suggest_uniform("learning_rate", 0.01, 0.99)
-        reg = self.train(x_train, y_train, n_estimators=n_estimators, learning_rate=learning_rate, max_depth=max_depth)
-        return reg.score(x_test, y_test)
+        learning_rate = trial.suggest_float("learning_rate", 0.01, 0.99)
+        train_set, valid_set = self._trial_data(
+            self._build_datasets, x_train, y_train, x_test, y_test
+        )
+        booster = lgb.train(
+            {
+                "objective": "regression",
+                "learning_rate": learning_rate,
+                "max_depth": max_depth,
+                "verbosity": -1,
+                **self._thread_params(),
+            },
+            train_set,
+            num_boost_round=MAX_BOOST_ROUNDS,
+            valid_sets=[valid_set],
+            callbacks=[
+                lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False),
+                lightgbm_pruning_callback(trial, y_test),
+            ],
+        )
+        trial.set_user_attr("n_estimators", booster.best_iteration or None)
+        return r2_score(y_test, booster.predict(x_test, num_iteration=booster.best_iteration))
 
 
 class XGBoostModel(Model):
@@ -80,17 +317,91 @@ class XGBoostModel(Model):
     XGBoostModel that implements the Model interface.
     """
 
-    def train(self, x_train, y_train, **kwargs):
+    supports_early_stopping = True
+    supports_warm_start = True
+
+    @profiled(rows_from="x_train")
+    def train(
+        self, x_train, y_train, eval_set=None, early_stopping_rounds=None, init_model=None, **kwargs
+    ):
+        """
+        Stops adding trees once the score on the last `eval_set` entry has
+        not improved for `early_stopping_rounds` rounds; `predict` then uses
+        the trees up to `best_iteration`.
+
+        With `init_model`, a trained XGBRegressor, its kept trees are the
+        starting point and `n_estimators` new trees are added on top of them,
+        using its hyperparameters unless overridden in `kwargs`.
+        """
+        import xgboost as xgb
+
+        init_booster = None
+        if init_model is not None:
+            kwargs = {**init_model.get_params(), **kwargs}
+            init_booster = init_model.get_booster()
+            n_rounds = best_iteration(init_model)
+            if n_rounds is not None:
+                init_booster = init_booster[:n_rounds]
+            if isinstance(x_train, FeatureMatrix):
+                # the array has no names to check against, they are set again
+                # by `_keep_feature_names`
+                init_booster = init_booster.copy()
+                init_booster.feature_names = None
+            if eval_set is None:
+                kwargs.pop("early_stopping_rounds", None)
+        if eval_set is not None and early_stopping_rounds:
+            kwargs["early_stopping_rounds"] = early_stopping_rounds
+        # same histogram algorithm as the trials in `optimize`
+        kwargs.setdefault("tree_method", "hist")
         reg = xgb.XGBRegressor(**kwargs)
-        reg.fit(x_train, y_train)
+        reg.fit(x_train, y_train, eval_set=eval_set, verbose=False, xgb_model=init_booster)
+        _keep_feature_names(reg, x_train)
         return reg
 
+    @staticmethod
+    def _build_matrices(x_train, y_train, x_test, y_test):
+        import xgboost as xgb
+
+        # QuantileDMatrix (xgboost >= 1.7) stores only the quantized histogram
+        if hasattr(xgb, "QuantileDMatrix"):
+            dtrain = xgb.QuantileDMatrix(x_train, y_train)
+            return dtrain, xgb.QuantileDMatrix(x_test, y_test, ref=dtrain)
+        return xgb.DMatrix(x_train, y_train), xgb.DMatrix(x_test, y_test)
+
     def optimize(self, trial, x_train, y_train, x_test, y_test):
-        n_estimators = trial.suggest_int("n_estimators", 1, 200)
+        """
+        Trains on an XGBoost DMatrix quantized once per study, and scores the
+        booster at its best iteration.
+        """
+        import xgboost as xgb
+        from sklearn.metrics import r2_score
+
         max_depth = trial.suggest_int("max_depth", 1, 30)
-        learning_rate = trial.suggest_loguniform("learning_rate", 1e-7, 10.0)
-        reg = self.train(x_train, y_train, n_estimators=n_estimators, learning_rate=learning_rate, max_depth=max_depth)
-        return reg.score(x_test, y_test)
+        learning_rate = trial.suggest_float("learning_rate", 1e-7, 10.0, log=True)
+        dtrain, dvalid = self._trial_data(
+            self._build_matrices, x_train, y_train, x_test, y_test
+        )
+        params = {
+            "objective": "reg:squarederror",
+            "tree_method": "hist",
+            "learning_rate": learning_rate,
+            "max_depth": max_depth,
+        }
+        if self.n_jobs is not None:
+            params["nthread"] = self.n_jobs
+        booster = xgb.train(
+            params,
+            dtrain,
+            num_boost_round=MAX_BOOST_ROUNDS,
+            evals=[(dvalid, "validation_0")],
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+            callbacks=[xgboost_pruning_callback(trial, y_test)],
+            verbose_eval=False,
+        )
+        n_rounds = booster.best_iteration + 1
+        trial.set_user_attr("n_estimators", n_rounds)
+        prediction = booster.inplace_predict(x_test, iteration_range=(0, n_rounds))
+        return r2_score(y_test, prediction)
 
 
 class LinearRegressionModel(Model):
@@ -98,29 +409,133 @@ class LinearRegressionModel(Model):
     LinearRegressionModel that implements the Model interface.
     """
 
+    @profiled(rows_from="x_train")
     def train(self, x_train, y_train, **kwargs):
+        from sklearn.linear_model import LinearRegression
+
         reg = LinearRegression(**kwargs)
         reg.fit(x_train, y_train)
+        _keep_feature_names(reg, x_train)
         return reg
 
     # For linear regression, there might not be hyperparameters that we want to tune, so we can simply return the score
     def optimize(self, trial, x_train, y_train, x_test, y_test):
-        reg = self.train(x_train, y_train)
-        return reg.score(x_test, y_test)
+        reg = self.train(x_train, y_train, **self._thread_params())
+        return reg.score(as_frame(x_test), y_test)
+
+
+# Every Model implementation, by the name `train_model` selects it with.
+MODELS = {
+    "lightgbm": LightGBMModel,
+    "randomforest": RandomForestModel,
+    "xgboost": XGBoostModel,
+    "linear_regression": LinearRegressionModel,
+}
+
+# optuna pruner class and arguments of each `HyperparameterTuner` pruner name
+PRUNERS = {
+    "median": ("MedianPruner", {"n_warmup_steps": 10}),
+    "hyperband": ("HyperbandPruner", {}),
+    "none": ("NopPruner", {}),
+}
+
+
+def _make_pruner(name: str):
+    import optuna
+
+    class_name, kwargs = PRUNERS[name]
+    return getattr(optuna.pruners, class_name)(**kwargs)
+
+
+def _optimize_in_worker(tuner, storage: str, study_name: str, n_trials: int) -> None:
+    """Joins the shared study from a worker process and runs `n_trials` trials."""
+    import optuna
+
+    study = optuna.load_study(
+        study_name=study_name, storage=storage, pruner=_make_pruner(tuner.pruner)
+    )
+    study.optimize(tuner.objective, n_trials=n_trials)
+
 
 class HyperparameterTuner:
     """
     Class for performing hyperparameter tuning. It uses Model strategy to perform tuning.
+
+    Trials can run in several worker processes sharing one study through an
+    RDB storage (SQLite by default), losing trials are pruned from their
+    intermediate validation scores, and a study stored under a fixed name
+    resumes where it stopped when tuning is started again.
     """
 
-    def __init__(self, model, x_train, y_train, x_test, y_test):
+    def __init__(self, model, x_train, y_train, x_test, y_test, pruner: str = "median"):
         self.model = model
         self.x_train = x_train
         self.y_train = y_train
         self.x_test = x_test
         self.y_test = y_test
+        self.pruner = pruner
+
+    def objective(self, trial):
+        return self.model.optimize(trial, self.x_train, self.y_train, self.x_test, self.y_test)
+
+    @profiled(rows_from="self.x_train")
+    def optimize(
+        self,
+        n_trials: int = 100,
+        n_jobs: int = 1,
+        storage: Optional[str] = None,
+        study_name: Optional[str] = None,
+    ):
+        """
+        Args:
+            n_trials: total number of finished trials the study should reach
+            n_jobs: number of worker processes running trials concurrently
+            storage: Optuna storage URL, e.g. "sqlite:///tuning.db", needed to
+                resume a study; a temporary SQLite file is used when trials
+                run in parallel without one
+            study_name: name of the study to create or resume
+        Returns:
+            best_params: dict
+        """
+        import optuna
+
+        if n_jobs > 1 and storage is None:
+            with tempfile.TemporaryDirectory() as tmp:
+                storage = f"sqlite:///{os.path.join(tmp, 'study.db')}"
+                return self.optimize(n_trials, n_jobs, storage, study_name)
+
+        study = optuna.create_study(
+            direction="maximize",
+            storage=storage,
+            study_name=study_name,
+            load_if_exists=True,
+            pruner=_make_pruner(self.pruner),
+        )
+        finished = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+        remaining = n_trials - sum(trial.state in finished for trial in study.trials)
+        if remaining < n_trials:
+            logging.info(f"Resuming study {study.study_name}, {remaining} trials left")
+
+        if remaining > 0 and n_jobs <= 1:
+            study.optimize(self.objective, n_trials=remaining)
+        elif remaining > 0:
+            # split the cores between the workers so they don't oversubscribe
+            worker = copy.copy(self)
+            worker.model = copy.copy(self.model)
+            worker.model.n_jobs = max(1, (os.cpu_count() or 1) // n_jobs)
+            shares = [remaining // n_jobs + (i < remaining % n_jobs) for i in range(n_jobs)]
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=n_jobs, mp_context=context) as pool:
+                futures = [
+                    pool.submit(_optimize_in_worker, worker, storage, study.study_name, share)
+                    for share in shares
+                    if share > 0
+                ]
+                for future in futures:
+                    future.result()
 
-    def optimize(self, n_trials=100):
-        study = optuna.create_study(direction="maximize")
-        study.optimize(lambda trial: self.model.optimize(trial, self.x_train, self.y_train, self.x_test, self.y_test), n_trials=n_trials)
-        return study.best_trial.params
+        best_params = dict(study.best_trial.params)
+        # boosted models tune the tree count through early stopping
+        if study.best_trial.user_attrs.get("n_estimators"):
+            best_params["n_estimators"] = study.best_trial.user_attrs["n_estimators"]
+        return best_params
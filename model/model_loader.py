@@ -0,0 +1,156 @@
+import logging
+import os
+import pickle
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+MODEL_PATH = "./saved_model/model.pkl"
+# Overrides where the serving code loads the model from.
+MODEL_URI_ENV = "CUSTOMER_SATISFACTION_MODEL_URI"
+
+
+def load_model(uri: str = MODEL_PATH):
+    """
+    Loads a trained regressor exposing `predict`.
+
+    Args:
+        uri: a pickled model (`.pkl`), a compiled ensemble saved by
+            `CompiledEnsemble.save` (`.npz`), or any MLflow model URI such as
+            `runs:/<run id>/model` or `models:/<name>/<version>`
+    Returns:
+        model: the loaded model
+    """
+    try:
+        if uri.endswith(".npz"):
+            from model.tree_inference import CompiledEnsemble
+
+            return CompiledEnsemble.load(uri)
+        if os.path.isfile(uri):
+            with open(uri, "rb") as fid:
+                return pickle.load(fid)
+        import mlflow.pyfunc
+
+        return mlflow.pyfunc.load_model(uri)
+    except Exception as e:
+        logging.error(f"Error while loading the model from {uri}: {str(e)}")
+        raise e
+
+
+def save_model(model, path: str = MODEL_PATH) -> None:
+    """Pickles `model` to `path`, replacing the previous file atomically."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as fid:
+        pickle.dump(model, fid)
+    os.replace(tmp_path, path)
+
+
+def resolve_model_uri(uri: Optional[str] = None) -> str:
+    """
+    Picks the model to serve: `uri` when given, else the URI in the
+    CUSTOMER_SATISFACTION_MODEL_URI environment variable, e.g.
+    `models:/<name>/latest` for a model registered in MLflow, else the local
+    MODEL_PATH.
+    """
+    return uri or os.environ.get(MODEL_URI_ENV) or MODEL_PATH
+
+
+def _latest_alias(uri: str) -> Optional[str]:
+    """Returns the model name of a `models:/<name>/latest` URI, else None."""
+    prefix, _, rest = uri.partition(":/")
+    name, _, version = rest.strip("/").rpartition("/")
+    return name if prefix == "models" and version == "latest" else None
+
+
+def _latest_registered_version(name: str) -> str:
+    from mlflow.tracking import MlflowClient
+
+    versions = MlflowClient().get_latest_versions(name)
+    if not versions:
+        raise RuntimeError(f"No version of the '{name}' model is registered in MLflow")
+    return str(max(int(v.version) for v in versions))
+
+
+class ModelCache:
+    """
+    Keeps loaded models in memory for the lifetime of the process.
+
+    Entries are keyed by URI and revalidated on every `get`: local files by
+    their modification time and size, `models:/<name>/latest` by the latest
+    registered version (looked up at most once per `check_interval`
+    seconds). Other URIs are immutable and loaded once. A model is only
+    reloaded when its artifact changed.
+    """
+
+    def __init__(self, loader: Callable[[str], Any] = load_model, check_interval: float = 30.0) -> None:
+        """
+        Args:
+            loader: loads a model from a URI
+            check_interval: seconds between two registry lookups of a
+                `latest` URI
+        """
+        self.loader = loader
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Tuple[Any, Any]] = {}
+        self._registry_checks: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def _version(self, uri: str) -> Any:
+        if os.path.exists(uri):
+            stat = os.stat(uri)
+            return (stat.st_mtime_ns, stat.st_size)
+        name = _latest_alias(uri)
+        if name is not None:
+            checked_at, version = self._registry_checks.get(uri, (None, None))
+            if checked_at is None or time.monotonic() - checked_at >= self.check_interval:
+                version = _latest_registered_version(name)
+                self._registry_checks[uri] = (time.monotonic(), version)
+            return version
+        return uri
+
+    def get(self, uri: Optional[str] = None) -> Any:
+        """Returns the model at `uri` (see `resolve_model_uri`), loading it only when needed."""
+        return self.get_versioned(uri)[0]
+
+    def get_versioned(self, uri: Optional[str] = None) -> Tuple[Any, str]:
+        """Like `get`, also returning a string that changes whenever the model does."""
+        uri = resolve_model_uri(uri)
+        with self._lock:
+            version = self._version(uri)
+            entry = self._entries.get(uri)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1], f"{uri}@{version}"
+            self.misses += 1
+            load_uri = uri
+            name = _latest_alias(uri)
+            if name is not None:
+                # load the version that was checked, not whatever `latest` is by now
+                load_uri = f"models:/{name}/{version}"
+            logging.info(f"Loading model from {load_uri}")
+            model = self.loader(load_uri)
+            self._entries[uri] = (version, model)
+            return model, f"{uri}@{version}"
+
+    def clear(self) -> None:
+        """Drops every loaded model."""
+        with self._lock:
+            self._entries.clear()
+            self._registry_checks.clear()
+
+
+# Shared by everything serving predictions from this process.
+_model_cache = ModelCache()
+
+
+def get_model(uri: Optional[str] = None) -> Any:
+    """Returns the serving model from the process-wide ModelCache."""
+    return _model_cache.get(uri)
+
+
+def get_versioned_model(uri: Optional[str] = None) -> Tuple[Any, str]:
+    """Returns the serving model and its version from the process-wide ModelCache."""
+    return _model_cache.get_versioned(uri)
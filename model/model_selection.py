@@ -0,0 +1,171 @@
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+from model.evaluation import RegressionMetrics
+from model.feature_matrix import as_frame
+from model.model_dev import EARLY_STOPPING_ROUNDS, MODELS, HyperparameterTuner, early_stopping_split
+
+# Metrics where a larger value ranks a model higher, the others rank lower.
+HIGHER_IS_BETTER = {"r2", "accuracy"}
+
+# training and test split of a selection worker, set once by `_init_worker`
+_worker_data = {}
+
+
+def _init_worker(x_train, y_train, x_test, y_test) -> None:
+    _worker_data.update(x_train=x_train, y_train=y_train, x_test=x_test, y_test=y_test)
+
+
+def train_candidate(
+    name: str,
+    x_train,
+    y_train,
+    x_test,
+    y_test,
+    n_jobs: Optional[int] = None,
+    validation_fraction: float = 0.1,
+    early_stopping_rounds: int = EARLY_STOPPING_ROUNDS,
+    n_trials: int = 0,
+) -> Tuple[Any, Dict[str, float]]:
+    """
+    Trains one registered model the way `train_model` does, except that the
+    validation rows are held out for every model, and scores it on them.
+
+    Args:
+        name: key of the model in MODELS
+        n_jobs: threads the model may use, None for the library default
+        validation_fraction: share of x_train held out to rank the
+            candidates on and for early stopping of the boosted models
+        early_stopping_rounds: rounds without validation improvement
+            before boosting stops
+        n_trials: tuning trials on the validation split before the final
+            fit, 0 skips tuning
+    Returns:
+        model: the trained regressor
+        scores: RegressionMetrics of the validation split, the same metrics
+            of the test split prefixed with `test_`, and `train_seconds`
+    """
+    if validation_fraction <= 0:
+        raise ValueError("Candidates are ranked on a validation split, it cannot be empty")
+    start = time.perf_counter()
+    model = MODELS[name]()
+    model.n_jobs = n_jobs
+    x_fit, y_fit, x_valid, y_valid, fit_params = early_stopping_split(
+        model, x_train, y_train, validation_fraction, early_stopping_rounds, hold_out_always=True
+    )
+    if n_trials > 0:
+        fit_params.update(
+            HyperparameterTuner(model, x_fit, y_fit, x_valid, y_valid).optimize(n_trials=n_trials)
+        )
+    if n_jobs is not None:
+        fit_params["n_jobs"] = n_jobs
+    trained = model.train(x_fit, y_fit, **fit_params)
+    scores = RegressionMetrics().calculate_scores(y_valid, trained.predict(as_frame(x_valid)))
+    test_scores = RegressionMetrics().calculate_scores(y_test, trained.predict(as_frame(x_test)))
+    scores.update({f"test_{metric}": value for metric, value in test_scores.items()})
+    scores["train_seconds"] = time.perf_counter() - start
+    return trained, scores
+
+
+def _train_in_worker(name: str, **kwargs) -> Tuple[Any, Dict[str, float]]:
+    return train_candidate(name, **_worker_data, **kwargs)
+
+
+class ModelSelection:
+    """
+    Trains several registered models on the same split and keeps the one
+    scoring best on the rows held out from x_train, so the test split stays
+    unseen until the winner is evaluated.
+
+    Candidates run in a pool of `n_workers` processes that each receive the
+    split once. The cores are divided between the workers through every
+    model's `n_jobs`, so parallel candidates do not oversubscribe them. A
+    candidate that fails is logged and left off the leaderboard.
+    """
+
+    def __init__(
+        self,
+        model_names: Optional[Iterable[str]] = None,
+        n_workers: int = 1,
+        metric: str = "r2",
+        validation_fraction: float = 0.1,
+        early_stopping_rounds: int = EARLY_STOPPING_ROUNDS,
+        n_trials: int = 0,
+    ) -> None:
+        """
+        Args:
+            model_names: keys of MODELS to compare, all of them by default
+            n_workers: candidates trained at the same time
+            metric: RegressionMetrics metric the candidates are ranked by,
+                on the validation split
+            validation_fraction: see `train_candidate`
+            early_stopping_rounds: see `train_candidate`
+            n_trials: tuning trials per candidate, 0 skips tuning
+        """
+        self.model_names = list(model_names or MODELS)
+        unknown = [name for name in self.model_names if name not in MODELS]
+        if unknown:
+            raise ValueError(f"Models not supported: {unknown}")
+        if validation_fraction <= 0:
+            raise ValueError("Candidates are ranked on a validation split, it cannot be empty")
+        self.n_workers = n_workers
+        self.metric = metric
+        self.fit_kwargs = {
+            "validation_fraction": validation_fraction,
+            "early_stopping_rounds": early_stopping_rounds,
+            "n_trials": n_trials,
+        }
+
+    def run(self, x_train, x_test, y_train, y_test) -> Tuple[str, Any, pd.DataFrame]:
+        """
+        Returns:
+            best_name: key of the best model in MODELS
+            best_model: that model, trained
+            leaderboard: one row of validation and test scores per
+                candidate, best validation score first
+        """
+        results = {}
+        n_workers = min(self.n_workers, len(self.model_names))
+        if n_workers <= 1:
+            for name in self.model_names:
+                try:
+                    results[name] = train_candidate(
+                        name, x_train, y_train, x_test, y_test, **self.fit_kwargs
+                    )
+                except Exception as e:
+                    logging.error(f"Training the {name} candidate failed: {str(e)}")
+        else:
+            n_jobs = max(1, (os.cpu_count() or 1) // n_workers)
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(
+                max_workers=n_workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(x_train, y_train, x_test, y_test),
+            ) as pool:
+                futures = {
+                    name: pool.submit(_train_in_worker, name, n_jobs=n_jobs, **self.fit_kwargs)
+                    for name in self.model_names
+                }
+                for name, future in futures.items():
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        logging.error(f"Training the {name} candidate failed: {str(e)}")
+        if not results:
+            raise RuntimeError("Every candidate model failed to train")
+
+        leaderboard = pd.DataFrame(
+            [{"model": name, **scores} for name, (_, scores) in results.items()]
+        ).sort_values(
+            self.metric, ascending=self.metric not in HIGHER_IS_BETTER, ignore_index=True
+        )
+        best_name = leaderboard["model"].iloc[0]
+        logging.info(f"Best of {len(results)} candidates by {self.metric}: {best_name}")
+        return best_name, results[best_name][0], leaderboard
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+
+class PredictionCache:
+    """
+    LRU cache of predictions keyed by feature vector and model version.
+
+    Rows are rounded to `decimals` places and their raw bytes are the key,
+    so vectors differing only below that precision share an entry. Entries
+    expire after `ttl_seconds`, the least recently used ones are evicted
+    beyond `max_entries`, and the whole cache is dropped as soon as a
+    prediction is requested for a different model version.
+    """
+
+    def __init__(self, max_entries: int = 100_000, ttl_seconds: Optional[float] = 3600.0, decimals: int = 6) -> None:
+        """
+        Args:
+            max_entries: most predictions kept
+            ttl_seconds: lifetime of an entry, None keeps entries until evicted
+            decimals: decimal places the features are rounded to for the key
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.decimals = decimals
+        self.model_version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _keys(self, rows: np.ndarray) -> list:
+        # + 0.0 folds -0.0 into 0.0 so both round to the same key
+        quantized = np.ascontiguousarray(np.round(rows, self.decimals) + 0.0, dtype=np.float64)
+        row_type = np.dtype((np.void, quantized.dtype.itemsize * quantized.shape[1]))
+        return quantized.view(row_type).ravel().tolist()
+
+    def _switch_version(self, model_version: str) -> None:
+        if model_version != self.model_version:
+            self._entries.clear()
+            self.model_version = model_version
+
+    def predict(
+        self,
+        rows: np.ndarray,
+        model_version: str,
+        predict_fn: Callable[[np.ndarray], np.ndarray],
+    ) -> np.ndarray:
+        """
+        Returns the prediction of every row, calling `predict_fn` once on the
+        distinct rows that are not cached.
+
+        Args:
+            rows: 2-D array of feature vectors
+            model_version: identifies the model behind `predict_fn`
+            predict_fn: vectorized predict of that model
+        """
+        rows = np.asarray(rows, dtype=np.float64)
+        if rows.ndim == 1:
+            rows = rows.reshape(1, -1)
+        keys = self._keys(rows)
+        result = np.empty(len(rows), dtype=np.float64)
+        now = time.monotonic()
+        missing: Dict[bytes, list] = {}
+        with self._lock:
+            self._switch_version(model_version)
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and (entry[1] is None or entry[1] > now):
+                    self._entries.move_to_end(key)
+                    result[i] = entry[0]
+                    self.hits += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+                    self.misses += 1
+        if not missing:
+            return result
+
+        first_rows = [positions[0] for positions in missing.values()]
+        prediction = np.asarray(predict_fn(rows[first_rows]), dtype=np.float64).ravel()
+        expires_at = None if self.ttl_seconds is None else time.monotonic() + self.ttl_seconds
+        with self._lock:
+            store = model_version == self.model_version
+            for (key, positions), value in zip(missing.items(), prediction):
+                result[positions] = value
+                if store:
+                    self._entries[key] = (float(value), expires_at)
+                    self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def stats(self) -> Dict[str, float]:
+        """Returns the counters and the current hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by everything serving predictions from this process.
+_prediction_cache = PredictionCache()
+
+
+def get_prediction_cache() -> PredictionCache:
+    """Returns the process-wide PredictionCache."""
+    return _prediction_cache
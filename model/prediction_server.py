@@ -0,0 +1,188 @@
+import asyncio
+import json
+import logging
+from typing import Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from model.data_cleaning import DataPreprocessStrategy
+from model.data_ingestion import FEATURE_COLUMNS
+from model.feature_matrix import to_feature_matrix
+from model.micro_batching import MicroBatcher
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+def parse_rows(payload: Any, preprocessor: Optional[DataPreprocessStrategy] = None) -> np.ndarray:
+    """
+    Reads the rows of an `/invocations` request body in the MLflow scoring
+    formats: `{"instances": [...]}` or `{"inputs": [...]}` with rows given as
+    lists in feature order or as dicts keyed by feature name, or
+    `{"dataframe_split": {"columns": [...], "data": [[...]]}}`.
+
+    With a `preprocessor`, named rows hold its raw `input_columns` and are
+    transformed as at training time, so the derived timestamp features are
+    computed by the server; rows given as lists hold the final features.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("The request body must be a JSON object")
+    columns = preprocessor.feature_columns if preprocessor is not None else None
+    if "dataframe_split" in payload:
+        split = payload["dataframe_split"]
+        frame = pd.DataFrame(split["data"], columns=split.get("columns"))
+    else:
+        rows = payload.get("instances", payload.get("inputs"))
+        if rows is None:
+            raise ValueError("Expected an 'instances', 'inputs' or 'dataframe_split' field")
+        if not (rows and isinstance(rows[0], dict)):
+            return to_feature_matrix(np.asarray(rows, dtype=np.float64), columns=columns)
+        frame = pd.DataFrame(rows)
+    if preprocessor is not None:
+        frame = preprocessor.transform(frame[preprocessor.input_columns])
+    return to_feature_matrix(frame, columns=columns)
+
+
+class PredictionServer:
+    """
+    Minimal HTTP/1.1 server in front of a MicroBatcher.
+
+    `POST /invocations` scores the rows of the body, `GET /ping` reports
+    readiness and `GET /metrics` returns the batching metrics as JSON.
+    Every request is a coroutine on one event loop, so concurrent requests
+    end up in the same micro-batches.
+    """
+
+    def __init__(
+        self,
+        model,
+        max_batch_size: int = 256,
+        max_latency_ms: float = 5.0,
+        preprocessor: Optional[DataPreprocessStrategy] = None,
+        max_body_bytes: int = 16 * 1024 * 1024,
+    ) -> None:
+        """
+        Args:
+            model: regressor exposing a vectorized `predict`
+            max_batch_size: most rows scored by one `predict` call
+            max_latency_ms: longest a request waits for its batch to fill
+            preprocessor: fitted DataPreprocessStrategy the model was trained
+                with, applied to named rows, see `parse_rows`
+            max_body_bytes: largest request body read, larger ones are
+                answered with 413 before they are read
+        """
+        self.model = model
+        self.preprocessor = preprocessor
+        self.max_body_bytes = max_body_bytes
+        self.feature_columns = (
+            preprocessor.feature_columns if preprocessor is not None else FEATURE_COLUMNS
+        )
+        self.batcher = MicroBatcher(self._predict, max_batch_size, max_latency_ms)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def _predict(self, matrix: np.ndarray) -> np.ndarray:
+        # named columns keep the model's feature-name checks quiet
+        return self.model.predict(pd.DataFrame(matrix, columns=self.feature_columns))
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000) -> Tuple[str, int]:
+        """Starts listening and returns the bound address."""
+        await self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        address = self._server.sockets[0].getsockname()
+        logging.info(f"Prediction server listening on http://{address[0]}:{address[1]}")
+        return address[0], address[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.batcher.stop()
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8000) -> None:
+        await self.start(host, port)
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        if method == "GET" and path == "/ping":
+            return 200, {"status": "ok"}
+        if method == "GET" and path == "/metrics":
+            return 200, self.batcher.metrics.snapshot()
+        if method == "POST" and path == "/invocations":
+            try:
+                rows = parse_rows(json.loads(body or b"null"), self.preprocessor)
+            except (ValueError, KeyError, TypeError) as e:
+                return 400, {"error": str(e)}
+            prediction = await self.batcher.predict(rows)
+            return 200, {"predictions": prediction.tolist()}
+        return 404, {"error": f"No route for {method} {path}"}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if len(parts) != 3:
+                    await self._respond(writer, 400, {"error": "Malformed request line"}, False)
+                    break
+                method, path, _ = parts
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {"error": "Invalid Content-Length"}, False)
+                    break
+                if length > self.max_body_bytes:
+                    # the body is left unread, so the connection cannot be reused
+                    error = f"The body exceeds {self.max_body_bytes} bytes"
+                    await self._respond(writer, 413, {"error": error}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                try:
+                    status, payload = await self._route(method, path.split("?", 1)[0], body)
+                except Exception as e:
+                    logging.error(f"Error while serving {method} {path}: {str(e)}")
+                    status, payload = 500, {"error": str(e)}
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        # ValueError: a header line longer than the stream limit
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool) -> None:
+        content = json.dumps(payload).encode("utf-8")
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(content)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+            ).encode("latin-1")
+            + content
+        )
+        await writer.drain()
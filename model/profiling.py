@@ -0,0 +1,215 @@
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+# Directory a cProfile (or pyinstrument) profile of every outermost profiled
+# block is written to; profiling is off when unset.
+PROFILE_DIR_ENV = "CUSTOMER_SATISFACTION_PROFILE_DIR"
+# "cprofile" (default) or "pyinstrument"
+PROFILER_ENV = "CUSTOMER_SATISFACTION_PROFILER"
+
+_local = threading.local()
+# most recent measurements of this process, newest last
+_records = deque(maxlen=1_000)
+_calls: Dict[str, int] = {}
+
+
+def peak_rss_mib() -> Optional[float]:
+    """Peak resident set size of the current process in MiB, None if unknown."""
+    # VmHWM is reset on exec, unlike ru_maxrss which a spawned child inherits
+    # from the parent it was forked from.
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is reported in KiB on Linux and in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _reset_peak_rss() -> None:
+    # writing 5 to clear_refs resets VmHWM to the current RSS (Linux >= 4.0);
+    # elsewhere the peak stays the process-wide one
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+
+def _n_rows(value: Any) -> Optional[int]:
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    if hasattr(value, "shape") and len(getattr(value, "shape")) > 0:
+        return int(value.shape[0])
+    if hasattr(value, "__len__") and not isinstance(value, (str, bytes, dict)):
+        return len(value)
+    return None
+
+
+class profile:
+    """
+    Context manager measuring a block: wall and CPU time, peak RSS and the
+    rows it processed (set `rows` inside the block).
+
+    The measurement is logged, kept in `recent_profiles()` and, inside an
+    active MLflow run, logged as `<name>.wall_seconds`, `<name>.cpu_seconds`,
+    `<name>.peak_rss_mib`, `<name>.rows` and `<name>.rows_per_second`, with
+    the call count of `name` as step.
+
+    The peak RSS is the process peak (VmHWM) at the end of the block. With
+    `reset_peak`, an outermost block first resets VmHWM to the current RSS,
+    so the peak covers only that block and the blocks nested in it. The
+    reset is process-wide and lowers what any other reader of VmHWM sees,
+    e.g. `benchmarks.utils.measure` or blocks in other threads, so it is
+    meant for single-threaded benchmarks only. When
+    CUSTOMER_SATISFACTION_PROFILE_DIR is set, the outermost block also
+    writes a profile of its calls to that directory.
+
+        with profile("score_chunk") as p:
+            p.rows = len(chunk)
+            ...
+    """
+
+    def __init__(self, name: str, rows: Optional[int] = None, reset_peak: bool = False) -> None:
+        self.name = name
+        self.rows = rows
+        self.reset_peak = reset_peak
+        self.metrics: Dict[str, float] = {}
+        self._profiler = None
+
+    def __enter__(self) -> "profile":
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        if not stack:
+            self._start_profiler()
+            if self.reset_peak:
+                _reset_peak_rss()
+        stack.append(self)
+        self._peak = None
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        self._fold_peak(peak_rss_mib())
+        stack = _local.stack
+        stack.pop()
+        if stack:
+            stack[-1]._fold_peak(self._peak)
+        else:
+            self._stop_profiler()
+
+        self.metrics = {"wall_seconds": wall, "cpu_seconds": cpu}
+        if self._peak is not None:
+            self.metrics["peak_rss_mib"] = self._peak
+        if self.rows is not None:
+            self.metrics["rows"] = float(self.rows)
+            self.metrics["rows_per_second"] = self.rows / wall if wall > 0 else 0.0
+        call = _calls[self.name] = _calls.get(self.name, 0) + 1
+        _records.append({"name": self.name, "call": call, **self.metrics})
+        logging.info(
+            f"{self.name}: "
+            + ", ".join(f"{key}={value:.3f}" for key, value in self.metrics.items())
+        )
+        self._log_to_mlflow(call)
+
+    def _fold_peak(self, peak: Optional[float]) -> None:
+        if peak is not None and (self._peak is None or peak > self._peak):
+            self._peak = peak
+
+    def _log_to_mlflow(self, call: int) -> None:
+        try:
+            import mlflow
+        except ImportError:
+            return
+        try:
+            if mlflow.active_run() is not None:
+                mlflow.log_metrics(
+                    {f"{self.name}.{key}": value for key, value in self.metrics.items()},
+                    step=call,
+                )
+        except Exception as e:
+            logging.warning(f"Could not log the {self.name} profile to MLflow: {str(e)}")
+
+    def _start_profiler(self) -> None:
+        if not os.environ.get(PROFILE_DIR_ENV):
+            return
+        if os.environ.get(PROFILER_ENV, "cprofile") == "pyinstrument":
+            from pyinstrument import Profiler
+
+            self._profiler = Profiler()
+            self._profiler.start()
+        else:
+            import cProfile
+
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def _stop_profiler(self) -> None:
+        if self._profiler is None:
+            return
+        directory = os.environ[PROFILE_DIR_ENV]
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.name}-{os.getpid()}-{_calls.get(self.name, 0) + 1}")
+        if hasattr(self._profiler, "enable"):
+            self._profiler.disable()
+            self._profiler.dump_stats(f"{path}.prof")
+        else:
+            self._profiler.stop()
+            with open(f"{path}.html", "w") as fid:
+                fid.write(self._profiler.output_html())
+        self._profiler = None
+
+
+def profiled(name: Optional[str] = None, rows_from: Optional[str] = None) -> Callable:
+    """
+    Decorator running every call of a function inside a `profile` block.
+
+    Args:
+        name: name of the measurements, the function's qualified name by default
+        rows_from: argument holding the processed rows, e.g. "x_train", or an
+            attribute of one, e.g. "self.df"; by default the rows are taken
+            from the return value (its first element for tuples)
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        label = name or fn.__qualname__
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with profile(label) as block:
+                result = fn(*args, **kwargs)
+                if rows_from is None:
+                    block.rows = _n_rows(result)
+                else:
+                    argument, *attributes = rows_from.split(".")
+                    value = signature.bind(*args, **kwargs).arguments.get(argument)
+                    for attribute in attributes:
+                        value = getattr(value, attribute, None)
+                    block.rows = _n_rows(value)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def recent_profiles() -> list:
+    """Returns the latest measurements of this process, oldest first."""
+    return list(_records)
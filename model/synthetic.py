@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+from model.data_ingestion import CATEGORICAL_DTYPES
+
+
+def make_olist_frame(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Generates a seeded DataFrame with the column layout of the Olist order
+    export used by the pipelines (ids, timestamps, categorical, numeric and
+    free-text columns, including the missing values found in the real data).
+
+    Args:
+        n_rows: number of order rows to generate
+        seed: seed of the random generator
+    Returns:
+        df: pd.DataFrame
+    """
+    rng = np.random.default_rng(seed)
+
+    def ids(prefix: str) -> np.ndarray:
+        return np.char.add(prefix, rng.integers(0, 16**12, n_rows).astype("U12"))
+
+    def with_missing(values: np.ndarray, rate: float) -> np.ndarray:
+        values = values.astype(np.float64)
+        values[rng.random(n_rows) < rate] = np.nan
+        return values
+
+    start = np.datetime64("2016-09-01T00:00:00")
+    purchase = start + rng.integers(0, 2 * 365 * 24 * 3600, n_rows).astype("timedelta64[s]")
+    approved = purchase + rng.integers(600, 3 * 24 * 3600, n_rows).astype("timedelta64[s]")
+    carrier = approved + rng.integers(3600, 7 * 24 * 3600, n_rows).astype("timedelta64[s]")
+    delivered = carrier + rng.integers(24 * 3600, 30 * 24 * 3600, n_rows).astype("timedelta64[s]")
+    estimated = purchase + rng.integers(10, 45, n_rows).astype("timedelta64[D]")
+
+    def timestamps(values: np.ndarray, rate: float) -> pd.Series:
+        series = pd.Series(values).dt.strftime("%Y-%m-%d %H:%M:%S")
+        series[rng.random(n_rows) < rate] = None
+        return series
+
+    price = np.round(rng.lognormal(4.4, 1.0, n_rows), 2)
+    freight = np.round(rng.lognormal(2.8, 0.5, n_rows), 2)
+    has_review = rng.random(n_rows) < 0.4
+    reviews = np.where(has_review, "produto chegou no prazo e bem embalado", None)
+
+    return pd.DataFrame(
+        {
+            "order_id": ids("o"),
+            "customer_id": ids("c"),
+            "order_status": rng.choice(
+                CATEGORICAL_DTYPES["order_status"].categories, n_rows
+            ),
+            "order_purchase_timestamp": timestamps(purchase, 0.0),
+            "order_approved_at": timestamps(approved, 0.002),
+            "order_delivered_carrier_date": timestamps(carrier, 0.01),
+            "order_delivered_customer_date": timestamps(delivered, 0.02),
+            "order_estimated_delivery_date": timestamps(estimated, 0.0),
+            "payment_sequential": with_missing(rng.integers(1, 4, n_rows), 0.0001),
+            "payment_type": rng.choice(
+                CATEGORICAL_DTYPES["payment_type"].categories, n_rows
+            ),
+            "payment_installments": with_missing(rng.integers(1, 11, n_rows), 0.0001),
+            "payment_value": with_missing(np.round(price + freight, 2), 0.0001),
+            "customer_unique_id": ids("u"),
+            "customer_zip_code_prefix": rng.integers(1000, 99990, n_rows),
+            "customer_city": rng.choice(["sao paulo", "rio de janeiro", "curitiba"], n_rows),
+            "customer_state": rng.choice(
+                CATEGORICAL_DTYPES["customer_state"].categories, n_rows
+            ),
+            "order_item_id": rng.integers(1, 4, n_rows),
+            "product_id": ids("p"),
+            "seller_id": ids("s"),
+            "price": price,
+            "freight_value": freight,
+            "product_category_name": rng.choice(["beleza_saude", "esporte_lazer"], n_rows),
+            "product_name_lenght": with_missing(rng.integers(5, 76, n_rows), 0.015),
+            "product_description_lenght": with_missing(rng.integers(4, 3993, n_rows), 0.015),
+            "product_photos_qty": with_missing(rng.integers(1, 10, n_rows), 0.015),
+            "product_weight_g": with_missing(rng.integers(50, 30000, n_rows), 0.0002),
+            "product_length_cm": with_missing(rng.integers(7, 105, n_rows), 0.0002),
+            "product_height_cm": with_missing(rng.integers(2, 105, n_rows), 0.0002),
+            "product_width_cm": with_missing(rng.integers(6, 118, n_rows), 0.0002),
+            "review_id": ids("r"),
+            "review_score": rng.choice([1, 2, 3, 4, 5], n_rows, p=[0.11, 0.03, 0.08, 0.19, 0.59]),
+            "review_comment_message": reviews,
+        }
+    )
+
+
+# Row counts of the standard benchmark sizes.
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000, "10M": 10_000_000}
+
+
+def write_olist_csv(path: str, n_rows: int, seed: int = 42, chunksize: int = 1_000_000) -> str:
+    """
+    Writes a synthetic Olist export of `n_rows` rows to `path`.
+
+    Exports larger than `chunksize` are generated and appended chunk by
+    chunk, each chunk seeded from `seed` and its position, so memory stays
+    bounded and the file is the same on every run.
+    """
+    if n_rows <= chunksize:
+        make_olist_frame(n_rows, seed).to_csv(path, index=False)
+        return path
+    for index, start in enumerate(range(0, n_rows, chunksize)):
+        chunk = make_olist_frame(min(chunksize, n_rows - start), seed=seed + index)
+        chunk.to_csv(path, index=False, mode="w" if index == 0 else "a", header=index == 0)
+    return path
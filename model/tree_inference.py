@@ -0,0 +1,355 @@
+import json
+from typing import List, Optional
+
+import numpy as np
+
+# How a node routes a missing (NaN) value:
+# NaN goes to the default child (XGBoost, scikit-learn, LightGBM "NaN").
+MISSING_DEFAULT = 0
+# NaN is compared as 0.0 (LightGBM "None").
+MISSING_AS_ZERO = 1
+# NaN and 0.0 both go to the default child (LightGBM "Zero").
+MISSING_ZERO_DEFAULT = 2
+
+_LIGHTGBM_MISSING = {"None": MISSING_AS_ZERO, "Zero": MISSING_ZERO_DEFAULT, "NaN": MISSING_DEFAULT}
+# Objectives whose raw score is the prediction, i.e. without a link function.
+_LIGHTGBM_IDENTITY = ("regression", "regression_l1", "huber", "fair", "quantile", "mape")
+_XGBOOST_IDENTITY = (
+    "reg:squarederror",
+    "reg:absoluteerror",
+    "reg:pseudohubererror",
+    "reg:quantileerror",
+)
+
+
+class CompiledEnsemble:
+    """
+    A trained tree ensemble flattened into node arrays.
+
+    Every node of every tree lives in the same arrays: `feature` (-1 marks a
+    leaf), `threshold`, `left`/`right` child indices, the missing-value route
+    and the leaf `value`. `predict` walks all trees for a whole batch one
+    depth level at a time with NumPy, and only needs NumPy to load and run.
+    """
+
+    def __init__(
+        self,
+        roots: np.ndarray,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        default_left: np.ndarray,
+        missing: np.ndarray,
+        value: np.ndarray,
+        base_score: float = 0.0,
+        average: bool = False,
+        strict: bool = False,
+        float32_inputs: bool = False,
+        feature_names: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Args:
+            roots: index of the root node of each tree
+            base_score: constant added to the summed tree outputs
+            average: average the tree outputs instead of summing them
+            strict: split on `x < threshold` instead of `x <= threshold`
+            float32_inputs: round inputs to float32 before comparing, as the
+                original library does
+            feature_names: input columns in training order
+        """
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.missing = np.asarray(missing, dtype=np.int8)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.base_score = float(base_score)
+        self.average = bool(average)
+        self.strict = bool(strict)
+        self.float32_inputs = bool(float32_inputs)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        self.max_depth = self._max_depth()
+        self.has_zero_default = bool((self.missing == MISSING_ZERO_DEFAULT).any())
+
+    def _max_depth(self) -> int:
+        depth, nodes = 0, self.roots
+        while True:
+            nodes = nodes[self.feature[nodes] >= 0]
+            if nodes.size == 0:
+                return depth
+            nodes = np.concatenate([self.left[nodes], self.right[nodes]])
+            depth += 1
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def _as_matrix(self, data) -> np.ndarray:
+        if hasattr(data, "columns") and self.feature_names is not None:
+            missing = [c for c in self.feature_names if c not in data.columns]
+            if missing:
+                raise ValueError(f"Input is missing the columns {missing}")
+            data = data[self.feature_names]
+        matrix = np.asarray(data, dtype=np.float64)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        if self.float32_inputs:
+            matrix = matrix.astype(np.float32).astype(np.float64)
+        return matrix
+
+    def predict(self, data, block_size: int = 65_536) -> np.ndarray:
+        """
+        Predicts a batch. Rows are processed in blocks of about `block_size`
+        (row, tree) pairs to bound the size of the working arrays.
+        """
+        matrix = self._as_matrix(data)
+        prediction = np.empty(len(matrix), dtype=np.float64)
+        rows_per_block = max(1, block_size // max(1, self.n_trees))
+        for start in range(0, len(matrix), rows_per_block):
+            block = matrix[start : start + rows_per_block]
+            prediction[start : start + len(block)] = self._predict_block(block)
+        return prediction
+
+    def _predict_block(self, block: np.ndarray) -> np.ndarray:
+        n_rows, n_features = block.shape
+        values = np.ascontiguousarray(block).ravel()
+        # one entry per (row, tree) pair, flattened row-major
+        offsets = np.repeat(np.arange(n_rows) * n_features, self.n_trees)
+        node = np.tile(self.roots, n_rows)
+        active = np.arange(node.size)
+        # only entries that have not reached a leaf are advanced each level
+        while active.size:
+            current = node[active]
+            feature = self.feature[current]
+            internal = feature >= 0
+            active, current, feature = active[internal], current[internal], feature[internal]
+            if not active.size:
+                break
+            x = values[offsets[active] + feature]
+            threshold = self.threshold[current]
+            go_left = x < threshold if self.strict else x <= threshold
+            if self.has_zero_default or np.isnan(x).any():
+                go_left = self._route_missing(x, current, threshold, go_left)
+            node[active] = np.where(go_left, self.left[current], self.right[current])
+        leaves = self.value[node].reshape(n_rows, self.n_trees)
+        total = leaves.mean(axis=1) if self.average else leaves.sum(axis=1)
+        return total + self.base_score
+
+    def _route_missing(self, x, current, threshold, go_left) -> np.ndarray:
+        missing = self.missing[current]
+        is_nan = np.isnan(x)
+        as_zero = is_nan & (missing != MISSING_DEFAULT)
+        x = np.where(as_zero, 0.0, x)
+        go_left = np.where(as_zero, (x < threshold) if self.strict else (x <= threshold), go_left)
+        use_default = (is_nan & (missing == MISSING_DEFAULT)) | (
+            (missing == MISSING_ZERO_DEFAULT) & (np.abs(x) <= 1e-35)
+        )
+        return np.where(use_default, self.default_left[current], go_left)
+
+    def save(self, path: str) -> None:
+        """Stores the arrays and settings in a single `.npz` file."""
+        meta = {
+            "base_score": self.base_score,
+            "average": self.average,
+            "strict": self.strict,
+            "float32_inputs": self.float32_inputs,
+            "feature_names": self.feature_names,
+        }
+        with open(path, "wb") as fid:
+            np.savez(
+                fid,
+                roots=self.roots,
+                feature=self.feature,
+                threshold=self.threshold,
+                left=self.left,
+                right=self.right,
+                default_left=self.default_left,
+                missing=self.missing,
+                value=self.value,
+                meta=np.array(json.dumps(meta)),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledEnsemble":
+        """Restores an ensemble stored by `save`."""
+        with np.load(path) as arrays:
+            meta = json.loads(str(arrays["meta"]))
+            nodes = {name: arrays[name] for name in arrays.files if name != "meta"}
+        return cls(**nodes, **meta)
+
+
+class _NodeArrays:
+    """Growable node arrays used while flattening trees."""
+
+    def __init__(self) -> None:
+        self.columns = {
+            name: []
+            for name in ("feature", "threshold", "left", "right", "default_left", "missing", "value")
+        }
+        self.roots = []
+
+    def add(self, **node) -> int:
+        index = len(self.columns["feature"])
+        defaults = {
+            "feature": -1,
+            "threshold": 0.0,
+            "left": index,
+            "right": index,
+            "default_left": False,
+            "missing": MISSING_DEFAULT,
+            "value": 0.0,
+        }
+        defaults.update(node)
+        for name, column in self.columns.items():
+            column.append(defaults[name])
+        return index
+
+    def set_children(self, index: int, left: int, right: int) -> None:
+        self.columns["left"][index] = left
+        self.columns["right"][index] = right
+
+    def build(self, **settings) -> CompiledEnsemble:
+        return CompiledEnsemble(roots=np.array(self.roots), **self.columns, **settings)
+
+
+def _compile_lightgbm(booster) -> CompiledEnsemble:
+    dump = booster.dump_model()
+    if dump["objective"].split(" ")[0] not in _LIGHTGBM_IDENTITY:
+        raise NotImplementedError(f"Unsupported LightGBM objective {dump['objective']}")
+    nodes = _NodeArrays()
+    for tree in dump["tree_info"]:
+        root = tree["tree_structure"]
+        stack = [(root, None, None)]
+        while stack:
+            spec, parent, is_left = stack.pop()
+            if "split_index" in spec:
+                if spec["decision_type"] != "<=":
+                    raise NotImplementedError("Categorical LightGBM splits are not supported")
+                index = nodes.add(
+                    feature=spec["split_feature"],
+                    threshold=float(spec["threshold"]),
+                    default_left=spec["default_left"],
+                    missing=_LIGHTGBM_MISSING[spec["missing_type"]],
+                )
+                stack.append((spec["right_child"], index, False))
+                stack.append((spec["left_child"], index, True))
+            else:
+                index = nodes.add(value=spec["leaf_value"])
+            if parent is None:
+                nodes.roots.append(index)
+            elif is_left:
+                nodes.columns["left"][parent] = index
+            else:
+                nodes.columns["right"][parent] = index
+    return nodes.build(
+        average=dump.get("average_output", False),
+        feature_names=dump.get("feature_names"),
+    )
+
+
+def _parse_float(text: str) -> float:
+    # XGBoost >= 2 stores scalars as a one-element vector, e.g. "[5E-1]"
+    return float(str(text).strip("[]"))
+
+
+def _compile_xgboost(booster) -> CompiledEnsemble:
+    config = json.loads(booster.save_config())
+    objective = config["learner"]["objective"]["name"]
+    if objective not in _XGBOOST_IDENTITY:
+        raise NotImplementedError(f"Unsupported XGBoost objective {objective}")
+    base_score = _parse_float(config["learner"]["learner_model_param"]["base_score"])
+    feature_names = booster.feature_names
+    feature_index = {name: i for i, name in enumerate(feature_names or [])}
+
+    nodes = _NodeArrays()
+    for dump in booster.get_dump(dump_format="json"):
+        stack = [(json.loads(dump), None, None)]
+        ids = {}
+        pending = []
+        while stack:
+            spec, parent, _ = stack.pop()
+            if "leaf" in spec:
+                # single-precision leaves, as accumulated by XGBoost
+                index = nodes.add(value=float(np.float32(spec["leaf"])))
+            else:
+                if "split_condition" not in spec:
+                    raise NotImplementedError("Categorical XGBoost splits are not supported")
+                split = spec["split"]
+                feature = feature_index[split] if split in feature_index else int(split[1:])
+                index = nodes.add(
+                    feature=feature,
+                    threshold=float(np.float32(spec["split_condition"])),
+                    default_left=spec["missing"] == spec["yes"],
+                )
+                pending.append((index, spec["yes"], spec["no"]))
+                stack.extend((child, index, None) for child in spec["children"])
+            ids[spec["nodeid"]] = index
+            if parent is None:
+                nodes.roots.append(index)
+        for index, yes, no in pending:
+            nodes.set_children(index, ids[yes], ids[no])
+    return nodes.build(
+        base_score=base_score,
+        strict=True,
+        float32_inputs=True,
+        feature_names=feature_names,
+    )
+
+
+def _compile_sklearn(estimators, feature_names) -> CompiledEnsemble:
+    parts = {name: [] for name in ("feature", "threshold", "left", "right", "default_left", "value")}
+    roots, offset = [], 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        nodes = np.arange(tree.node_count)
+        is_leaf = tree.children_left < 0
+        roots.append(offset)
+        parts["feature"].append(np.where(is_leaf, -1, tree.feature))
+        parts["threshold"].append(tree.threshold)
+        parts["left"].append(np.where(is_leaf, nodes, tree.children_left) + offset)
+        parts["right"].append(np.where(is_leaf, nodes, tree.children_right) + offset)
+        # trees fitted with missing values record where NaN goes (>= 1.3)
+        parts["default_left"].append(
+            getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=bool))
+        )
+        parts["value"].append(tree.value.reshape(tree.node_count, -1)[:, 0])
+        offset += tree.node_count
+    arrays = {name: np.concatenate(values) for name, values in parts.items()}
+    return CompiledEnsemble(
+        roots=np.array(roots),
+        missing=np.full(offset, MISSING_DEFAULT),
+        average=True,
+        float32_inputs=True,
+        feature_names=list(feature_names) if feature_names is not None else None,
+        **arrays,
+    )
+
+
+def compile_model(model) -> CompiledEnsemble:
+    """
+    Compiles a trained regressor into a `CompiledEnsemble`.
+
+    Supports LGBMRegressor / lightgbm.Booster, XGBRegressor / xgboost.Booster
+    and scikit-learn RandomForestRegressor / DecisionTreeRegressor. The
+    libraries are not imported here; the model is recognised by its API.
+    """
+    if hasattr(model, "booster_"):  # LGBMRegressor
+        return _compile_lightgbm(model.booster_)
+    if hasattr(model, "dump_model"):  # lightgbm.Booster
+        return _compile_lightgbm(model)
+    if hasattr(model, "get_booster"):  # XGBRegressor
+        booster = model.get_booster()
+        best_iteration = getattr(model, "best_iteration", None)
+        if best_iteration is not None:
+            booster = booster[: best_iteration + 1]
+        return _compile_xgboost(booster)
+    if hasattr(model, "get_dump"):  # xgboost.Booster
+        return _compile_xgboost(model)
+    if hasattr(model, "estimators_"):  # forest ensembles
+        return _compile_sklearn(model.estimators_, getattr(model, "feature_names_in_", None))
+    if hasattr(model, "tree_"):  # a single decision tree
+        return _compile_sklearn([model], getattr(model, "feature_names_in_", None))
+    raise TypeError(f"Cannot compile a model of type {type(model).__name__}")
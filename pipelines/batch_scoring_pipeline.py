@@ -0,0 +1,38 @@
+from typing import List, Optional
+
+from zenml import pipeline
+from zenml.config import DockerSettings
+from zenml.integrations.constants import MLFLOW
+
+from model.batch_scoring import PREDICTIONS_PATH
+from model.data_cleaning import PREPROCESSOR_PATH
+from model.data_ingestion import DATA_PATH
+from model.model_loader import MODEL_PATH
+from steps.batch_scoring import batch_score
+
+docker_settings = DockerSettings(required_integrations=[MLFLOW])
+
+
+@pipeline(enable_cache=False, settings={"docker": docker_settings})
+def batch_scoring_pipeline(
+    input_path: str = DATA_PATH,
+    output_path: str = PREDICTIONS_PATH,
+    model_uri: str = MODEL_PATH,
+    preprocessor_path: Optional[str] = PREPROCESSOR_PATH,
+    id_columns: Optional[List[str]] = None,
+    chunksize: int = 100_000,
+    n_workers: int = 1,
+):
+    """Offline scoring of a large export without the prediction server"""
+
+    n_rows = batch_score(
+        input_path=input_path,
+        output_path=output_path,
+        model_uri=model_uri,
+        preprocessor_path=preprocessor_path,
+        id_columns=id_columns,
+        chunksize=chunksize,
+        n_workers=n_workers,
+    )
+
+    return n_rows
@@ -1,6 +1,7 @@
-import json
 import logging
 import os
+from typing import Union
+
 import numpy as np
 import pandas as pd
 from zenml import pipeline, step
@@ -12,11 +13,21 @@ from zenml.integrations.mlflow.model_deployers.mlflow_model_deployer import (
 from zenml.integrations.mlflow.services import MLFlowDeploymentService
 from zenml.integrations.mlflow.steps import mlflow_model_deployer_step
 
+from model.prediction_cache import get_prediction_cache
+from model.profiling import profiled
 from steps.clean_data import clean_data
 from steps.evaluation import evaluation
 from steps.ingest_data import ingest_data
 from steps.model_train import train_model
-from .utils import get_data_for_test
+from steps.retraining import commit_retraining, plan_retraining
+from steps.tracking import with_experiment_tracker
+from .utils import (
+    ensure_service_ready,
+    forget_service,
+    get_data_for_test,
+    serving_feature_columns,
+    to_feature_matrix,
+)
 from pydantic import BaseModel
 
 
@@ -26,10 +37,10 @@ requirements_file = os.path.join(os.path.dirname(__file__), "requirements.txt")
 
 
 @step(enable_cache=False)
-def dynamic_importer() -> str:
+def dynamic_importer() -> np.ndarray:
     """Downloads the latest data from a mock API."""
     data = get_data_for_test()
-    return data
+    return to_feature_matrix(data, columns=list(data.columns))
 
 
 class DeploymentTriggerConfig(BaseModel):
@@ -94,66 +105,23 @@ def prediction_service_loader(
 
 
 @step
+@profiled(rows_from="data")
 def predictor(
     service: MLFlowDeploymentService,
-    data: np.ndarray,
-) -> np.ndarray:
-    """Run an inference request against a prediction service"""
-
-    service.start(timeout=10)  # should be a NOP if already started
-    data = json.loads(data)
-    data.pop("columns")
-    data.pop("index")
-    columns_for_df = [
-        "payment_sequential",
-        "payment_installments",
-        "payment_value",
-        "price",
-        "freight_value",
-        "product_name_lenght",
-        "product_description_lenght",
-        "product_photos_qty",
-        "product_weight_g",
-        "product_length_cm",
-        "product_height_cm",
-        "product_width_cm",
-    ]
-    df = pd.DataFrame(data["data"], columns=columns_for_df)
-    json_list = json.loads(json.dumps(list(df.T.to_dict().values())))
-    data = np.array(json_list)
-    prediction = service.predict(data)
-    return prediction
-
-
-@step
-def predictor(
-    service: MLFlowDeploymentService,
-    data: str,
+    data: Union[np.ndarray, pd.DataFrame],
 ) -> np.ndarray:
     """Run an inference request against a prediction service"""
 
-    service.start(timeout=10)  # should be a NOP if already started
-    data = json.loads(data)
-    data.pop("columns")
-    data.pop("index")
-    columns_for_df = [
-        "payment_sequential",
-        "payment_installments",
-        "payment_value",
-        "price",
-        "freight_value",
-        "product_name_lenght",
-        "product_description_lenght",
-        "product_photos_qty",
-        "product_weight_g",
-        "product_length_cm",
-        "product_height_cm",
-        "product_width_cm",
-    ]
-    df = pd.DataFrame(data["data"], columns=columns_for_df)
-    json_list = json.loads(json.dumps(list(df.T.to_dict().values())))
-    data = np.array(json_list)
-    prediction = service.predict(data)
+    ensure_service_ready(service)  # returns at once for a service seen ready before
+    # validated and converted once, without intermediate JSON or dicts
+    rows = to_feature_matrix(data, columns=serving_feature_columns())
+    # a redeployed model has a new model URI, which drops the cached predictions
+    model_version = f"{service.uuid}:{service.config.model_uri}"
+    try:
+        prediction = get_prediction_cache().predict(rows, model_version, service.predict)
+    except Exception:
+        forget_service(service)
+        raise
     return prediction
 
 
@@ -162,25 +130,65 @@ def continuous_deployment_pipeline(
     min_accuracy: float = 0,
     workers: int = 1,
     timeout: int = 60,
+    incremental: bool = False,
+    timestamp_features: bool = False,
+    feature_matrix: bool = False,
 ):
-    """Training and deployment pipeline."""
+    """
+    Training and deployment pipeline.
+
+    With `incremental`, the deployed LightGBM/XGBoost model is warm-started
+    on the orders placed since the last deployed run instead of retrained on
+    the full history; `plan_retraining` falls back to a full retraining on
+    schedule or when the new orders have drifted.
+
+    With `timestamp_features`, the model is also trained on the delivery and
+    purchase-time features derived from the order timestamps, see
+    `model.data_cleaning.timestamp_features`. With `feature_matrix`, the
+    models train on float32 FeatureMatrix objects instead of DataFrames.
+    """
     try:
+        tracked_train_model = with_experiment_tracker(train_model)
+        tracked_evaluation = with_experiment_tracker(evaluation)
+
         # Get the data
-        df = ingest_data()
-        
-        # Clean and prepare the data
-        x_train, x_test, y_train, y_test = clean_data(df)
-        
-        # Train the model
-        model = train_model(
-            x_train=x_train,
-            x_test=x_test,
-            y_train=y_train,
-            y_test=y_test,
-        )
+        df = ingest_data(parse_timestamps=incremental or timestamp_features)
+
+        if incremental:
+            training_data, warm_start = plan_retraining(df)
+            x_train, x_test, y_train, y_test = clean_data(
+                training_data,
+                reuse_preprocessor=warm_start,
+                timestamp_features=timestamp_features,
+                feature_matrix=feature_matrix,
+                save_preprocessor=True,
+            )
+            model = tracked_train_model(
+                x_train=x_train,
+                x_test=x_test,
+                y_train=y_train,
+                y_test=y_test,
+                warm_start=warm_start,
+            )
+        else:
+            # Clean and prepare the data
+            x_train, x_test, y_train, y_test = clean_data(
+                df,
+                timestamp_features=timestamp_features,
+                feature_matrix=feature_matrix,
+                save_preprocessor=True,
+            )
+
+            # Train the model
+            model = tracked_train_model(
+                x_train=x_train,
+                x_test=x_test,
+                y_train=y_train,
+                y_test=y_test,
+            )
         
         # Evaluate the model
-        r2_score, rmse = evaluation(
+        r2_score, rmse = tracked_evaluation(
             model=model,
             x_test=x_test,
             y_test=y_test,
@@ -198,6 +206,15 @@ def continuous_deployment_pipeline(
             workers=workers,
             timeout=timeout,
         )
+
+        if incremental:
+            # the next run continues from this model and these orders
+            commit_retraining(
+                df=df,
+                model=model,
+                warm_start=warm_start,
+                deploy_decision=deployment_decision,
+            )
         
     except Exception as e:
         logging.error(f"Pipeline failed: {str(e)}")
@@ -218,8 +235,10 @@ def inference_pipeline(
     )
     
     # Get data for prediction
-    df = ingest_data()
-    x_train, x_test, y_train, y_test = clean_data(df)
+    # the timestamps are read in case the deployed model derives features from them
+    df = ingest_data(parse_timestamps=True)
+    # scored with the preprocessor of the deployed model, which is left as it is
+    x_train, x_test, y_train, y_test = clean_data(df, reuse_preprocessor=True)
     
     # Make predictions using the service
     prediction = predictor(
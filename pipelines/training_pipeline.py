@@ -1,4 +1,3 @@
-import mlflow
 from zenml.config import DockerSettings
 from zenml.integrations.constants import MLFLOW
 from zenml.pipelines import pipeline
@@ -6,6 +5,7 @@ from steps.ingest_data import ingest_data
 from steps.clean_data import clean_data
 from steps.model_train import train_model
 from steps.evaluation import evaluation
+from steps.tracking import with_experiment_tracker
 
 docker_settings = DockerSettings(required_integrations=[MLFLOW])
 
@@ -17,12 +17,14 @@ def train_pipeline():
     df = ingest_data()
     
     # Clean the data
-    x_train, x_test, y_train, y_test = clean_data(df)
+    x_train, x_test, y_train, y_test = clean_data(df, save_preprocessor=True)
     
     # Train the model
-    model = train_model(x_train=x_train, x_test=x_test, y_train=y_train, y_test=y_test)
+    model = with_experiment_tracker(train_model)(
+        x_train=x_train, x_test=x_test, y_train=y_train, y_test=y_test
+    )
     
     # Evaluate the model
-    mse, rmse = evaluation(model=model, x_test=x_test, y_test=y_test)
+    mse, rmse = with_experiment_tracker(evaluation)(model=model, x_test=x_test, y_test=y_test)
     
     return mse, rmse
\ No newline at end of file
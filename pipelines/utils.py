@@ -1,19 +1,107 @@
 import logging
+import os
+import time
+import urllib.request
+from typing import List
 
 import pandas as pd
-from model.data_cleaning import DataCleaning, DataPreprocessStrategy
 
+from model.data_cache import DatasetCache
+from model.data_cleaning import PREPROCESSOR_PATH, DataCleaning, DataPreprocessStrategy
+from model.data_ingestion import TARGET_COLUMN, IngestData
+from model.feature_matrix import to_feature_matrix  # noqa: F401, re-exported for the pipelines
 
-def get_data_for_test():
+
+def load_preprocessor() -> DataPreprocessStrategy:
+    """The preprocessor fitted at training time, or an unfitted default one."""
+    if os.path.exists(PREPROCESSOR_PATH):
+        return DataPreprocessStrategy.load(PREPROCESSOR_PATH)
+    return DataPreprocessStrategy()
+
+
+def serving_feature_columns() -> List[str]:
+    """Feature columns of the model trained with the saved preprocessor."""
+    return load_preprocessor().feature_columns
+
+
+def get_data_for_test() -> pd.DataFrame:
     try:
-        df = pd.read_csv("./data/olist_customers_dataset.csv")
+        # reuse the medians fitted at training time when they are available
+        preprocess_strategy = load_preprocessor()
+        columns = preprocess_strategy.input_columns + [TARGET_COLUMN]
+        df = IngestData(columns=columns, cache=DatasetCache()).get_data()
         df = df.sample(n=100)
-        preprocess_strategy = DataPreprocessStrategy()
         data_cleaning = DataCleaning(df, preprocess_strategy)
         df = data_cleaning.handle_data()
-        df.drop(["review_score"], axis=1, inplace=True)
-        result = df.to_json(orient="split")
-        return result
+        return df.drop(columns=[TARGET_COLUMN])
     except Exception as e:
         logging.error(e)
         raise e
+
+
+def health_url(prediction_url: str) -> str:
+    """Maps a model server's `/invocations` URL to its `/ping` health endpoint."""
+    base = prediction_url.rstrip("/")
+    if base.endswith("/invocations"):
+        base = base[: -len("/invocations")]
+    return f"{base}/ping"
+
+
+def wait_for_service(
+    url: str,
+    timeout: float = 60.0,
+    initial_delay: float = 0.05,
+    max_delay: float = 2.0,
+) -> float:
+    """
+    Polls a health endpoint until it answers 200, backing off exponentially
+    between attempts, and returns as soon as it does.
+
+    Args:
+        url: health endpoint, e.g. `health_url(service.prediction_url)`
+        timeout: seconds to wait before giving up
+        initial_delay: pause after the first failed attempt, doubled after each
+        max_delay: longest pause between two attempts
+    Returns:
+        waited: seconds until the endpoint was ready
+    """
+    start = time.monotonic()
+    delay = initial_delay
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=max(delay, 1.0)) as response:
+                if response.status == 200:
+                    return time.monotonic() - start
+        except OSError:  # refused, reset, timed out or an HTTP error status
+            pass
+        remaining = timeout - (time.monotonic() - start)
+        if remaining <= 0:
+            raise TimeoutError(f"{url} was not ready after {timeout:.0f}s")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+
+
+# Services this process has already seen answer their health check.
+_ready_services = set()
+
+
+def ensure_service_ready(service, timeout: float = 60.0):
+    """
+    Starts `service` if needed and waits until its model server answers.
+
+    A service already found ready by this process is returned right away;
+    call `forget_service` when a request to it fails so the next call checks
+    it again.
+    """
+    if service.uuid in _ready_services:
+        return service
+    if not service.is_running:
+        service.start(timeout=timeout)
+    waited = wait_for_service(health_url(service.prediction_url), timeout=timeout)
+    logging.info(f"Prediction service {service.uuid} ready after {waited:.2f}s")
+    _ready_services.add(service.uuid)
+    return service
+
+
+def forget_service(service) -> None:
+    _ready_services.discard(service.uuid)
@@ -0,0 +1,35 @@
+import click
+
+from model.batch_scoring import PREDICTIONS_PATH
+from model.data_ingestion import DATA_PATH
+from model.model_loader import MODEL_PATH
+from pipelines.batch_scoring_pipeline import batch_scoring_pipeline
+
+
+@click.command()
+@click.option("--input-path", default=DATA_PATH, help="CSV export to score")
+@click.option("--output-path", default=PREDICTIONS_PATH, help="Parquet file for the predictions")
+@click.option(
+    "--model-uri",
+    default=MODEL_PATH,
+    help="Pickled model, compiled .npz ensemble or MLflow model URI "
+    "(e.g. `models:/customer_satisfaction/1`)",
+)
+@click.option("--id-column", "id_columns", multiple=True, help="Input column to keep next to each prediction")
+@click.option("--chunksize", default=100_000, help="Rows read and scored at a time")
+@click.option("--workers", default=1, help="Number of scoring processes")
+def main(input_path, output_path, model_uri, id_columns, chunksize, workers):
+    """Score a large export offline, bypassing the MLflow prediction server."""
+    batch_scoring_pipeline(
+        input_path=input_path,
+        output_path=output_path,
+        model_uri=model_uri,
+        id_columns=list(id_columns),
+        chunksize=chunksize,
+        n_workers=workers,
+    )
+    print(f"Predictions written to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 from typing import cast
 import click
 from rich import print
-import time
 from zenml.integrations.mlflow.mlflow_utils import get_tracking_uri
 from zenml.integrations.mlflow.model_deployers.mlflow_model_deployer import (
     MLFlowModelDeployer,
@@ -11,8 +10,7 @@ from pipelines.deployment_pipeline import (
     continuous_deployment_pipeline,
     inference_pipeline,
 )
-
-from typing import cast
+from pipelines.utils import ensure_service_ready
 
 DEPLOY = "deploy"
 PREDICT = "predict"
@@ -35,7 +33,34 @@ DEPLOY_AND_PREDICT = "deploy_and_predict"
     default=0,
     help="Minimum accuracy required to deploy the model",
 )
-def main(config: str, min_accuracy: float):
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Warm-start the deployed model on the orders placed since the last "
+    "deployment instead of retraining on the full history.",
+)
+@click.option(
+    "--timestamp-features",
+    is_flag=True,
+    default=False,
+    help="Also train on the delivery and purchase-time features derived from "
+    "the order timestamps.",
+)
+@click.option(
+    "--feature-matrix",
+    is_flag=True,
+    default=False,
+    help="Train on float32 feature matrices instead of DataFrames, halving "
+    "the memory of the training data.",
+)
+def main(
+    config: str,
+    min_accuracy: float,
+    incremental: bool,
+    timestamp_features: bool,
+    feature_matrix: bool,
+):
     """Run the MLflow example pipeline."""
     mlflow_model_deployer_component = MLFlowModelDeployer.get_active_model_deployer()
     deploy = config == DEPLOY or config == DEPLOY_AND_PREDICT
@@ -47,20 +72,29 @@ def main(config: str, min_accuracy: float):
             min_accuracy=min_accuracy,
             workers=3,
             timeout=60,
+            incremental=incremental,
+            timestamp_features=timestamp_features,
+            feature_matrix=feature_matrix,
         )
         print(
             "Deployment pipeline completed. Waiting for model to be deployed..."
         )
-        time.sleep(10)  # Give some time for the deployment to complete
 
-    if predict:
-        # Get the active deployment if any
-        existing_services = mlflow_model_deployer_component.find_model_server(
-            pipeline_name="continuous_deployment_pipeline",
-            pipeline_step_name="mlflow_model_deployer_step",
-            model_name="model",
-        )
+    # Looked up once and reused below instead of polling the deployer again
+    existing_services = mlflow_model_deployer_component.find_model_server(
+        pipeline_name="continuous_deployment_pipeline",
+        pipeline_step_name="mlflow_model_deployer_step",
+        model_name="model",
+    )
+
+    if deploy and existing_services:
+        try:
+            # returns as soon as the model server answers its health check
+            ensure_service_ready(cast(MLFlowDeploymentService, existing_services[0]))
+        except TimeoutError as e:
+            print(f"The MLflow prediction server did not become ready: {e}")
 
+    if predict:
         if not existing_services:
             print(
                 "No MLflow prediction service is currently running. The deployment "
@@ -79,12 +113,6 @@ def main(config: str, min_accuracy: float):
         f"\nMLflow UI: [italic green]mlflow ui --backend-store-uri '{get_tracking_uri()}'[/italic green]"
     )
 
-    existing_services = mlflow_model_deployer_component.find_model_server(
-        pipeline_name="continuous_deployment_pipeline",
-        pipeline_step_name="mlflow_model_deployer_step",
-        model_name="model",
-    )
-
     if existing_services:
         service = cast(MLFlowDeploymentService, existing_services[0])
         if service.is_running:
@@ -1,9 +1,4 @@
-from zenml.pipelines import pipeline
 from pipelines.training_pipeline import train_pipeline
-from steps.clean_data import clean_data
-from steps.evaluation import evaluation
-from steps.ingest_data import ingest_data
-from steps.model_train import train_model
 from zenml.integrations.mlflow.mlflow_utils import get_tracking_uri
 
 if __name__ == "__main__":
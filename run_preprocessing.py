@@ -0,0 +1,37 @@
+import click
+
+from model.data_cache import DatasetCache
+from model.data_cleaning import PREPROCESSOR_PATH, DataCleaning, DataPreprocessStrategy
+from model.data_ingestion import DATA_PATH, TARGET_COLUMN, IngestData
+
+
+@click.command()
+@click.option("--input-path", default=DATA_PATH, help="CSV export to preprocess")
+@click.option("--output-dir", required=True, help="Directory for the cleaned Parquet parts")
+@click.option("--chunksize", default=100_000, help="Rows read and cleaned at a time")
+@click.option(
+    "--timestamp-features",
+    is_flag=True,
+    default=False,
+    help="Add the features derived from the order timestamps",
+)
+@click.option(
+    "--preprocessor-path",
+    default=PREPROCESSOR_PATH,
+    help="Where the fitted preprocessor is saved for training and serving",
+)
+def main(input_path, output_dir, chunksize, timestamp_features, preprocessor_path):
+    """Preprocess an export too large for memory, one chunk at a time."""
+    strategy = DataPreprocessStrategy(timestamp_features=timestamp_features)
+    ingest = IngestData(
+        input_path, columns=strategy.input_columns + [TARGET_COLUMN], cache=DatasetCache()
+    )
+    paths = DataCleaning(None, strategy).handle_stream(
+        lambda: ingest.iter_chunks(chunksize), output_dir
+    )
+    strategy.save(preprocessor_path)
+    print(f"{len(paths)} cleaned parts written to {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
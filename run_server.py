@@ -0,0 +1,57 @@
+import asyncio
+import logging
+
+import click
+
+from model.data_cleaning import DataPreprocessStrategy
+from model.model_loader import get_model, resolve_model_uri
+from model.prediction_server import PredictionServer
+
+
+@click.command()
+@click.option(
+    "--model-uri",
+    default=None,
+    help="Pickled model, compiled .npz ensemble or MLflow model URI "
+    "(defaults to CUSTOMER_SATISFACTION_MODEL_URI, then saved_model/model.pkl)",
+)
+@click.option(
+    "--preprocessor-path",
+    default=None,
+    help="Saved preprocessor applied to named rows, required for models trained "
+    "with timestamp features (e.g. saved_model/preprocessor.json)",
+)
+@click.option("--host", default="127.0.0.1", help="Interface to listen on")
+@click.option("--port", default=8000, help="Port to listen on")
+@click.option("--max-batch-size", default=256, help="Most rows scored by one predict call")
+@click.option(
+    "--max-latency-ms",
+    default=5.0,
+    help="Longest a request waits for other requests to join its batch",
+)
+@click.option(
+    "--max-body-bytes",
+    default=16 * 1024 * 1024,
+    help="Largest request body accepted, larger ones are answered with 413",
+)
+def main(model_uri, preprocessor_path, host, port, max_batch_size, max_latency_ms, max_body_bytes):
+    """Serve the model locally with micro-batched predictions."""
+    logging.basicConfig(level=logging.INFO)
+    model_uri = resolve_model_uri(model_uri)
+    preprocessor = DataPreprocessStrategy.load(preprocessor_path) if preprocessor_path else None
+    server = PredictionServer(
+        get_model(model_uri), max_batch_size, max_latency_ms, preprocessor, max_body_bytes
+    )
+    print(
+        f"Serving {model_uri} on http://{host}:{port}\n"
+        "    POST /invocations  {\"instances\": [[...12 features...]]}\n"
+        "    GET  /metrics      throughput, batch size and latency percentiles"
+    )
+    try:
+        asyncio.run(server.serve_forever(host, port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
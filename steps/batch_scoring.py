@@ -0,0 +1,46 @@
+import logging
+from typing import List, Optional
+
+from model.batch_scoring import PREDICTIONS_PATH, BatchScorer
+from model.data_cleaning import PREPROCESSOR_PATH
+from model.model_loader import MODEL_PATH
+from model.profiling import profiled
+from zenml import step
+
+
+@step(enable_cache=False)
+@profiled()
+def batch_score(
+    input_path: str,
+    output_path: str = PREDICTIONS_PATH,
+    model_uri: str = MODEL_PATH,
+    preprocessor_path: Optional[str] = PREPROCESSOR_PATH,
+    id_columns: Optional[List[str]] = None,
+    chunksize: int = 100_000,
+    n_workers: int = 1,
+) -> int:
+    """
+    Scores a CSV export with the model artifact and writes the predictions to Parquet.
+
+    Args:
+        input_path: CSV file with the model feature columns
+        output_path: Parquet file the predictions are written to
+        model_uri: pickled model, compiled `.npz` ensemble or MLflow model URI
+        preprocessor_path: saved DataPreprocessStrategy fitted at training time
+        id_columns: input columns copied next to each prediction
+        chunksize: rows read and scored at a time
+        n_workers: scoring processes
+    Returns:
+        n_rows: int
+    """
+    try:
+        scorer = BatchScorer(
+            model_uri=model_uri,
+            preprocessor_path=preprocessor_path,
+            chunksize=chunksize,
+            n_workers=n_workers,
+        )
+        return scorer.score_file(input_path, output_path, id_columns=id_columns)
+    except Exception as e:
+        logging.error(f"Error in batch_score step: {str(e)}")
+        raise e
@@ -1,11 +1,10 @@
 import logging
-from typing import Tuple
+from typing import Optional, Tuple, Union
 import pandas as pd
-from model.data_cleaning import (
-    DataCleaning,
-    DataDivideStrategy,
-    DataPreprocessStrategy,
-)
+from materializer.custom_materializer import cs_materializer
+from model.data_cleaning import DataCleaning, DataDivideStrategy, preprocess
+from model.feature_matrix import FeatureMatrix
+from model.profiling import profiled
 from zenml import step
 from zenml.steps import StepContext
 from typing_extensions import Annotated
@@ -17,11 +16,36 @@ class DataFrameInput(BaseModel):
 
     df: Annotated[pd.DataFrame, Field(...)]
 
-@step
+@step(output_materializers=cs_materializer)
+@profiled(rows_from="df")
 def clean_data(
     df: pd.DataFrame,
-) -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.Series]:
-    """Clean and preprocess the input data."""
+    reuse_preprocessor: bool = False,
+    timestamp_features: Optional[bool] = None,
+    feature_matrix: bool = False,
+    save_preprocessor: bool = False,
+) -> Tuple[
+    Union[pd.DataFrame, FeatureMatrix], Union[pd.DataFrame, FeatureMatrix], pd.Series, pd.Series
+]:
+    """
+    Clean and preprocess the input data.
+
+    With `reuse_preprocessor`, the medians saved by the last full training
+    are applied instead of being refitted, so a warm-started model sees the
+    same imputation as the trees it continues from, and the features the
+    preprocessor was saved with. A `timestamp_features` flag given then must
+    match the saved one.
+
+    With `timestamp_features`, the features derived from the order
+    timestamps are added; `df` must then hold the timestamp columns.
+    Unless reusing the saved preprocessor, None means False.
+
+    With `feature_matrix`, x_train and x_test are contiguous float32
+    FeatureMatrix objects that the models train on without converting them.
+
+    With `save_preprocessor`, set by the training pipelines only, the fitted
+    preprocessor replaces the saved one that serving and warm starts use.
+    """
     try:
         # Convert StepArtifact to DataFrame if needed
         if isinstance(df, StepContext):
@@ -33,15 +57,18 @@ def clean_data(
         logging.info(f"Starting data cleaning with input shape: {df.shape}")
         
         # Preprocess data
-        preprocess_strategy = DataPreprocessStrategy()
-        data_cleaning = DataCleaning(df, preprocess_strategy)
-        preprocessed_data = data_cleaning.handle_data()
+        preprocessed_data = preprocess(
+            df,
+            reuse_preprocessor=reuse_preprocessor,
+            timestamp_features=timestamp_features,
+            save_preprocessor=save_preprocessor,
+        )
         
         if preprocessed_data is None or preprocessed_data.empty:
             raise RuntimeError("Preprocessing resulted in empty or None DataFrame")
         
         # Split data
-        divide_strategy = DataDivideStrategy()
+        divide_strategy = DataDivideStrategy(feature_matrix=feature_matrix)
         data_cleaning = DataCleaning(preprocessed_data, divide_strategy)
         x_train, x_test, y_train, y_test = data_cleaning.handle_data()
         
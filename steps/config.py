@@ -1,11 +1,16 @@
 from pydantic import BaseModel
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 class ModelNameConfig(BaseModel):
     """Model Configurations"""
 
+    # one of the MODELS in model/model_dev.py, "all", or a comma-separated list
     model_name: str = "lightgbm"
     fine_tuning: bool = False
+    n_trials: int = 100
+    n_jobs: int = 1
+    study_storage: Optional[str] = None
+    study_name: Optional[str] = None
 
     class Config:
         protected_namespaces = ()
@@ -24,7 +29,11 @@ class StepConfig:
     def get_train_config() -> Dict[str, Any]:
         return {
             "model_name": "lightgbm",
-            "fine_tuning": False
+            "fine_tuning": False,
+            "n_trials": 100,
+            "n_jobs": 1,
+            "study_storage": None,
+            "study_name": None,
         }
     
     @staticmethod
@@ -1,98 +1,50 @@
 import logging
-import mlflow
-import numpy as np
-import pandas as pd
-from model.evaluation import MSE, RMSE, R2Score
+from materializer.serialization import LazyFrame, iter_frame_pairs
+from model.evaluation import RegressionMetrics
+from model.feature_matrix import as_frame
+from model.profiling import profile
 from sklearn.base import RegressorMixin
 from typing import Tuple
 from zenml import step
-from zenml.client import Client
 
-experiment_tracker = Client().active_stack.experiment_tracker
 
-if experiment_tracker is not None:
-    @step(experiment_tracker=experiment_tracker.name)
-    def evaluation(
-        model: RegressorMixin, x_test: pd.DataFrame, y_test: pd.Series
-    ) -> Tuple[float, float]:
-        """
-        Args:
-            model: RegressorMixin
-            x_test: pd.DataFrame
-            y_test: pd.Series
-        Returns:
-            r2_score: float
-            rmse: float
-        """
-        try:
-            # Set up MLflow experiment
-            mlflow.set_experiment("customer_satisfaction_experiment")
-            
-            with mlflow.start_run(nested=True) as run:
-                prediction = model.predict(x_test)
-
-                # Using the MSE class for mean squared error calculation
-                mse_class = MSE()
-                mse = mse_class.calculate_score(y_test, prediction)
-                mlflow.log_metric("mse", mse)
-
-                # Using the R2Score class for R2 score calculation
-                r2_class = R2Score()
-                r2_score = r2_class.calculate_score(y_test, prediction)
-                mlflow.log_metric("r2_score", r2_score)
-
-                # Using the RMSE class for root mean squared error calculation
-                rmse_class = RMSE()
-                rmse = rmse_class.calculate_score(y_test, prediction)
-                mlflow.log_metric("rmse", rmse)
-                
-                return r2_score, rmse
-        except Exception as e:
-            logging.error(f"Error in evaluation step: {str(e)}")
-            raise e
-        finally:
-            # Ensure any active MLflow run is ended
-            mlflow.end_run()
-else:
-    @step
-    def evaluation(
-        model: RegressorMixin, x_test: pd.DataFrame, y_test: pd.Series
-    ) -> Tuple[float, float]:
-        """
-        Args:
-            model: RegressorMixin
-            x_test: pd.DataFrame
-            y_test: pd.Series
-        Returns:
-            r2_score: float
-            rmse: float
-        """
-        try:
-            # Set up MLflow experiment
-            mlflow.set_experiment("customer_satisfaction_experiment")
-            
-            with mlflow.start_run(nested=True) as run:
-                prediction = model.predict(x_test)
-
-                # Using the MSE class for mean squared error calculation
-                mse_class = MSE()
-                mse = mse_class.calculate_score(y_test, prediction)
-                mlflow.log_metric("mse", mse)
-
-                # Using the R2Score class for R2 score calculation
-                r2_class = R2Score()
-                r2_score = r2_class.calculate_score(y_test, prediction)
-                mlflow.log_metric("r2_score", r2_score)
-
-                # Using the RMSE class for root mean squared error calculation
-                rmse_class = RMSE()
-                rmse = rmse_class.calculate_score(y_test, prediction)
-                mlflow.log_metric("rmse", rmse)
-                
-                return r2_score, rmse
-        except Exception as e:
-            logging.error(f"Error in evaluation step: {str(e)}")
-            raise e
-        finally:
-            # Ensure any active MLflow run is ended
-            mlflow.end_run()
+@step
+def evaluation(
+    model: RegressorMixin, x_test: LazyFrame, y_test: LazyFrame
+) -> Tuple[float, float]:
+    """
+    Args:
+        model: RegressorMixin
+        x_test: LazyFrame over the test features, or the FeatureMatrix
+            itself when `clean_data` emitted one
+        y_test: LazyFrame over the test target
+    Returns:
+        r2_score: float
+        rmse: float
+    """
+    # imported here so that building the pipeline does not load mlflow
+    import mlflow
+
+    try:
+        # Set up MLflow experiment
+        mlflow.set_experiment("customer_satisfaction_experiment")
+
+        # measured inside the run so that the profile is logged to it
+        with mlflow.start_run(nested=True) as run, profile("evaluation", rows=len(y_test)):
+            # features and target are streamed batch by batch from the
+            # artifacts and every metric is accumulated in the same pass
+            metrics = RegressionMetrics()
+            for features, target in iter_frame_pairs(x_test, y_test):
+                metrics.update(target, model.predict(as_frame(features)))
+            scores = metrics.result()
+            mlflow.log_metrics(
+                {("r2_score" if name == "r2" else name): value for name, value in scores.items()}
+            )
+
+            return scores["r2"], scores["rmse"]
+    except Exception as e:
+        logging.error(f"Error in evaluation step: {str(e)}")
+        raise e
+    finally:
+        # Ensure any active MLflow run is ended
+        mlflow.end_run()
@@ -1,17 +1,22 @@
 import logging
-import os
 import pandas as pd
+from model.data_cache import DatasetCache
+from model.data_ingestion import DATA_PATH, IngestData
+from model.profiling import profiled
 from zenml import step
 
 @step
-def ingest_data() -> pd.DataFrame:
-    """Ingest data from CSV file."""
+@profiled()
+def ingest_data(
+    data_path: str = DATA_PATH, use_cache: bool = True, parse_timestamps: bool = False
+) -> pd.DataFrame:
+    """
+    Ingest the columns used by the model from the CSV export, plus the order
+    timestamps when `parse_timestamps` is set.
+    """
     try:
-        data_path = "./data/olist_customers_dataset.csv"
-        if not os.path.exists(data_path):
-            raise FileNotFoundError(f"Data file not found at {data_path}")
-        
-        df = pd.read_csv(data_path)
+        cache = DatasetCache() if use_cache else None
+        df = IngestData(data_path, parse_timestamps=parse_timestamps, cache=cache).get_data()
         if df.empty:
             raise ValueError("The loaded DataFrame is empty")
             
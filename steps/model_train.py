@@ -1,138 +1,171 @@
 import logging
-import mlflow
+from typing import Optional, Union
+
 import pandas as pd
+from materializer.custom_materializer import cs_materializer
+from model.feature_matrix import FeatureMatrix
+from model.incremental import RETRAINED_MODEL_PATH
 from model.model_dev import (
     HyperparameterTuner,
     LightGBMModel,
     LinearRegressionModel,
     RandomForestModel,
     XGBoostModel,
+    best_iteration,
+    early_stopping_split,
 )
+from model.model_loader import load_model
+from model.model_selection import ModelSelection
+from model.profiling import profile
 from sklearn.base import RegressorMixin
 from zenml import step
-from zenml.client import Client
-
-experiment_tracker = Client().active_stack.experiment_tracker
 
-if experiment_tracker is not None:
-    @step(experiment_tracker=experiment_tracker.name)
-    def train_model(
-        x_train: pd.DataFrame,
-        x_test: pd.DataFrame,
-        y_train: pd.Series,
-        y_test: pd.Series,
-        model_name: str = "lightgbm",
-        fine_tuning: bool = False,
-    ) -> RegressorMixin:
-        """
-        Args:
-            x_train: pd.DataFrame
-            x_test: pd.DataFrame
-            y_train: pd.Series
-            y_test: pd.Series
-            model_name: str
-            fine_tuning: bool
-        Returns:
-            model: RegressorMixin
-        """
-        try:
-            mlflow.set_experiment("customer_satisfaction_experiment")
-            
-            with mlflow.start_run(nested=True) as run:
-                model = None
-                tuner = None
 
-                if model_name == "lightgbm":
-                    mlflow.lightgbm.autolog()
-                    model = LightGBMModel()
-                elif model_name == "randomforest":
-                    mlflow.sklearn.autolog()
-                    model = RandomForestModel()
-                elif model_name == "xgboost":
-                    mlflow.xgboost.autolog()
-                    model = XGBoostModel()
-                elif model_name == "linear_regression":
-                    mlflow.sklearn.autolog()
-                    model = LinearRegressionModel()
-                else:
-                    raise ValueError("Model name not supported")
+@step(output_materializers=cs_materializer)
+def train_model(
+    x_train: Union[pd.DataFrame, FeatureMatrix],
+    x_test: Union[pd.DataFrame, FeatureMatrix],
+    y_train: pd.Series,
+    y_test: pd.Series,
+    model_name: str = "lightgbm",
+    fine_tuning: bool = False,
+    n_trials: int = 100,
+    n_jobs: int = 1,
+    study_storage: Optional[str] = None,
+    study_name: Optional[str] = None,
+    validation_fraction: float = 0.1,
+    early_stopping_rounds: int = 20,
+    warm_start: bool = False,
+    base_model_path: str = RETRAINED_MODEL_PATH,
+    incremental_rounds: int = 100,
+) -> RegressorMixin:
+    """
+    Args:
+        x_train: pd.DataFrame or FeatureMatrix
+        x_test: pd.DataFrame or FeatureMatrix
+        y_train: pd.Series
+        y_test: pd.Series
+        model_name: str, "all" or a comma-separated list of names to
+            train every candidate and keep the best by validation R2
+        fine_tuning: bool
+        n_trials: number of tuning trials when fine_tuning is set
+        n_jobs: number of processes running tuning trials, or candidate
+            models, in parallel
+        study_storage: Optuna storage URL used to share and resume the study
+        study_name: name of the study to create or resume
+        validation_fraction: share of x_train held out for early stopping
+            of the boosted models and to score the tuning trials of any
+            model, 0 disables early stopping
+        early_stopping_rounds: rounds without validation improvement
+            before boosting stops
+        warm_start: continue boosting the model at `base_model_path`
+            instead of training from scratch, see `plan_retraining`
+        base_model_path: model kept by the last deployed run, see
+            `commit_retraining`
+        incremental_rounds: most trees added on top of it
+    Returns:
+        model: RegressorMixin
+    """
+    # imported here so that building the pipeline does not load them
+    import mlflow
 
-                tuner = HyperparameterTuner(model, x_train, y_train, x_test, y_test)
+    try:
+        mlflow.set_experiment("customer_satisfaction_experiment")
 
-                if fine_tuning:
-                    best_params = tuner.optimize()
-                    trained_model = model.train(x_train, y_train, **best_params)
-                else:
-                    trained_model = model.train(x_train, y_train)
+        # profiled inside the run, which is ended before the step returns, so
+        # the measurements are logged to it
+        with mlflow.start_run(nested=True) as run, profile("train_model", rows=len(x_train)):
+            model = None
 
-                mlflow.log_param("model_type", model_name)
+            if model_name == "all" or "," in model_name:
+                names = None if model_name == "all" else model_name.split(",")
+                selection = ModelSelection(
+                    [name.strip() for name in names] if names else None,
+                    n_workers=n_jobs,
+                    validation_fraction=validation_fraction,
+                    early_stopping_rounds=early_stopping_rounds,
+                    n_trials=n_trials if fine_tuning else 0,
+                )
+                best_name, trained_model, leaderboard = selection.run(
+                    x_train, x_test, y_train, y_test
+                )
+                mlflow.log_text(leaderboard.to_csv(index=False), "leaderboard.csv")
+                mlflow.log_metrics(
+                    {
+                        f"{row['model']}_{key}": value
+                        for row in leaderboard.to_dict("records")
+                        for key, value in row.items()
+                        if key != "model"
+                    }
+                )
+                mlflow.log_param("model_type", best_name)
                 mlflow.log_param("fine_tuning", fine_tuning)
-                
                 return trained_model
-        except Exception as e:
-            logging.error(f"Error in train_model step: {str(e)}")
-            raise e
-        finally:
-            # Ensure any active MLflow run is ended
-            mlflow.end_run()
-else:
-    @step
-    def train_model(
-        x_train: pd.DataFrame,
-        x_test: pd.DataFrame,
-        y_train: pd.Series,
-        y_test: pd.Series,
-        model_name: str = "lightgbm",
-        fine_tuning: bool = False,
-    ) -> RegressorMixin:
-        """
-        Args:
-            x_train: pd.DataFrame
-            x_test: pd.DataFrame
-            y_train: pd.Series
-            y_test: pd.Series
-            model_name: str
-            fine_tuning: bool
-        Returns:
-            model: RegressorMixin
-        """
-        try:
-            mlflow.set_experiment("customer_satisfaction_experiment")
-            
-            with mlflow.start_run(nested=True) as run:
-                model = None
-                tuner = None
 
-                if model_name == "lightgbm":
-                    mlflow.lightgbm.autolog()
-                    model = LightGBMModel()
-                elif model_name == "randomforest":
-                    mlflow.sklearn.autolog()
-                    model = RandomForestModel()
-                elif model_name == "xgboost":
-                    mlflow.xgboost.autolog()
-                    model = XGBoostModel()
-                elif model_name == "linear_regression":
-                    mlflow.sklearn.autolog()
-                    model = LinearRegressionModel()
-                else:
-                    raise ValueError("Model name not supported")
+            if model_name == "lightgbm":
+                mlflow.lightgbm.autolog()
+                model = LightGBMModel()
+            elif model_name == "randomforest":
+                mlflow.sklearn.autolog()
+                model = RandomForestModel()
+            elif model_name == "xgboost":
+                mlflow.xgboost.autolog()
+                model = XGBoostModel()
+            elif model_name == "linear_regression":
+                mlflow.sklearn.autolog()
+                model = LinearRegressionModel()
+            else:
+                raise ValueError("Model name not supported")
 
-                tuner = HyperparameterTuner(model, x_train, y_train, x_test, y_test)
+            if warm_start and not model.supports_warm_start:
+                raise ValueError(
+                    f"{model_name} models cannot be warm-started, train them from scratch"
+                )
 
-                if fine_tuning:
-                    best_params = tuner.optimize()
-                    trained_model = model.train(x_train, y_train, **best_params)
-                else:
-                    trained_model = model.train(x_train, y_train)
+            # tuning also scores its trials on the held-out rows, so the test
+            # split is only used by the evaluation step
+            x_fit, y_fit, x_valid, y_valid, fit_params = early_stopping_split(
+                model,
+                x_train,
+                y_train,
+                validation_fraction,
+                early_stopping_rounds,
+                hold_out_always=fine_tuning and not warm_start,
+            )
 
-                mlflow.log_param("model_type", model_name)
-                mlflow.log_param("fine_tuning", fine_tuning)
-                
-                return trained_model
-        except Exception as e:
-            logging.error(f"Error in train_model step: {str(e)}")
-            raise e
-        finally:
-            # Ensure any active MLflow run is ended
-            mlflow.end_run()
+            if warm_start:
+                # the base model's hyperparameters are kept, so no tuning
+                fit_params["init_model"] = load_model(base_model_path)
+                trained_model = model.train(
+                    x_fit, y_fit, **fit_params, n_estimators=incremental_rounds
+                )
+            elif fine_tuning:
+                if x_valid is None:
+                    raise ValueError("Fine tuning needs a validation split, it cannot be empty")
+                tuner = HyperparameterTuner(model, x_fit, y_fit, x_valid, y_valid)
+                best_params = tuner.optimize(
+                    n_trials=n_trials,
+                    n_jobs=n_jobs,
+                    storage=study_storage,
+                    study_name=study_name,
+                )
+                trained_model = model.train(x_fit, y_fit, **fit_params, **best_params)
+            else:
+                trained_model = model.train(x_fit, y_fit, **fit_params)
+
+            n_rounds = best_iteration(trained_model)
+            if n_rounds is not None:
+                logging.info(f"Early stopping kept {n_rounds} boosting rounds")
+                mlflow.log_metric("best_iteration", n_rounds)
+
+            mlflow.log_param("model_type", model_name)
+            mlflow.log_param("fine_tuning", fine_tuning)
+            mlflow.log_param("warm_start", warm_start)
+
+            return trained_model
+    except Exception as e:
+        logging.error(f"Error in train_model step: {str(e)}")
+        raise e
+    finally:
+        # Ensure any active MLflow run is ended
+        mlflow.end_run()
@@ -0,0 +1,98 @@
+import logging
+import os
+from typing import Tuple
+
+import pandas as pd
+from model.incremental import (
+    RETRAINED_MODEL_PATH,
+    RETRAINING_STATE_PATH,
+    RetrainingPolicy,
+    RetrainingState,
+    can_warm_start,
+)
+from model.model_loader import load_model, save_model
+from model.profiling import profiled
+from sklearn.base import RegressorMixin
+from typing_extensions import Annotated
+from zenml import step
+
+
+@step(enable_cache=False)
+@profiled(rows_from="df")
+def plan_retraining(
+    df: pd.DataFrame,
+    model_name: str = "lightgbm",
+    base_model_path: str = RETRAINED_MODEL_PATH,
+    state_path: str = RETRAINING_STATE_PATH,
+    full_retrain_days: float = 7,
+    drift_threshold: float = 0.2,
+    min_new_rows: int = 1000,
+) -> Tuple[Annotated[pd.DataFrame, "training_data"], Annotated[bool, "warm_start"]]:
+    """
+    Picks the orders to train on: only those newer than the watermark when
+    the deployed model can be warm-started, else the whole history.
+
+    Args:
+        df: order history with the `order_purchase_timestamp` column
+        model_name: model `train_model` will train
+        base_model_path: model kept by the last deployed run
+        state_path: watermark saved by `commit_retraining`
+        full_retrain_days: retrain from scratch at least this often
+        drift_threshold: retrain from scratch above this feature PSI
+        min_new_rows: fewest orders a warm start trains on
+    Returns:
+        training_data: pd.DataFrame
+        warm_start: bool
+    """
+    try:
+        has_base_model = os.path.exists(base_model_path) and can_warm_start(
+            model_name, load_model(base_model_path)
+        )
+        policy = RetrainingPolicy(full_retrain_days, drift_threshold, min_new_rows)
+        training_data, warm_start, reason = policy.plan(
+            df, RetrainingState.load(state_path), has_base_model
+        )
+        mode = "Warm-starting" if warm_start else "Retraining from scratch"
+        logging.info(f"{mode} on {len(training_data)} of {len(df)} orders: {reason}")
+        return training_data, warm_start
+    except Exception as e:
+        logging.error(f"Error in plan_retraining step: {str(e)}")
+        raise e
+
+
+@step(enable_cache=False)
+def commit_retraining(
+    df: pd.DataFrame,
+    model: RegressorMixin,
+    warm_start: bool,
+    deploy_decision: bool,
+    model_path: str = RETRAINED_MODEL_PATH,
+    state_path: str = RETRAINING_STATE_PATH,
+) -> None:
+    """
+    Keeps the deployed model as the starting point of the next incremental
+    run and moves the watermark past the orders it was trained on. Nothing
+    changes when the model was not deployed, so those orders are trained on
+    again next time.
+
+    Args:
+        df: order history the run was planned on
+        model: RegressorMixin
+        warm_start: whether `model` continued the previous one
+        deploy_decision: whether `model` was deployed
+        model_path: where the next run loads the model from, kept apart
+            from the committed model served by the Streamlit app
+        state_path: where the watermark is kept
+    """
+    try:
+        if not deploy_decision:
+            logging.info("Model was not deployed, keeping the previous watermark")
+            return
+        save_model(model, model_path)
+        state = RetrainingState.load(state_path)
+        state.advance(df, warm_start)
+        state.save(state_path)
+        logging.info(f"Watermark moved to {state.watermark}")
+    except Exception as e:
+        logging.error(f"Error in commit_retraining step: {str(e)}")
+        raise e
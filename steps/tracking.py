@@ -0,0 +1,22 @@
+from zenml.steps import BaseStep
+
+
+def with_experiment_tracker(step: BaseStep) -> BaseStep:
+    """
+    Attaches the active stack's experiment tracker, if it has one, to `step`.
+
+    Called while the pipeline is being built rather than when the step
+    module is imported, so importing the steps neither needs a configured
+    ZenML client nor loads the stack.
+
+    Args:
+        step: step that logs to MLflow
+    Returns:
+        step: the same step, configured with the tracker when there is one
+    """
+    from zenml.client import Client
+
+    experiment_tracker = Client().active_stack.experiment_tracker
+    if experiment_tracker is None:
+        return step
+    return step.with_options(experiment_tracker=experiment_tracker.name)
@@ -1,11 +1,20 @@
 import json
-import pickle
+import os
 
 import numpy as np
 import pandas as pd
 import streamlit as st
 from PIL import Image
 
+from model.batch_scoring import score_chunk
+from model.data_cleaning import PREPROCESSOR_PATH, TIMESTAMP_INPUT_COLUMNS, DataPreprocessStrategy
+from model.data_ingestion import FEATURE_COLUMNS, TARGET_COLUMN, IngestData
+from model.model_loader import get_model, get_versioned_model
+from model.prediction_cache import get_prediction_cache
+
+# Rows of an uploaded file read and scored at a time.
+UPLOAD_CHUNKSIZE = 20_000
+
 
 def main():
     st.title("End to End Customer Satisfaction Pipeline with ZenML")
@@ -60,11 +69,17 @@ def main():
     product_height_cm = st.number_input("Product Height (cm)", min_value=0, value=0)
     product_width_cm = st.number_input("Product Width (cm)", min_value=0, value=0)
 
-    if st.button("Predict"):
-        model_path = "D:/GitHub/customer-satisfaction/saved_model/model.pkl"
-        with open(model_path, 'rb') as file:
-            model = pickle.load(file)
+    preprocessor = (
+        DataPreprocessStrategy.load(PREPROCESSOR_PATH) if os.path.exists(PREPROCESSOR_PATH) else None
+    )
+    timestamps = {}
+    if preprocessor is not None and preprocessor.timestamp_features:
+        # the deployed model also uses the features derived from these
+        for column in TIMESTAMP_INPUT_COLUMNS:
+            label = column.replace("_", " ").capitalize()
+            timestamps[column] = [st.text_input(label, value="2018-01-01 12:00:00")]
 
+    if st.button("Predict"):
         df = pd.DataFrame(
             {
                 "payment_sequential": [payment_sequential],
@@ -79,11 +94,22 @@ def main():
                 "product_length_cm": [product_length_cm],
                 "product_height_cm": [product_height_cm],
                 "product_width_cm": [product_width_cm],
+                **timestamps,
             }
         )
-        data = df.values
         try:
-            pred = model.predict(data)
+            if preprocessor is not None:
+                # same derived features and imputation as at training time
+                df = preprocessor.transform(df)
+            # loaded once per process and reloaded only when the artifact changes,
+            # see model.model_loader.resolve_model_uri for where it comes from
+            model, version = get_versioned_model()
+            # what-if sessions resubmit the same rows, shared across sessions
+            pred = get_prediction_cache().predict(
+                df.to_numpy(dtype=np.float64),
+                version,
+                lambda rows: model.predict(pd.DataFrame(rows, columns=df.columns)),
+            )
             st.success(
                 "Your Customer Satisfactory rate(range between 0 - 5) with given product details is :-{}".format(
                     pred[0]
@@ -111,6 +137,62 @@ def main():
         image = Image.open("_assets/feature_importance_gain.png")
         st.image(image, caption="Feature Importance Gain")
 
+    batch_scoring()
+
+
+def batch_scoring():
+    st.markdown(
+        """
+    #### Batch Scoring
+    Upload a CSV export with the twelve feature columns above to score every order in it. The file is read and scored in chunks, so it can hold far more orders than fit comfortably in memory.
+    """
+    )
+    upload = st.file_uploader("Orders CSV", type="csv")
+    if upload is None:
+        return
+
+    preprocessor = (
+        DataPreprocessStrategy.load(PREPROCESSOR_PATH) if os.path.exists(PREPROCESSOR_PATH) else None
+    )
+    input_columns = preprocessor.input_columns if preprocessor is not None else FEATURE_COLUMNS
+    header = pd.read_csv(upload, nrows=0).columns
+    upload.seek(0)
+    missing = [c for c in input_columns if c not in header]
+    if missing:
+        st.error(f"The file is missing the feature columns {missing}")
+        return
+    extra = [c for c in header if c not in input_columns and c != TARGET_COLUMN]
+    id_columns = st.multiselect(
+        "Columns to keep next to the predictions",
+        extra,
+        default=["order_id"] if "order_id" in extra else [],
+    )
+
+    if st.button("Score file"):
+        try:
+            model = get_model()
+            progress = st.progress(0.0)
+            results = []
+            chunks = IngestData(upload, columns=id_columns + input_columns).iter_chunks(UPLOAD_CHUNKSIZE)
+            for chunk in chunks:
+                results.append(score_chunk(chunk, model, preprocessor, id_columns))
+                progress.progress(min(1.0, upload.tell() / max(1, upload.size)))
+            progress.progress(1.0)
+            if not results:
+                st.warning("The file holds no orders")
+                return
+            predictions = pd.concat(results, ignore_index=True)
+            st.success(f"Scored {len(predictions)} orders")
+            st.dataframe(predictions.head(100))
+            st.download_button(
+                "Download predictions",
+                predictions.to_csv(index=False).encode("utf-8"),
+                file_name="predictions.csv",
+                mime="text/csv",
+            )
+        except Exception as e:
+            st.error(f"An error occurred during batch scoring: {e}")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,70 @@
+import io
+import pickle
+
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMRegressor
+
+from model.batch_scoring import PREDICTION_COLUMN, BatchScorer, score_chunk
+from model.data_cleaning import DataPreprocessStrategy
+from model.data_ingestion import FEATURE_COLUMNS, TARGET_COLUMN, IngestData
+from model.synthetic import make_olist_frame, write_olist_csv
+
+
+def test_scored_file_matches_in_memory_predictions(tmp_path):
+    """Chunked, multi-process scoring returns one prediction per row, in order."""
+    train = DataPreprocessStrategy().handle_data(make_olist_frame(2_000))
+    model = LGBMRegressor(n_estimators=20, verbose=-1)
+    model.fit(train[FEATURE_COLUMNS], train[TARGET_COLUMN])
+    model_path = tmp_path / "model.pkl"
+    model_path.write_bytes(pickle.dumps(model))
+
+    source = write_olist_csv(str(tmp_path / "orders.csv"), 1_001, seed=3)
+    output = str(tmp_path / "predictions.parquet")
+    scorer = BatchScorer(str(model_path), preprocessor_path=None, chunksize=300, n_workers=2)
+    n_rows = scorer.score_file(source, output, id_columns=["order_id"])
+
+    scored = pd.read_parquet(output)
+    orders = pd.read_csv(source)
+    assert n_rows == len(scored) == 1_001
+    assert scored["order_id"].tolist() == orders["order_id"].tolist()
+    expected = model.predict(orders[FEATURE_COLUMNS].astype("float32"))
+    np.testing.assert_allclose(scored[PREDICTION_COLUMN], expected, rtol=1e-6)
+
+
+def test_uploaded_buffer_is_scored_chunk_by_chunk():
+    """An in-memory upload streams through the same schema as a file on disk."""
+    train = make_olist_frame(2_000)
+    strategy = DataPreprocessStrategy().fit(train)
+    processed = strategy.transform(train)
+    model = LGBMRegressor(n_estimators=10, verbose=-1)
+    model.fit(processed[FEATURE_COLUMNS], processed[TARGET_COLUMN])
+
+    orders = make_olist_frame(2_500, seed=5)
+    upload = io.BytesIO(orders.to_csv(index=False).encode("utf-8"))
+    chunks = IngestData(upload, columns=["order_id"] + FEATURE_COLUMNS).iter_chunks(1_000)
+    scored = pd.concat([score_chunk(c, model, strategy, ["order_id"]) for c in chunks], ignore_index=True)
+
+    assert scored["order_id"].tolist() == orders["order_id"].tolist()
+    expected = model.predict(strategy.transform(orders[FEATURE_COLUMNS].astype("float32")))
+    np.testing.assert_allclose(scored[PREDICTION_COLUMN], expected, rtol=1e-6)
+
+
+def test_timestamp_features_are_derived_when_scoring_a_file(tmp_path):
+    """A preprocessor saved with timestamp features reads and derives them from the export."""
+    strategy = DataPreprocessStrategy(timestamp_features=True)
+    train = strategy.handle_data(make_olist_frame(2_000))
+    model = LGBMRegressor(n_estimators=20, verbose=-1)
+    model.fit(train[strategy.feature_columns], train[TARGET_COLUMN])
+    model_path = tmp_path / "model.pkl"
+    model_path.write_bytes(pickle.dumps(model))
+    preprocessor_path = str(tmp_path / "preprocessor.json")
+    strategy.save(preprocessor_path)
+
+    source = write_olist_csv(str(tmp_path / "orders.csv"), 500, seed=3)
+    output = str(tmp_path / "predictions.parquet")
+    BatchScorer(str(model_path), preprocessor_path, chunksize=200).score_file(source, output)
+
+    orders = IngestData(source, columns=strategy.input_columns).get_data()
+    expected = model.predict(strategy.transform(orders))
+    np.testing.assert_allclose(pd.read_parquet(output)[PREDICTION_COLUMN], expected, rtol=1e-6)
@@ -0,0 +1,73 @@
+import os
+
+import pandas as pd
+
+from model.data_cache import DatasetCache
+
+SCHEMA = {"columns": ["price"]}
+
+
+def _loader(calls, df):
+    def load():
+        calls.append(1)
+        return df
+
+    return load
+
+
+def test_entries_are_reused_until_the_source_changes(tmp_path):
+    """A hit skips the loader; a new mtime, size or schema is a miss."""
+    source = tmp_path / "orders.csv"
+    source.write_text("price\n1.0\n")
+    cache = DatasetCache(str(tmp_path / "cache"))
+    df = pd.DataFrame({"price": [1.0]})
+    calls = []
+
+    cache.get_or_create(str(source), SCHEMA, _loader(calls, df))
+    pd.testing.assert_frame_equal(cache.get_or_create(str(source), SCHEMA, _loader(calls, df)), df)
+    assert len(calls) == 1
+
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    cache.get_or_create(str(source), SCHEMA, _loader(calls, df))
+    assert len(calls) == 2
+
+    with open(source, "a") as fid:
+        fid.write("2.0\n")
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    cache.get_or_create(str(source), SCHEMA, _loader(calls, df))
+    assert len(calls) == 3
+
+    cache.get_or_create(str(source), {"columns": ["freight_value"]}, _loader(calls, df))
+    assert len(calls) == 4
+
+
+def test_storing_a_new_version_evicts_the_old_ones(tmp_path):
+    """Only entries of the current source version are kept, for every schema."""
+    source = tmp_path / "orders.csv"
+    source.write_text("price\n1.0\n")
+    cache = DatasetCache(str(tmp_path / "cache"))
+    df = pd.DataFrame({"price": [1.0]})
+    old = cache.store(str(source), SCHEMA, df)
+    other_schema = cache.store(str(source), {"columns": []}, df)
+    assert os.path.exists(old) and os.path.exists(other_schema)
+
+    source.write_text("price\n1.0\n2.0\n")
+    new = cache.store(str(source), SCHEMA, df)
+
+    assert os.listdir(tmp_path / "cache") == [os.path.basename(new)]
+    assert cache.lookup(str(source), SCHEMA) == new
+
+
+def test_a_miss_fingerprints_the_source_once(tmp_path, monkeypatch):
+    """The key computed for the lookup is reused to store and evict."""
+    source = tmp_path / "orders.csv"
+    source.write_text("price\n1.0\n")
+    cache = DatasetCache(str(tmp_path / "cache"), verify_content=True)
+    fingerprint = cache.fingerprint
+    calls = []
+    monkeypatch.setattr(cache, "fingerprint", lambda path: calls.append(path) or fingerprint(path))
+
+    cache.get_or_create(str(source), SCHEMA, lambda: pd.DataFrame({"price": [1.0]}))
+
+    assert calls == [str(source)]
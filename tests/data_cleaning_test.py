@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from model.data_cleaning import (
+    TIMESTAMP_FEATURE_COLUMNS,
+    TIMESTAMP_INPUT_COLUMNS,
+    DataCleaning,
+    DataPreprocessStrategy,
+    StreamingMedian,
+    TimestampFeatureStrategy,
+    preprocess,
+    timestamp_features,
+)
+from model.data_ingestion import FEATURE_COLUMNS, TARGET_COLUMN
+from model.synthetic import make_olist_frame
+
+
+def test_preprocess_keeps_model_columns_and_fills_missing():
+    """Only the features and target survive, without missing dimensions."""
+    df = make_olist_frame(2_000)
+    df.loc[:9, DataPreprocessStrategy.IMPUTED_COLUMNS] = np.nan
+    strategy = DataPreprocessStrategy()
+    result = DataCleaning(df, strategy).handle_data()
+
+    assert list(result.columns) == FEATURE_COLUMNS + [TARGET_COLUMN]
+    assert result[DataPreprocessStrategy.IMPUTED_COLUMNS].notna().all().all()
+    for column, median in strategy.medians.items():
+        assert median == df[column].median()
+    assert df["product_weight_g"].isna().any(), "The input frame was modified."
+
+
+def test_fitted_medians_are_reused_at_inference(tmp_path):
+    """A saved strategy fills new batches with the training medians."""
+    train = make_olist_frame(2_000)
+    strategy = DataPreprocessStrategy().fit(train)
+    path = str(tmp_path / "preprocessor.json")
+    strategy.save(path)
+
+    batch = make_olist_frame(10, seed=7).drop(columns=[TARGET_COLUMN])
+    batch["product_weight_g"] = np.nan
+    result = DataPreprocessStrategy.load(path).handle_data(batch)
+
+    assert list(result.columns) == FEATURE_COLUMNS
+    assert (result["product_weight_g"] == strategy.medians["product_weight_g"]).all()
+
+
+def test_streamed_preprocessing_matches_in_memory(tmp_path):
+    """Streaming chunks to disk gives the same medians and rows as one frame."""
+    df = make_olist_frame(3_001)
+    df.loc[::7, DataPreprocessStrategy.IMPUTED_COLUMNS] = np.nan
+
+    expected = DataPreprocessStrategy().handle_data(df)
+    streaming = DataPreprocessStrategy()
+    chunks = lambda: (df.iloc[i : i + 500] for i in range(0, len(df), 500))
+    paths = DataCleaning(None, streaming).handle_stream(chunks, str(tmp_path))
+
+    assert len(paths) == 7
+    assert streaming.medians == DataPreprocessStrategy().fit(df).medians
+    result = pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+    pd.testing.assert_frame_equal(result, expected.reset_index(drop=True))
+
+
+def test_timestamp_features_match_pandas_datetime_accessors():
+    """Text and parsed timestamps give the same features as the .dt accessors."""
+    df = make_olist_frame(2_000)
+    df.loc[:4, "order_purchase_timestamp"] = None
+    purchase = pd.to_datetime(df["order_purchase_timestamp"])
+    delivered = pd.to_datetime(df["order_delivered_customer_date"])
+
+    features = timestamp_features(df)
+    parsed = df.assign(**{c: pd.to_datetime(df[c]) for c in TIMESTAMP_INPUT_COLUMNS})
+    pd.testing.assert_frame_equal(features, timestamp_features(parsed))
+
+    assert list(features.columns) == TIMESTAMP_FEATURE_COLUMNS
+    assert (features.dtypes == np.float32).all()
+    np.testing.assert_array_equal(
+        features["purchase_weekday"], purchase.dt.dayofweek.astype(np.float32)
+    )
+    np.testing.assert_array_equal(features["purchase_hour"], purchase.dt.hour.astype(np.float32))
+    expected_days = ((delivered - purchase) / pd.Timedelta(days=1)).astype(np.float32)
+    np.testing.assert_allclose(features["delivery_days"], expected_days, rtol=1e-6)
+    from_purchase = features.columns.drop("delivery_vs_estimate_days")
+    assert features.loc[:4, from_purchase].isna().all(axis=None)
+
+
+def test_saved_timestamp_features_are_derived_at_inference(tmp_path):
+    """A loaded strategy derives and imputes the timestamp features of raw rows."""
+    strategy = DataPreprocessStrategy(timestamp_features=True).fit(make_olist_frame(2_000))
+    path = str(tmp_path / "preprocessor.json")
+    strategy.save(path)
+    loaded = DataPreprocessStrategy.load(path)
+
+    batch = make_olist_frame(20, seed=7)[loaded.input_columns]
+    batch["order_delivered_customer_date"] = None
+    result = loaded.transform(batch)
+
+    assert list(result.columns) == FEATURE_COLUMNS + TIMESTAMP_FEATURE_COLUMNS
+    assert (result["delivery_days"] == strategy.medians["delivery_days"]).all()
+    pd.testing.assert_series_equal(
+        result["purchase_hour"], timestamp_features(batch)["purchase_hour"]
+    )
+
+
+def test_only_training_runs_replace_the_saved_preprocessor(tmp_path):
+    """Scoring a batch reuses the saved medians and leaves the file untouched."""
+    path = str(tmp_path / "preprocessor.json")
+    preprocess(make_olist_frame(500), save_preprocessor=True, preprocessor_path=path)
+    with open(path) as fid:
+        saved = fid.read()
+
+    batch = make_olist_frame(200, seed=7)
+    batch["product_weight_g"] = 1.0
+    preprocess(batch, reuse_preprocessor=True, preprocessor_path=path)
+    preprocess(batch, preprocessor_path=path)
+
+    with open(path) as fid:
+        assert fid.read() == saved
+
+
+def test_reused_preprocessor_keeps_its_timestamp_features(tmp_path):
+    """A reused preprocessor derives its saved features and refuses a conflicting flag."""
+    path = str(tmp_path / "preprocessor.json")
+    df = make_olist_frame(500)
+    preprocess(df, timestamp_features=True, save_preprocessor=True, preprocessor_path=path)
+
+    reused = preprocess(df, reuse_preprocessor=True, preprocessor_path=path)
+    assert set(TIMESTAMP_FEATURE_COLUMNS) <= set(reused.columns)
+    with pytest.raises(ValueError):
+        preprocess(df, reuse_preprocessor=True, timestamp_features=False, preprocessor_path=path)
+
+
+def test_streaming_median_state_is_bounded():
+    """Continuous values keep at most `max_bins` counts, within `resolution` of the median."""
+    rng = np.random.default_rng(0)
+    median = StreamingMedian(max_bins=1_000)
+    chunks = [pd.Series(rng.lognormal(3, 1, 10_000)) for _ in range(30)]
+    sizes = []
+    for chunk in chunks:
+        median.update(chunk)
+        sizes.append(len(median.counts))
+
+    assert max(sizes) <= 1_000 and 0 < median.resolution <= 1
+    assert abs(median.result() - pd.concat(chunks).median()) <= median.resolution
+
+
+def test_timestamp_features_are_derived_once_per_batch(monkeypatch):
+    """Fitting and transforming the same frame share one feature derivation."""
+    calls = []
+    handle_data = TimestampFeatureStrategy.handle_data
+    monkeypatch.setattr(
+        TimestampFeatureStrategy,
+        "handle_data",
+        lambda self, data: calls.append(len(data)) or handle_data(self, data),
+    )
+
+    DataPreprocessStrategy(timestamp_features=True).handle_data(make_olist_frame(300))
+
+    assert calls == [300]
@@ -0,0 +1,58 @@
+import io
+
+import pandas as pd
+
+from model.data_cache import DatasetCache
+from model.data_ingestion import (
+    CATEGORICAL_DTYPES,
+    FEATURE_COLUMNS,
+    TARGET_COLUMN,
+    TIMESTAMP_COLUMNS,
+    IngestData,
+)
+from model.synthetic import write_olist_csv
+
+
+def test_default_columns_are_projected_as_float32(tmp_path):
+    """Only the features and the target are read, with their declared dtypes."""
+    path = write_olist_csv(str(tmp_path / "olist.csv"), 500)
+    df = IngestData(path).get_data()
+
+    assert list(df.columns) == FEATURE_COLUMNS + [TARGET_COLUMN]
+    assert (df.dtypes == "float32").all()
+
+
+def test_categorical_and_timestamp_columns_keep_their_schema(tmp_path):
+    """Requested categorical columns use the fixed categories, timestamps are parsed."""
+    path = write_olist_csv(str(tmp_path / "olist.csv"), 500)
+    df = IngestData(path, columns=list(CATEGORICAL_DTYPES), parse_timestamps=True).get_data()
+
+    assert list(df.columns) == list(CATEGORICAL_DTYPES) + TIMESTAMP_COLUMNS
+    for column, dtype in CATEGORICAL_DTYPES.items():
+        assert df[column].dtype == dtype
+    for column in TIMESTAMP_COLUMNS:
+        assert pd.api.types.is_datetime64_any_dtype(df[column])
+
+
+def test_chunks_add_up_to_the_whole_dataset(tmp_path):
+    """Streaming gives the same rows, columns and dtypes as a single read."""
+    path = write_olist_csv(str(tmp_path / "olist.csv"), 2_500)
+    ingest = IngestData(path, columns=FEATURE_COLUMNS + ["payment_type"])
+
+    chunks = list(ingest.iter_chunks(chunksize=1_000))
+
+    assert [len(chunk) for chunk in chunks] == [1_000, 1_000, 500]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), ingest.get_data())
+
+
+def test_file_like_sources_bypass_the_cache(tmp_path):
+    """An open file has no path to fingerprint, so it is read directly."""
+    path = write_olist_csv(str(tmp_path / "olist.csv"), 100)
+    with open(path) as fid:
+        source = io.StringIO(fid.read())
+    cache = DatasetCache(str(tmp_path / "cache"))
+
+    df = IngestData(source, cache=cache).get_data()
+
+    assert len(df) == 100
+    assert not (tmp_path / "cache").exists()
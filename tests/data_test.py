@@ -1,62 +1,46 @@
-import logging
-
 import pytest
-from model.data_cleaning import DataCleaning
-from steps.ingest_data import IngestData
-from zenml.steps import step
 
+from model.data_cleaning import DataCleaning, DataDivideStrategy, DataPreprocessStrategy
+from model.data_ingestion import FEATURE_COLUMNS, TARGET_COLUMN, IngestData
+from model.synthetic import write_olist_csv
+
+N_ROWS = 5_000
+
+
+@pytest.fixture(scope="module")
+def cleaned(tmp_path_factory):
+    """The seeded synthetic export after ingestion and preprocessing."""
+    path = write_olist_csv(str(tmp_path_factory.mktemp("data") / "olist.csv"), N_ROWS)
+    df = IngestData(path).get_data()
+    return DataCleaning(df, DataPreprocessStrategy()).handle_data()
+
+
+@pytest.fixture(scope="module")
+def split(cleaned):
+    return DataCleaning(cleaned, DataDivideStrategy()).handle_data()
 
-@step
-def data_test_prep_step():
+
+def test_data_shape_after_preprocessing(split):
     """Test the shape of the data after the data cleaning step."""
-    try:
-        ingest_data = IngestData()
-        df = ingest_data.get_data()
-        data_cleaning = DataCleaning(df)
-        df = data_cleaning.preprocess_data()
-        X_train, X_test, y_train, y_test = data_cleaning.divide_data(df)
-
-        assert X_train.shape == (
-            92487,
-            12,
-        ), "The shape of the training set is not correct."
-        assert y_train.shape == (
-            92487,
-        ), "The shape of labels of training set is not correct."
-        assert X_test.shape == (
-            23122,
-            12,
-        ), "The shape of the testing set is not correct."
-        assert y_test.shape == (
-            23122,
-        ), "The shape of labels of testing set is not correct."
-        logging.info("Data Shape Assertion test passed.")
-    except Exception as e:
-        pytest.fail(e)
-
-
-@step
-def check_data_leakage(X_train, X_test):
+    x_train, x_test, y_train, y_test = split
+    n_test = N_ROWS // 5
+    assert x_train.shape == (N_ROWS - n_test, len(FEATURE_COLUMNS))
+    assert y_train.shape == (N_ROWS - n_test,)
+    assert x_test.shape == (n_test, len(FEATURE_COLUMNS))
+    assert y_test.shape == (n_test,)
+
+
+def test_no_data_leakage(split):
     """Test if there is any data leakage."""
-    try:
-        assert (
-            len(X_train.index.intersection(X_test.index)) == 0
-        ), "There is data leakage."
-        logging.info("Data Leakage test passed.")
-    except Exception as e:
-        pytest.fail(e)
+    x_train, x_test, _, _ = split
+    assert len(x_train.index.intersection(x_test.index)) == 0
 
 
-@step
-def test_ouput_range_features(df):
+def test_output_range_of_target(cleaned):
     """Test output range of the target variable between 0 - 5"""
-    try:
-        assert (
-            df["review_score"].max() <= 5
-        ), "The output range of the target variable is not correct."
-        assert (
-            df["review_score"].min() >= 0
-        ), "The output range of the target variable is not correct."
-        logging.info("Output Range Assertion test passed.")
-    except Exception as e:
-        pytest.fail(e)
+    assert cleaned[TARGET_COLUMN].max() <= 5
+    assert cleaned[TARGET_COLUMN].min() >= 0
+
+
+def test_imputed_columns_have_no_missing_values(cleaned):
+    assert not cleaned[DataPreprocessStrategy.IMPUTED_COLUMNS].isna().any().any()
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from model.evaluation import RegressionMetrics
+
+
+def test_streamed_metrics_match_sklearn():
+    """Chunked accumulation gives the same metrics as one sklearn pass."""
+    rng = np.random.default_rng(0)
+    y_true = rng.choice([1, 2, 3, 4, 5], 10_001).astype(np.float32)
+    y_pred = y_true + rng.normal(scale=0.8, size=len(y_true))
+
+    metrics = RegressionMetrics()
+    for start in range(0, len(y_true), 997):
+        metrics.update(y_true[start : start + 997], y_pred[start : start + 997])
+    scores = metrics.result()
+
+    assert scores["mse"] == pytest.approx(mean_squared_error(y_true, y_pred))
+    assert scores["rmse"] == pytest.approx(np.sqrt(mean_squared_error(y_true, y_pred)))
+    assert scores["mae"] == pytest.approx(mean_absolute_error(y_true, y_pred))
+    assert scores["r2"] == pytest.approx(r2_score(y_true, y_pred))
+    rounded = np.clip(np.rint(y_pred), 1, 5)
+    assert scores["accuracy"] == pytest.approx((rounded == y_true).mean())
+
+
+def test_only_requested_metrics_are_reported():
+    """The metric set is configurable and validated."""
+    scores = RegressionMetrics(metrics=("mae", "r2")).calculate_scores([1, 2, 3], [1, 2, 4])
+    assert set(scores) == {"mae", "r2"}
+    with pytest.raises(ValueError):
+        RegressionMetrics(metrics=("mape",))
@@ -0,0 +1,61 @@
+import pickle
+import warnings
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from model.data_cleaning import DataDivideStrategy, DataPreprocessStrategy
+from model.data_ingestion import FEATURE_COLUMNS, TARGET_COLUMN
+from model.feature_matrix import FeatureMatrix, to_feature_matrix
+from model.model_dev import MODELS
+from model.synthetic import make_olist_frame
+
+
+def test_named_batches_are_projected_in_training_order():
+    """DataFrame and Arrow batches give the same contiguous feature matrix."""
+    df = make_olist_frame(50)
+    expected = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+
+    for batch in (df, df[FEATURE_COLUMNS[::-1]], pa.Table.from_pandas(df, preserve_index=False)):
+        matrix = to_feature_matrix(batch)
+        assert matrix.flags["C_CONTIGUOUS"]
+        np.testing.assert_array_equal(matrix, expected)
+    assert to_feature_matrix(df, np.float32).dtype == np.float32
+
+
+def test_malformed_batches_are_rejected():
+    """Missing columns and wrongly shaped arrays fail before scoring."""
+    df = make_olist_frame(5)
+    with pytest.raises(ValueError, match="price"):
+        to_feature_matrix(df.drop(columns=["price"]))
+    with pytest.raises(ValueError, match="12 feature columns"):
+        to_feature_matrix(np.zeros((5, 11)))
+
+
+def test_feature_matrix_is_float32_and_keeps_its_names_through_the_split():
+    """One float32 copy of the features, row selections and pickling keep the names."""
+    df = DataPreprocessStrategy().handle_data(make_olist_frame(1_000))
+    x_train, x_test, _, _ = DataDivideStrategy(feature_matrix=True).handle_data(df)
+
+    for matrix in (x_train, x_test, pickle.loads(pickle.dumps(x_train))):
+        assert isinstance(matrix, FeatureMatrix)
+        assert matrix.dtype == np.float32 and matrix.flags["C_CONTIGUOUS"]
+        assert matrix.columns == FEATURE_COLUMNS
+    assert x_train[:, :3].columns is None
+    assert np.shares_memory(x_train.to_frame().to_numpy(), x_train)
+
+
+@pytest.mark.parametrize("name", list(MODELS))
+def test_models_trained_on_a_feature_matrix_score_named_frames(name):
+    """Models see the matrix as an array but keep the names for DataFrame scoring."""
+    df = DataPreprocessStrategy().handle_data(make_olist_frame(1_000)).dropna()
+    x, y = df[FEATURE_COLUMNS], df[TARGET_COLUMN]
+    params = {} if name == "linear_regression" else {"n_estimators": 10, "random_state": 0}
+
+    from_matrix = MODELS[name]().train(FeatureMatrix.from_frame(x), y, **params)
+    from_frame = MODELS[name]().train(x.astype(np.float32), y, **params)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", UserWarning)
+        prediction = from_matrix.predict(x)
+    np.testing.assert_allclose(prediction, from_frame.predict(x), rtol=1e-5)
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from model.data_cleaning import DataPreprocessStrategy
+from model.data_ingestion import FEATURE_COLUMNS, TARGET_COLUMN
+from model.incremental import WATERMARK_COLUMN, RetrainingPolicy, RetrainingState
+from model.model_dev import LightGBMModel, XGBoostModel
+from model.synthetic import make_olist_frame
+
+
+def _orders(n_rows: int = 4_000, seed: int = 42) -> pd.DataFrame:
+    df = make_olist_frame(n_rows, seed=seed)
+    df[WATERMARK_COLUMN] = pd.to_datetime(df[WATERMARK_COLUMN])
+    return df
+
+
+@pytest.mark.parametrize(
+    "model, n_trees",
+    [
+        (LightGBMModel(), lambda reg: reg.booster_.num_trees()),
+        (XGBoostModel(), lambda reg: reg.get_booster().num_boosted_rounds()),
+    ],
+)
+def test_warm_start_adds_trees_to_the_base_model(model, n_trees):
+    """A warm start keeps the base model's trees and boosts on top of them."""
+    data = DataPreprocessStrategy().handle_data(make_olist_frame(3_000))
+    x, y = data[FEATURE_COLUMNS], data[TARGET_COLUMN]
+    base = model.train(x[:2_000], y[:2_000], n_estimators=30, learning_rate=0.1)
+
+    continued = model.train(x[2_000:], y[2_000:], init_model=base, n_estimators=10)
+
+    assert n_trees(continued) == n_trees(base) + 10
+    assert continued.get_params()["learning_rate"] == 0.1
+    assert not np.allclose(continued.predict(x[:50]), base.predict(x[:50]))
+
+
+def test_only_orders_after_the_watermark_are_trained_on(tmp_path):
+    """Within the schedule and without drift, a run warm-starts on the new orders."""
+    df = _orders()
+    watermark = df[WATERMARK_COLUMN].quantile(0.75)
+    state = RetrainingState()
+    state.advance(df[df[WATERMARK_COLUMN] <= watermark], warm_start=False, now=watermark)
+    state.save(str(tmp_path / "state.json"))
+    state = RetrainingState.load(str(tmp_path / "state.json"))
+
+    policy = RetrainingPolicy(full_retrain_days=7, min_new_rows=100)
+    subset, warm_start, _ = policy.plan(df, state, has_base_model=True, now=watermark)
+
+    assert warm_start
+    assert len(subset) == (df[WATERMARK_COLUMN] > watermark).sum()
+    assert (subset[WATERMARK_COLUMN] > watermark).all()
+
+
+def test_full_retraining_on_schedule_drift_or_missing_state():
+    """The full history is used when a warm start is not safe."""
+    df = _orders()
+    watermark = df[WATERMARK_COLUMN].quantile(0.75)
+    state = RetrainingState()
+    state.advance(df[df[WATERMARK_COLUMN] <= watermark], warm_start=False, now=watermark)
+    policy = RetrainingPolicy(full_retrain_days=7, min_new_rows=100)
+
+    late = watermark + pd.Timedelta(days=8)
+    assert not policy.plan(df, state, has_base_model=True, now=late)[1]
+    assert not policy.plan(df, RetrainingState(), has_base_model=True)[1]
+    assert not policy.plan(df, state, has_base_model=False, now=watermark)[1]
+
+    drifted = df.copy()
+    new = drifted[WATERMARK_COLUMN] > watermark
+    drifted.loc[new, "price"] *= 10
+    subset, warm_start, reason = policy.plan(drifted, state, has_base_model=True, now=watermark)
+    assert not warm_start and len(subset) == len(df) and "price" in reason
@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import numpy as np
+
+from model.data_ingestion import FEATURE_COLUMNS
+from model.micro_batching import MicroBatcher
+from model.prediction_server import PredictionServer
+
+
+class _RowSum:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, x):
+        x = np.asarray(x)
+        self.batch_sizes.append(len(x))
+        return x.sum(axis=1)
+
+
+def test_concurrent_requests_share_predict_calls():
+    """Concurrent single rows are scored together and get their own result."""
+    model = _RowSum()
+
+    async def run():
+        async with MicroBatcher(model.predict, max_batch_size=64, max_latency_ms=20) as batcher:
+            rows = [np.full(12, i, dtype=float) for i in range(200)]
+            results = await asyncio.gather(*(batcher.predict(row) for row in rows))
+            return results, batcher.metrics.snapshot()
+
+    results, metrics = asyncio.run(run())
+    assert [float(r[0]) for r in results] == [12.0 * i for i in range(200)]
+    assert max(model.batch_sizes) <= 64
+    assert len(model.batch_sizes) < 200
+    assert metrics["requests"] == 200 and metrics["rows"] == 200
+
+
+def test_batcher_can_be_restarted_after_stop():
+    """Each start gets a fresh worker thread, so a stopped batcher serves again."""
+    model = _RowSum()
+
+    async def run():
+        batcher = MicroBatcher(model.predict, max_latency_ms=1)
+        results = []
+        for _ in range(2):
+            async with batcher:
+                results.append(float((await batcher.predict(np.ones(12)))[0]))
+        return results
+
+    assert asyncio.run(run()) == [12.0, 12.0]
+
+
+def test_server_scores_instances_over_http():
+    """The HTTP endpoint accepts MLflow-style bodies and reports metrics."""
+    model = _RowSum()
+
+    async def request(port, method, path, payload=None):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        body = json.dumps(payload).encode() if payload is not None else b""
+        writer.write(
+            f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+            + body
+        )
+        response = await reader.read()
+        writer.close()
+        status = int(response.split(b" ", 2)[1])
+        return status, json.loads(response.split(b"\r\n\r\n", 1)[1])
+
+    async def run():
+        server = PredictionServer(model, max_latency_ms=1)
+        _, port = await server.start(port=0)
+        try:
+            row = dict(zip(FEATURE_COLUMNS, range(12)))
+            ok = await request(port, "POST", "/invocations", {"instances": [row, row]})
+            bad = await request(port, "POST", "/invocations", {"instances": [[1.0, 2.0]]})
+            metrics = await request(port, "GET", "/metrics")
+        finally:
+            await server.stop()
+        return ok, bad, metrics
+
+    ok, bad, metrics = asyncio.run(run())
+    assert ok == (200, {"predictions": [66.0, 66.0]})
+    assert bad[0] == 400
+    assert metrics[1]["rows"] == 2
+
+
+def test_server_rejects_malformed_and_oversized_requests():
+    """Bad request lines and Content-Length headers get an answer, not a dropped connection."""
+
+    async def send(port, head):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(head.encode())
+        response = await reader.read()
+        writer.close()
+        return int(response.split(b" ", 2)[1])
+
+    async def run():
+        server = PredictionServer(_RowSum(), max_latency_ms=1, max_body_bytes=1024)
+        _, port = await server.start(port=0)
+        try:
+            return [
+                await send(port, "GARBAGE\r\n\r\n"),
+                await send(port, "POST /invocations HTTP/1.1\r\nContent-Length: ten\r\n\r\n"),
+                await send(port, "POST /invocations HTTP/1.1\r\nContent-Length: -1\r\n\r\n"),
+                await send(port, "POST /invocations HTTP/1.1\r\nContent-Length: 1025\r\n\r\n"),
+            ]
+        finally:
+            await server.stop()
+
+    assert asyncio.run(run()) == [400, 400, 400, 413]
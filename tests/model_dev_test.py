@@ -0,0 +1,113 @@
+import pickle
+
+import optuna
+import pytest
+
+from model.data_cleaning import DataDivideStrategy, DataPreprocessStrategy
+from model.model_dev import (
+    EARLY_STOPPING_ROUNDS,
+    MAX_BOOST_ROUNDS,
+    HyperparameterTuner,
+    LightGBMModel,
+    LinearRegressionModel,
+    XGBoostModel,
+    best_iteration,
+)
+from model.synthetic import make_olist_frame
+
+
+@pytest.fixture(scope="module")
+def split():
+    # linear regression does not accept the missing payment values
+    data = DataPreprocessStrategy().handle_data(make_olist_frame(2_000)).dropna()
+    x_train, x_test, y_train, y_test = DataDivideStrategy().handle_data(data)
+    # in the order HyperparameterTuner takes them
+    return x_train, y_train, x_test, y_test
+
+
+def _finished_trials(storage: str, study_name: str) -> int:
+    finished = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+    study = optuna.load_study(study_name=study_name, storage=storage)
+    return sum(trial.state in finished for trial in study.trials)
+
+
+def test_parallel_workers_share_one_study(split, tmp_path):
+    """Two worker processes run the requested trials into the same SQLite study."""
+    storage = f"sqlite:///{tmp_path / 'study.db'}"
+    tuner = HyperparameterTuner(LinearRegressionModel(), *split)
+
+    tuner.optimize(n_trials=4, n_jobs=2, storage=storage, study_name="parallel")
+
+    assert _finished_trials(storage, "parallel") == 4
+
+
+def test_resumed_study_only_runs_the_missing_trials(split, tmp_path):
+    """Trials already in the storage count towards `n_trials`."""
+    storage = f"sqlite:///{tmp_path / 'study.db'}"
+    tuner = HyperparameterTuner(LinearRegressionModel(), *split)
+
+    tuner.optimize(n_trials=2, storage=storage, study_name="resumed")
+    tuner.optimize(n_trials=5, storage=storage, study_name="resumed")
+    assert _finished_trials(storage, "resumed") == 5
+    tuner.optimize(n_trials=5, storage=storage, study_name="resumed")
+    assert _finished_trials(storage, "resumed") == 5
+
+
+@pytest.mark.parametrize("pruner", ["none", "median", "hyperband"])
+def test_every_pruner_tunes_a_boosted_model(split, pruner):
+    """Each pruner runs its trials and the tree count comes from early stopping."""
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    best_params = HyperparameterTuner(LightGBMModel(), *split, pruner=pruner).optimize(n_trials=12)
+
+    assert {"max_depth", "learning_rate"} <= set(best_params)
+    assert 0 < best_params["n_estimators"] <= 200
+
+
+@pytest.mark.parametrize(
+    "model, n_trees",
+    [
+        (LightGBMModel(), lambda reg: reg.booster_.num_trees()),
+        (XGBoostModel(), lambda reg: reg.get_booster().num_boosted_rounds()),
+    ],
+)
+def test_early_stopping_keeps_the_best_iteration(split, model, n_trees):
+    """With a validation set, boosting stops well before the round limit."""
+    x_train, y_train, x_valid, y_valid = split
+    params = {"n_estimators": MAX_BOOST_ROUNDS, "learning_rate": 0.5}
+
+    stopped = model.train(
+        x_train,
+        y_train,
+        eval_set=[(x_valid, y_valid)],
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+        **params,
+    )
+    # LightGBM drops the trees after the best iteration, XGBoost keeps them
+    assert 0 < best_iteration(stopped) <= n_trees(stopped) < MAX_BOOST_ROUNDS
+
+    full = model.train(x_train, y_train, **params)
+    assert n_trees(full) == MAX_BOOST_ROUNDS
+    assert best_iteration(full) is None
+
+
+@pytest.mark.parametrize("model_class", [LightGBMModel, XGBoostModel])
+def test_trials_share_one_native_dataset(split, model_class):
+    """The binned dataset is built once per study and never pickled to workers."""
+    model = model_class()
+    build = model._build_datasets if model_class is LightGBMModel else model._build_matrices
+    calls = []
+
+    def counting_build(*frames):
+        calls.append(frames)
+        return build(*frames)
+
+    name = build.__name__
+    setattr(model, name, counting_build)
+    tuner = HyperparameterTuner(model, *split)
+    tuner.optimize(n_trials=3)
+    tuner.optimize(n_trials=5)
+    assert len(calls) == 1
+
+    delattr(model, name)
+    assert "_trial_cache" in model.__dict__
+    assert "_trial_cache" not in pickle.loads(pickle.dumps(tuner)).model.__dict__
@@ -0,0 +1,31 @@
+import os
+import pickle
+
+from model.model_loader import MODEL_PATH, MODEL_URI_ENV, ModelCache, resolve_model_uri
+
+
+def test_model_is_reloaded_only_when_the_file_changes(tmp_path):
+    """Repeated gets reuse the loaded model until the artifact is rewritten."""
+    path = str(tmp_path / "model.pkl")
+    with open(path, "wb") as fid:
+        pickle.dump({"version": 1}, fid)
+    cache = ModelCache()
+
+    first = cache.get(path)
+    assert cache.get(path) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    with open(path, "wb") as fid:
+        pickle.dump({"version": 2}, fid)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+    assert cache.get(path) == {"version": 2}
+    assert cache.misses == 2
+
+
+def test_model_uri_comes_from_the_environment(monkeypatch):
+    """An explicit URI wins over the environment, which wins over the default."""
+    monkeypatch.setenv(MODEL_URI_ENV, "models:/customer_satisfaction_model/3")
+    assert resolve_model_uri() == "models:/customer_satisfaction_model/3"
+    assert resolve_model_uri("other.pkl") == "other.pkl"
+    monkeypatch.delenv(MODEL_URI_ENV)
+    assert resolve_model_uri() == MODEL_PATH
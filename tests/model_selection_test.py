@@ -0,0 +1,53 @@
+import pytest
+
+from model.data_cleaning import DataDivideStrategy, DataPreprocessStrategy
+from model.model_dev import MODELS
+from model.model_selection import ModelSelection
+from model.synthetic import make_olist_frame
+
+
+@pytest.fixture(scope="module")
+def split():
+    # linear regression does not accept the missing payment values
+    data = DataPreprocessStrategy().handle_data(make_olist_frame(2_000)).dropna()
+    return DataDivideStrategy().handle_data(data)
+
+
+@pytest.mark.parametrize("n_workers", [1, 2])
+def test_best_candidate_tops_the_leaderboard(split, n_workers):
+    """Every registered model is scored on the same split, best R2 first."""
+    best_name, best_model, leaderboard = ModelSelection(n_workers=n_workers).run(*split)
+
+    assert sorted(leaderboard["model"]) == sorted(MODELS)
+    assert leaderboard["r2"].is_monotonic_decreasing
+    assert best_name == leaderboard["model"].iloc[0]
+    assert best_model.predict(split[1]).shape == (len(split[1]),)
+
+
+def test_lower_is_better_metrics_rank_ascending(split):
+    _, _, leaderboard = ModelSelection(["linear_regression", "lightgbm"], metric="rmse").run(*split)
+    assert leaderboard["rmse"].is_monotonic_increasing
+
+
+def test_failed_candidates_are_left_off_the_leaderboard(split):
+    x_train, x_test, y_train, y_test = split
+    x_train = x_train.copy()
+    x_train.iloc[0, 0] = float("nan")
+    best_name, _, leaderboard = ModelSelection(["linear_regression", "lightgbm"]).run(
+        x_train, x_test, y_train, y_test
+    )
+    assert leaderboard["model"].tolist() == ["lightgbm"] and best_name == "lightgbm"
+
+
+def test_unknown_models_are_rejected():
+    with pytest.raises(ValueError):
+        ModelSelection(["lightgbm", "catboost"])
+
+
+def test_candidates_are_ranked_on_the_validation_split(split):
+    """The test split is only reported, the held-out training rows rank the models."""
+    _, _, leaderboard = ModelSelection(["linear_regression", "lightgbm"]).run(*split)
+    assert {"r2", "test_r2"} <= set(leaderboard.columns)
+    assert leaderboard["r2"].is_monotonic_decreasing
+    with pytest.raises(ValueError):
+        ModelSelection(["lightgbm"], validation_fraction=0)
@@ -0,0 +1,46 @@
+import numpy as np
+
+from model.prediction_cache import PredictionCache
+
+
+class _CountingModel:
+    def __init__(self, offset=0.0):
+        self.offset = offset
+        self.rows_scored = 0
+
+    def predict(self, rows):
+        self.rows_scored += len(rows)
+        return rows.sum(axis=1) + self.offset
+
+
+def test_repeated_rows_are_scored_once():
+    """Duplicates within and across calls reuse one prediction."""
+    model = _CountingModel()
+    cache = PredictionCache()
+    rows = np.array([[1.0, 2.0], [3.0, 4.0], [1.0, 2.0 + 1e-9], [-0.0, 0.0]])
+
+    np.testing.assert_allclose(cache.predict(rows, "v1", model.predict), [3.0, 7.0, 3.0, 0.0])
+    np.testing.assert_allclose(cache.predict(rows[:2], "v1", model.predict), [3.0, 7.0])
+    assert model.rows_scored == 3
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_new_model_version_invalidates_and_size_is_bounded():
+    """A new version drops old predictions; the oldest entries are evicted."""
+    cache = PredictionCache(max_entries=2)
+    rows = np.array([[1.0], [2.0], [3.0]])
+    cache.predict(rows, "v1", _CountingModel().predict)
+    assert cache.stats()["entries"] == 2 and cache.evictions == 1
+
+    redeployed = _CountingModel(offset=10.0)
+    np.testing.assert_allclose(cache.predict(rows[2:], "v2", redeployed.predict), [13.0])
+    assert redeployed.rows_scored == 1
+
+
+def test_entries_expire_after_ttl():
+    """Expired entries are scored again."""
+    model = _CountingModel()
+    cache = PredictionCache(ttl_seconds=0.0)
+    cache.predict(np.ones((1, 3)), "v1", model.predict)
+    cache.predict(np.ones((1, 3)), "v1", model.predict)
+    assert model.rows_scored == 2
@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from model.data_cleaning import DataCleaning, DataPreprocessStrategy
+from model.model_dev import LinearRegressionModel
+from model.profiling import PROFILE_DIR_ENV, peak_rss_mib, profile, profiled, recent_profiles
+from model.synthetic import make_olist_frame
+
+
+def test_decorated_calls_record_time_memory_and_rows():
+    """Rows come from the named argument, memory from the process peak."""
+    x = pd.DataFrame({"a": np.arange(500.0), "b": np.ones(500)})
+    LinearRegressionModel().train(x, x["a"])
+
+    record = recent_profiles()[-1]
+    assert record["name"] == "LinearRegressionModel.train"
+    assert record["rows"] == 500
+    assert record["wall_seconds"] >= 0 and record["cpu_seconds"] >= 0
+    assert record["peak_rss_mib"] > 0
+
+
+def test_strategy_rows_come_from_the_input_frame():
+    DataCleaning(make_olist_frame(300), DataPreprocessStrategy()).handle_data()
+    record = recent_profiles()[-1]
+    assert record["name"] == "DataCleaning.handle_data" and record["rows"] == 300
+
+
+def test_nested_blocks_report_the_peak_over_both():
+    with profile("outer") as outer:
+        with profile("inner") as inner:
+            block = np.ones(32 * 1024 * 1024 // 8)  # 32 MiB
+            block[::512] = 2
+            del block
+    assert outer.metrics["peak_rss_mib"] >= inner.metrics["peak_rss_mib"]
+    assert outer.metrics["wall_seconds"] >= inner.metrics["wall_seconds"]
+
+
+def test_outermost_block_dumps_a_profile(tmp_path, monkeypatch):
+    monkeypatch.setenv(PROFILE_DIR_ENV, str(tmp_path))
+
+    @profiled(name="sum_rows")
+    def sum_rows(values):
+        with profile("nested"):
+            return values.sum(axis=1)
+
+    sum_rows(np.ones((100, 3)))
+    assert recent_profiles()[-1]["rows"] == 100
+    dumps = os.listdir(tmp_path)
+    assert len(dumps) == 1 and dumps[0].startswith("sum_rows-") and dumps[0].endswith(".prof")
+
+
+def test_profiled_calls_leave_the_process_peak_alone():
+    """Only a block asking for it resets VmHWM, which other readers rely on."""
+    block = np.ones(64 * 1024 * 1024 // 8)  # 64 MiB
+    block[::512] = 2
+    del block
+    before = peak_rss_mib()
+
+    LinearRegressionModel().train(pd.DataFrame({"a": np.arange(100.0)}), np.arange(100.0))
+    assert peak_rss_mib() >= before
+
+    if os.path.exists("/proc/self/clear_refs"):
+        with profile("benchmark", reset_peak=True) as outer:
+            pass
+        assert outer.metrics["peak_rss_mib"] < before
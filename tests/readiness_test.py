@@ -0,0 +1,45 @@
+import http.server
+import threading
+import time
+
+import pytest
+
+from pipelines.utils import health_url, wait_for_service
+
+
+class _PingHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200 if self.path == "/ping" else 404)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_wait_returns_once_the_server_comes_up():
+    """Polling backs off until the server starts, then returns immediately."""
+    server = http.server.HTTPServer(("127.0.0.1", 0), _PingHandler)
+    port = server.server_address[1]
+    server.server_close()  # keep the port number, refuse connections for now
+
+    def start_later():
+        time.sleep(0.3)
+        nonlocal server
+        server = http.server.HTTPServer(("127.0.0.1", port), _PingHandler)
+        server.serve_forever()
+
+    threading.Thread(target=start_later, daemon=True).start()
+    url = health_url(f"http://127.0.0.1:{port}/invocations")
+    assert url.endswith("/ping")
+    waited = wait_for_service(url, timeout=10)
+    assert 0.3 <= waited < 5
+    server.shutdown()
+
+
+def test_wait_gives_up_after_timeout():
+    """An endpoint that never answers raises instead of hanging."""
+    server = http.server.HTTPServer(("127.0.0.1", 0), _PingHandler)
+    port = server.server_address[1]
+    server.server_close()
+    with pytest.raises(TimeoutError):
+        wait_for_service(f"http://127.0.0.1:{port}/ping", timeout=0.3)
@@ -0,0 +1,150 @@
+import gc
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from lightgbm import LGBMRegressor, early_stopping
+from xgboost import XGBRegressor
+
+from materializer.serialization import (
+    LazyFrame,
+    iter_frame_pairs,
+    load_artifact,
+    materialize,
+    save_artifact,
+)
+from model.data_cleaning import DataDivideStrategy, DataPreprocessStrategy
+from model.feature_matrix import FeatureMatrix
+from model.synthetic import make_olist_frame
+
+
+def test_data_artifacts_round_trip(tmp_path):
+    """Frames keep their dtypes and index, arrays come back memory-mapped."""
+    x_train, _, y_train, _ = DataDivideStrategy().handle_data(
+        DataPreprocessStrategy().handle_data(make_olist_frame(500))
+    )
+    for name, obj in (("x", x_train), ("y", y_train)):
+        assert save_artifact(obj, str(tmp_path / name)).startswith("arrow")
+    pd.testing.assert_frame_equal(load_artifact(str(tmp_path / "x")), x_train)
+    pd.testing.assert_series_equal(load_artifact(str(tmp_path / "y")), y_train)
+
+    values = x_train.to_numpy()
+    assert save_artifact(values, str(tmp_path / "values")) == "npy"
+    loaded = load_artifact(str(tmp_path / "values"))
+    assert isinstance(loaded, np.memmap)
+    np.testing.assert_array_equal(loaded, values)
+
+
+def test_feature_matrix_round_trips_with_its_columns(tmp_path):
+    """The names come back from the metadata and the values stay memory-mapped."""
+    x_train, _, _, _ = DataDivideStrategy(feature_matrix=True).handle_data(
+        DataPreprocessStrategy().handle_data(make_olist_frame(500))
+    )
+    assert save_artifact(x_train, str(tmp_path / "x")) == "feature_matrix"
+    loaded = load_artifact(str(tmp_path / "x"))
+
+    assert isinstance(loaded, FeatureMatrix) and not loaded.flags["WRITEABLE"]
+    assert loaded.columns == x_train.columns and loaded.flags["C_CONTIGUOUS"]
+    np.testing.assert_array_equal(loaded, x_train)
+
+
+def _squared_error(y_true, y_pred):
+    return y_pred - y_true, np.ones_like(y_pred)
+
+
+def test_boosted_models_use_native_formats(tmp_path):
+    """Reloaded boosted models predict exactly like the models that were saved."""
+    x, _, y, _ = DataDivideStrategy().handle_data(
+        DataPreprocessStrategy().handle_data(make_olist_frame(1_000))
+    )
+    lgbm = LGBMRegressor(n_estimators=30, verbose=-1).fit(x, y)
+    xgbm = XGBRegressor(n_estimators=30).fit(x, y)
+    for name, model, fmt in (("lgbm", lgbm, "lightgbm_lgbmregressor"), ("xgb", xgbm, "xgboost_xgbregressor")):
+        assert save_artifact(model, str(tmp_path / name)) == fmt
+        np.testing.assert_array_equal(load_artifact(str(tmp_path / name)).predict(x), model.predict(x))
+
+
+def test_lgbm_regressor_is_rebuilt_from_its_text_model(tmp_path):
+    """No pickle is written, and the rebuilt wrapper keeps its params, names and kept trees."""
+    x, x_valid, y, y_valid = DataDivideStrategy().handle_data(
+        DataPreprocessStrategy().handle_data(make_olist_frame(2_000))
+    )
+    model = LGBMRegressor(n_estimators=200, learning_rate=0.3, verbose=-1)
+    model.fit(x, y, eval_set=[(x_valid, y_valid)], callbacks=[early_stopping(5, verbose=False)])
+    save_artifact(model, str(tmp_path / "lgbm"))
+    loaded = load_artifact(str(tmp_path / "lgbm"))
+
+    assert sorted(os.listdir(tmp_path / "lgbm")) == ["metadata.json", "model.txt"]
+    assert loaded.get_params() == model.get_params()
+    assert list(loaded.feature_names_in_) == list(x.columns)
+    assert loaded.booster_.num_trees() == model.best_iteration_
+    np.testing.assert_array_equal(loaded.predict(x_valid), model.predict(x_valid))
+
+
+def test_lgbm_regressor_keeps_a_custom_objective(tmp_path):
+    """A callable objective cannot be stored as text, so the model is pickled."""
+    x, _, y, _ = DataDivideStrategy().handle_data(
+        DataPreprocessStrategy().handle_data(make_olist_frame(1_000))
+    )
+    model = LGBMRegressor(n_estimators=10, objective=_squared_error, verbose=-1).fit(x, y)
+    assert save_artifact(model, str(tmp_path / "lgbm")) == "pickle"
+    loaded = load_artifact(str(tmp_path / "lgbm"))
+
+    assert loaded.get_params()["objective"] is _squared_error
+    assert loaded.n_features_in_ == model.n_features_in_
+    np.testing.assert_array_equal(loaded.predict(x), model.predict(x))
+
+
+def test_lazy_frame_reads_selected_columns_in_batches(tmp_path):
+    """A handle projects columns and streams rows without loading everything."""
+    df = DataPreprocessStrategy().handle_data(make_olist_frame(150_000)).sample(frac=1, random_state=0)
+    save_artifact(df, str(tmp_path / "df"))
+    lazy = LazyFrame(str(tmp_path / "df"))
+
+    assert lazy.shape == df.shape
+    price = lazy.select(["price"])
+    pd.testing.assert_frame_equal(price.to_pandas(), df[["price"]])
+    batches = list(lazy.iter_batches())
+    assert len(batches) == 3
+    pd.testing.assert_frame_equal(pd.concat(batches), df)
+    assert materialize(df) is df
+
+
+def test_lazy_frame_deletes_the_directory_it_owns(tmp_path):
+    """A local copy of a remote artifact outlives the selections made from it."""
+    directory = tmp_path / "copy"
+    save_artifact(pd.DataFrame({"price": [1.0, 2.0]}), str(directory))
+    price = LazyFrame(str(directory), owns_directory=True).select(["price"])
+    gc.collect()
+    assert price.to_pandas()["price"].tolist() == [1.0, 2.0]
+    del price
+    gc.collect()
+    assert not directory.exists()
+
+    save_artifact(pd.DataFrame({"price": [1.0]}), str(directory))
+    LazyFrame(str(directory), owns_directory=True).close()
+    assert not directory.exists()
+
+
+def test_frame_pairs_refuse_misaligned_rows(tmp_path):
+    """Features and target with different row counts raise instead of truncating."""
+    target = pd.DataFrame({"review_score": np.arange(150_000, dtype=float)})
+    save_artifact(target, str(tmp_path / "y"))
+    features = FeatureMatrix(np.zeros((150_000, 2), dtype=np.float32), ["a", "b"])
+
+    pairs = list(iter_frame_pairs(features, LazyFrame(str(tmp_path / "y"))))
+    assert sum(len(target_batch) for _, target_batch in pairs) == 150_000
+    with pytest.raises(ValueError):
+        list(iter_frame_pairs(features[:-1], LazyFrame(str(tmp_path / "y"))))
+    with pytest.raises(ValueError):
+        list(iter_frame_pairs(np.zeros((150_001, 2)), LazyFrame(str(tmp_path / "y"))))
+
+
+def test_feature_matrix_follows_the_target_batches():
+    """An in-memory target is one batch, so the matrix is not cut at ARROW_BATCH_ROWS."""
+    features = FeatureMatrix(np.zeros((150_000, 2), dtype=np.float32), ["a", "b"])
+    target = pd.Series(np.arange(150_000, dtype=float))
+
+    [(feature_batch, target_batch)] = iter_frame_pairs(features, target)
+    assert feature_batch.shape == (150_000, 2) and target_batch is target
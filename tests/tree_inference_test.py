@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from lightgbm import LGBMRegressor
+from sklearn.ensemble import RandomForestRegressor
+from xgboost import XGBRegressor
+
+from model.tree_inference import CompiledEnsemble, compile_model
+
+
+def _regression_data(n_rows: int = 2_000, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    x = pd.DataFrame(rng.normal(size=(n_rows, 5)), columns=[f"f{i}" for i in range(5)])
+    x.loc[rng.random(n_rows) < 0.05, "f1"] = np.nan
+    x.loc[rng.random(n_rows) < 0.05, "f2"] = 0.0
+    y = 2 * x["f0"] - x["f1"].fillna(1.0) + rng.normal(scale=0.1, size=n_rows)
+    return x, y
+
+
+@pytest.mark.parametrize("zero_as_missing,use_missing", [(False, True), (True, True), (False, False)])
+def test_lightgbm_predictions_match(zero_as_missing, use_missing):
+    """Every LightGBM missing-value mode is routed like the native model."""
+    x, y = _regression_data()
+    model = LGBMRegressor(
+        n_estimators=50, zero_as_missing=zero_as_missing, use_missing=use_missing, verbose=-1
+    ).fit(x, y)
+    np.testing.assert_allclose(compile_model(model).predict(x), model.predict(x), atol=1e-9)
+
+
+def test_xgboost_predictions_match_best_iteration():
+    """Only the trees up to the early-stopping iteration are compiled."""
+    x, y = _regression_data()
+    model = XGBRegressor(n_estimators=300, early_stopping_rounds=5, tree_method="hist")
+    model.fit(x[:1_500], y[:1_500], eval_set=[(x[1_500:], y[1_500:])], verbose=False)
+    np.testing.assert_allclose(compile_model(model).predict(x), model.predict(x), rtol=1e-5, atol=1e-5)
+
+
+def test_random_forest_round_trips_through_npz(tmp_path):
+    """A saved ensemble reloads with NumPy only and reorders named columns."""
+    x, y = _regression_data()
+    x = x.fillna(0.0)
+    model = RandomForestRegressor(n_estimators=10, max_depth=8, random_state=0).fit(x, y)
+    path = str(tmp_path / "forest.npz")
+    compile_model(model).save(path)
+
+    loaded = CompiledEnsemble.load(path)
+    shuffled = x[x.columns[::-1]]
+    np.testing.assert_allclose(loaded.predict(shuffled), model.predict(x), atol=1e-9)